@@ -1,26 +1,50 @@
+import importlib
+import os
+
+# Las gráficas se dibujan sin pantalla (servidor): backend Agg antes de que algo importe matplotlib
+os.environ.setdefault("MPLBACKEND", "Agg")
+
 import streamlit as st
-from views.proceso1 import procesar_archivos
-from views.proceso2 import procesar_archivos2
+from servicios import instrumentacion
+from servicios import resultados
+
+# Procesos del menú: (subtítulo, módulo de la vista, función que muestra el proceso). El módulo
+# (y con él pandas, openpyxl, matplotlib...) se importa recién cuando se elige el proceso
+PROCESOS = {
+    "Proceso 1": ("Graficación año DTO y PCL", "views.proceso1", "procesar_archivos"),
+    "Proceso 2": ("Graficación Medicina Laboral", "views.proceso2", "procesar_archivos2"),
+}
+
+
+def cargar_proceso(nombre):
+    _, modulo, funcion = PROCESOS[nombre]
+    return getattr(importlib.import_module(modulo), funcion)
+
+
+# Registros JSON de tiempos y memoria por etapa (logger "notificaciones.etapas")
+instrumentacion.configurar_logs()
 
 # Título
 st.title("🔔 Notificaciones")
 
-# Menú 
-opciones_menu = ["Proceso 1", "Proceso 2"]
+# Menú (sin proceso elegido al entrar: la primera pantalla no carga ninguna vista)
+opcion_seleccionada = st.sidebar.selectbox("Seleccione un proceso", list(PROCESOS), index=None,
+                                           placeholder="Seleccione un proceso")
+mostrar_etapas = st.sidebar.checkbox("Mostrar tiempos por etapa", value=False)
+
 
-# Mostrar el menú en la barra lateral
-opcion_seleccionada = st.sidebar.selectbox("Seleccione un proceso", opciones_menu)
+def mostrar_desglose(corrida):
+    # Desglose de la última generación (la corrida del trabajo en segundo plano): segundos y variación de memoria (MB) de cada etapa
+    if mostrar_etapas and corrida is not None and corrida.etapas:
+        st.sidebar.caption(f"Corrida {corrida.id}: {corrida.segundos:.2f} s")
+        st.sidebar.dataframe(corrida.tabla(), hide_index=True)
+    if mostrar_etapas:
+        cache = resultados.estadisticas()
+        st.sidebar.caption(f"Cache de informes: {cache['aciertos']} aciertos, {cache['fallos']} fallos")
 
-# ------------------------------------------------------------------------------ Proceso 1 ---------------------------------------------------------------------------------
-if opcion_seleccionada == "Proceso 1":
-    st.subheader("Graficación año DTO y PCL")
-    procesar_archivos()  
-# ------------------------------------------------------------------------------ Proceso 2 ---------------------------------------------------------------------------------
-elif opcion_seleccionada == "Proceso 2":
-    st.subheader("Graficación Medicina Laboral")
-    procesar_archivos2()
+# ------------------------------------------------------------------------------ PROCESOS ---------------------------------------------------------------------------------
+if opcion_seleccionada in PROCESOS:
+    st.subheader(PROCESOS[opcion_seleccionada][0])
+    mostrar_desglose(cargar_proceso(opcion_seleccionada)())
 else:
     st.write("Por favor, selecciona un proceso del menú.")
-
-
-
@@ -0,0 +1,106 @@
+"""Tiempo de arranque de la app: primera pantalla y primera apertura de cada proceso.
+
+Cada medición corre en un intérprete nuevo (arranque en frío) con streamlit.testing:
+- inicio: primera corrida de app.py (título y barra lateral, sin proceso elegido).
+- proceso1 / proceso2: corrida al elegir el proceso en el menú (importa su vista).
+Para cada una se informa el tiempo y qué módulos pesados (pandas, numpy, openpyxl,
+matplotlib, pyarrow) quedaron cargados, así un proceso nuevo que se importe al inicio
+se nota enseguida.
+
+Uso:
+    python benchmarks/bench_arranque.py [--repeticiones 3] [--guardar-linea-base] [--tolerancia 0.25]
+
+La línea base (benchmarks/linea_base_arranque.json) es propia de cada máquina y no se
+versiona. Sale con código 1 si alguna medición supera la línea base más la tolerancia
+o si la primera pantalla carga un módulo pesado.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "linea_base_arranque.json")
+ESCENARIOS = {"inicio": None, "proceso1": "Proceso 1", "proceso2": "Proceso 2"}
+PESADOS = ("pandas", "numpy", "openpyxl", "matplotlib", "pyarrow")
+# Diferencias menores a esto se consideran ruido aunque superen la tolerancia
+RUIDO_SEGUNDOS = 0.05
+
+
+def medir(escenario):
+    """{'segundos': s, 'modulos': [...]} de una corrida, en este intérprete (llamar en uno nuevo)."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=120)
+    opcion = ESCENARIOS[escenario]
+    if opcion is not None:
+        app.run()
+        app.sidebar.selectbox[0].set_value(opcion)
+
+    inicio = time.perf_counter()
+    app.run()
+    segundos = time.perf_counter() - inicio
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return {'segundos': round(segundos, 3), 'modulos': [m for m in PESADOS if m in sys.modules]}
+
+
+def _en_frio(escenario):
+    comando = [sys.executable, os.path.abspath(__file__), "--hijo", escenario]
+    salida = subprocess.run(comando, check=True, capture_output=True, text=True, cwd=RAIZ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=3, help="Arranques por escenario (se informa la mediana)")
+    parser.add_argument("--linea-base", default=LINEA_BASE)
+    parser.add_argument("--guardar-linea-base", action="store_true", help="Guardar estos resultados como línea base")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Aumento permitido sobre la línea base (0.25 = 25%%)")
+    parser.add_argument("--hijo", choices=ESCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        print(json.dumps(medir(args.hijo)))
+        return 0
+
+    base = {}
+    if os.path.exists(args.linea_base):
+        with open(args.linea_base, encoding="utf-8") as f:
+            base = json.load(f)
+
+    actual, problemas = {}, []
+    print(f"{'escenario':<10} {'s':>8} {'base s':>8}  módulos pesados")
+    for escenario in ESCENARIOS:
+        corridas = [_en_frio(escenario) for _ in range(args.repeticiones)]
+        segundos = round(statistics.median(c['segundos'] for c in corridas), 3)
+        modulos = corridas[-1]['modulos']
+        actual[escenario] = {'segundos': segundos}
+
+        anterior = base.get(escenario, {}).get('segundos')
+        alerta = ""
+        if anterior is not None and segundos > anterior * (1 + args.tolerancia) and segundos - anterior > RUIDO_SEGUNDOS:
+            problemas.append(escenario)
+            alerta = "  REGRESIÓN"
+        if escenario == "inicio" and modulos:
+            problemas.append(escenario)
+            alerta += "  CARGA MÓDULOS PESADOS AL INICIO"
+        celda_base = f"{anterior:>8.2f}" if anterior is not None else f"{'-':>8}"
+        print(f"{escenario:<10} {segundos:>8.2f} {celda_base}  {', '.join(modulos) or '-'}{alerta}")
+
+    if args.guardar_linea_base:
+        with open(args.linea_base, "w", encoding="utf-8") as f:
+            json.dump(actual, f, indent=2, sort_keys=True)
+        print(f"\nLínea base guardada en {args.linea_base}")
+
+    if problemas:
+        print(f"\n{len(problemas)} problemas de arranque (tolerancia {args.tolerancia:.0%})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
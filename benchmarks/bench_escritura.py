@@ -0,0 +1,75 @@
+"""Memoria pico al escribir la hoja BASE: celda por celda vs. libro de solo escritura.
+
+Uso: python benchmarks/bench_escritura.py [--filas 10000 100000 1000000]
+Cada medición corre en un proceso aparte para que el pico de memoria no se mezcle.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _datos(filas):
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'FECHA_VISADO': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, filas), unit='D'),
+        'NOTIFICADOR': rng.choice(['BELISARIO 397', 'GESTAR INNOVACION', 'UTMDL'], filas),
+        'ESTADO_INFORME': rng.choice([f'ESTADO {i}' for i in range(40)], filas),
+        'RADICADO': np.arange(filas),
+    })
+
+
+def _medir(modo, filas):
+    from openpyxl import Workbook
+    from openpyxl.utils.dataframe import dataframe_to_rows
+    from servicios import escritura
+
+    df = _datos(filas)
+    antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    with tempfile.TemporaryFile() as destino:
+        if modo == "celda":
+            libro = Workbook()
+            hoja = libro.active
+            for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True), 1):
+                for c_idx, value in enumerate(row, 1):
+                    hoja.cell(row=r_idx, column=c_idx, value=value)
+        else:
+            libro = escritura.libro_streaming()
+            hoja = libro.create_sheet("BASE")
+            escritura.escribir_dataframe(hoja, df)
+        libro.save(destino)
+    segundos = time.perf_counter() - inicio
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{modo},{filas},{segundos:.2f},{(pico - antes) / 1024:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--modos", nargs="+", default=["celda", "streaming"])
+    parser.add_argument("--hijo", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        _medir(args.hijo[0], int(args.hijo[1]))
+        return
+
+    print(f"{'modo':>10} {'filas':>10} {'segundos':>9} {'MB extra':>9}")
+    for filas in args.filas:
+        for modo in args.modos:
+            salida = subprocess.run([sys.executable, __file__, "--hijo", modo, str(filas)],
+                                    capture_output=True, text=True, check=True).stdout
+            modo, filas_, segundos, mb = salida.strip().split(",")
+            print(f"{modo:>10} {filas_:>10} {segundos:>9} {mb:>9}")
+
+
+if __name__ == "__main__":
+    main()
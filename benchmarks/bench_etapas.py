@@ -0,0 +1,236 @@
+"""Tiempo y memoria por etapa de los dos informes, sin navegador, con comparación contra una línea base.
+
+Etapas: lectura, agregado (cubo), escritura de hojas, gráficas y guardado (libro.save y, en Proceso 1, el anexo al archivo original),
+más el informe completo tal como lo genera la app (generar_informe_dto_pcl /
+generar_tablas_estado_informe con hoja BASE).
+
+Uso:
+    python benchmarks/bench_etapas.py [--filas 10000 100000] [--procesos proceso1 proceso2_csv]
+                                      [--guardar-linea-base] [--tolerancia 0.25] [--sin-memoria]
+
+Cada tamaño corre en un proceso aparte. El tiempo se mide con tracemalloc apagado y la
+memoria (pico de asignaciones de Python/numpy sobre el inicio de la etapa) en una segunda
+pasada con tracemalloc; las gráficas dibujadas en el pool de procesos no entran en la memoria.
+La línea base (benchmarks/linea_base.json) es propia de cada máquina y no se versiona.
+Sale con código 1 si alguna etapa supera la línea base más la tolerancia.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "linea_base.json")
+PROCESOS = ["proceso1", "proceso2_xlsx", "proceso2_csv"]
+MES = 'Marzo'
+# Diferencias menores a esto se consideran ruido aunque superen la tolerancia
+RUIDO_SEGUNDOS = 0.05
+RUIDO_MB = 1.0
+
+
+# ------------------------------------------------------------------------------- ETAPAS -------------------------------------------------------------
+# Cada etapa recibe el estado compartido (dict) y deja ahí lo que necesitan las siguientes.
+def _etapas_proceso1():
+    from servicios import graficos, informe_dto_pcl
+
+    def lectura(e):
+        # Cada etapa del flujo se pide por separado para medirla; la ejecución las corre una vez
+        e['ejecucion'] = informe_dto_pcl.ejecucion(BytesIO(e['datos']), MES)
+        e['ejecucion']['indice']
+
+    def agregado(e):
+        e['ejecucion']['agregado']
+
+    def escritura(e):
+        # El mismo libro de solo escritura que usa guardar_informe
+        ejecucion = e['ejecucion']
+        e['libro'] = informe_dto_pcl.libro_informe()
+        e['lote'] = graficos.Lote()
+        informe_dto_pcl.escribir_hojas_informe(e['libro'], ejecucion['particiones'], ejecucion['agregado'],
+                                               ejecucion['cubo_ano'], ejecucion['conteos_notificador'], e['lote'],
+                                               ejecucion['ano_seleccionado'])
+
+    def graficas(e):
+        informe_dto_pcl.insertar_graficas(e['lote'])
+
+    def guardado(e):
+        informe_dto_pcl.anexar_informe(e['datos'], e['libro'], e['ejecucion']['construir'])
+
+    def completo(e):
+        informe_dto_pcl.generar_informe_dto_pcl(BytesIO(e['datos']), MES)
+
+    return [lectura, agregado, escritura, graficas, guardado, completo]
+
+
+def _etapas_proceso2(tipo):
+    from servicios import cubo as cubo_conteos, escritura as escritura_excel, informe_estado, ingesta
+
+    def lectura(e):
+        if tipo == "xlsx":
+            e['columnas'] = ingesta.leer_columnas(e['datos'], ['DTO', 'PCL'])
+        else:
+            # Los bloques se guardan para separar la lectura del agregado (la app agrega bloque a bloque)
+            lector = ingesta.LectorCSV(BytesIO(e['datos']), columnas=ingesta.COLUMNAS_INFORME, delimiter=",")
+            e['columnas'] = {f'CSV_{i}': ingesta.tipar(bloque.dropna(how='all')) for i, bloque in enumerate(lector)}
+
+    def agregado(e):
+        if tipo == "xlsx":
+            e['cubo'] = cubo_conteos.construir_cubo(e['columnas'])
+        else:
+            e['cubo'] = cubo_conteos.combinar([cubo_conteos.construir_cubo({'CSV': b}) for b in e['columnas'].values()])
+        e['conteo'] = cubo_conteos.tabla(e['cubo'], 'ESTADO_INFORME', 'NOTIFICADOR')
+
+    def escritura(e):
+        e['libro'] = escritura_excel.libro_streaming()
+        informe_estado.escribir_tabla_procesada(e['libro'].create_sheet("Tabla Procesada"), e['conteo'])
+
+    def graficas(e):
+        informe_estado.grafica_barras(e['conteo'], e['libro'])
+
+    def guardado(e):
+        e['libro'].save(BytesIO())
+
+    def completo(e):
+        informe_estado.generar_tablas_estado_informe(BytesIO(e['datos']), tipo, incluir_base=True)
+
+    return [lectura, agregado, escritura, graficas, guardado, completo]
+
+
+def _preparar(proceso, filas):
+    import datos_sinteticos
+    if proceso == "proceso2_csv":
+        ruta = datos_sinteticos.csv_estado(filas)
+        return _etapas_proceso2("csv"), ruta
+    ruta = datos_sinteticos.libro_dto_pcl(filas)
+    return (_etapas_proceso1() if proceso == "proceso1" else _etapas_proceso2("xlsx")), ruta
+
+
+def _limpiar_caches():
+    from servicios import graficos, ingesta
+    ingesta._cache.limpiar()
+    graficos._imagenes.limpiar()
+
+
+def _pasada(etapas, datos, medir_memoria):
+    _limpiar_caches()
+    estado = {'datos': datos}
+    resultado = {}
+    for etapa in etapas:
+        if etapa.__name__ == 'completo':
+            _limpiar_caches()
+        if medir_memoria:
+            tracemalloc.reset_peak()
+            antes = tracemalloc.get_traced_memory()[0]
+            etapa(estado)
+            resultado[etapa.__name__] = (tracemalloc.get_traced_memory()[1] - antes) / 1024 ** 2
+        else:
+            inicio = time.perf_counter()
+            etapa(estado)
+            resultado[etapa.__name__] = time.perf_counter() - inicio
+    return resultado
+
+
+def medir(proceso, filas, memoria=True):
+    """{etapa: {'segundos': s, 'mb': MB o None}} para un proceso y un tamaño."""
+    etapas, ruta = _preparar(proceso, filas)
+    with open(ruta, "rb") as f:
+        datos = f.read()
+
+    segundos = _pasada(etapas, datos, medir_memoria=False)
+    mb = {}
+    if memoria:
+        tracemalloc.start()
+        try:
+            mb = _pasada(etapas, datos, medir_memoria=True)
+        finally:
+            tracemalloc.stop()
+    return {nombre: {'segundos': round(s, 3), 'mb': round(mb[nombre], 1) if nombre in mb else None}
+            for nombre, s in segundos.items()}
+
+
+# ------------------------------------------------------------------------------- LÍNEA BASE -------------------------------------------------------------
+def regresiones(actual, base, tolerancia):
+    """Etapas que superan la línea base: [(etapa, métrica, actual, base)]."""
+    encontradas = []
+    for etapa, valores in actual.items():
+        anterior = base.get(etapa)
+        if not anterior:
+            continue
+        for metrica, ruido in (('segundos', RUIDO_SEGUNDOS), ('mb', RUIDO_MB)):
+            v, b = valores.get(metrica), anterior.get(metrica)
+            if v is not None and b is not None and v > b * (1 + tolerancia) and v - b > ruido:
+                encontradas.append((etapa, metrica, v, b))
+    return encontradas
+
+
+def _cargar_linea_base(ruta):
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Tamaños a medir (hasta 2000000; en .xlsx se reparten entre DTO y PCL)")
+    parser.add_argument("--procesos", nargs="+", choices=PROCESOS, default=PROCESOS)
+    parser.add_argument("--linea-base", default=LINEA_BASE)
+    parser.add_argument("--guardar-linea-base", action="store_true", help="Guardar estos resultados como línea base")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Aumento permitido sobre la línea base (0.25 = 25%%)")
+    parser.add_argument("--sin-memoria", action="store_true", help="Solo tiempos (sin la pasada con tracemalloc)")
+    parser.add_argument("--hijo", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        proceso, filas = args.hijo
+        print(json.dumps(medir(proceso, int(filas), memoria=not args.sin_memoria)))
+        return 0
+
+    base = _cargar_linea_base(args.linea_base)
+    nueva = dict(base)
+    total_regresiones = 0
+    for proceso in args.procesos:
+        for filas in args.filas:
+            comando = [sys.executable, os.path.abspath(__file__), "--hijo", proceso, str(filas)]
+            if args.sin_memoria:
+                comando.append("--sin-memoria")
+            salida = subprocess.run(comando, check=True, capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+            actual = json.loads(salida.strip().splitlines()[-1])
+            clave = f"{proceso}/{filas}"
+            anterior = base.get(clave, {})
+            encontradas = regresiones(actual, anterior, args.tolerancia)
+            marcadas = {(etapa, metrica) for etapa, metrica, _, _ in encontradas}
+            total_regresiones += len(encontradas)
+
+            print(f"\n{proceso}, {filas} filas")
+            print(f"{'etapa':<10} {'s':>8} {'base s':>8} {'MB':>8} {'base MB':>8}")
+            for etapa, valores in actual.items():
+                b = anterior.get(etapa, {})
+                celdas = []
+                for metrica in ('segundos', 'mb'):
+                    for v in (valores.get(metrica), b.get(metrica)):
+                        celdas.append(f"{v:>8.2f}" if v is not None else f"{'-':>8}")
+                alerta = "  REGRESIÓN " + ", ".join(m for e, m in marcadas if e == etapa) if any(e == etapa for e, _ in marcadas) else ""
+                print(f"{etapa:<10} {' '.join(celdas)}{alerta}")
+            nueva[clave] = actual
+
+    if args.guardar_linea_base:
+        with open(args.linea_base, "w", encoding="utf-8") as f:
+            json.dump(nueva, f, indent=2, sort_keys=True)
+        print(f"\nLínea base guardada en {args.linea_base}")
+
+    if total_regresiones:
+        print(f"\n{total_regresiones} regresiones sobre la línea base (tolerancia {args.tolerancia:.0%})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Tiempo y memoria de lectura: pd.read_excel completo vs. ingesta.leer_columnas.
+
+Uso: python benchmarks/bench_lectura.py [--filas 10000 100000] [--columnas-extra 15]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from servicios import ingesta  # noqa: E402
+
+
+def _libro(filas, columnas_extra):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'FECHA_VISADO': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, filas), unit='D'),
+        'NOTIFICADOR': rng.choice(['BELISARIO 397', 'GESTAR INNOVACION', 'UTMDL', 'BELISARIO'], filas),
+        'ESTADO_INFORME': rng.choice([f'ESTADO {i}' for i in range(40)], filas),
+    })
+    for i in range(columnas_extra):
+        df[f'CAMPO_{i}'] = rng.choice(['texto de relleno', 'otro valor', 'N/A'], filas)
+    destino = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+    with pd.ExcelWriter(destino.name) as writer:
+        df.to_excel(writer, sheet_name='DTO', index=False)
+    return destino.name
+
+
+def _mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--columnas-extra", type=int, default=15)
+    args = parser.parse_args()
+
+    print(f"motor rápido: {ingesta.MOTOR_EXCEL_RAPIDO or 'no instalado (openpyxl)'}")
+    print(f"{'filas':>9} {'completo s':>11} {'completo MB':>12} {'columnas s':>11} {'columnas MB':>12}")
+    for filas in args.filas:
+        ruta = _libro(filas, args.columnas_extra)
+        try:
+            inicio = time.perf_counter()
+            completo = pd.read_excel(ruta, sheet_name='DTO', parse_dates=['FECHA_VISADO'])
+            t_completo = time.perf_counter() - inicio
+
+            ingesta._cache.limpiar()
+            with open(ruta, "rb") as f:
+                datos = f.read()
+            inicio = time.perf_counter()
+            podado = ingesta.leer_columnas(datos, ['DTO'])['DTO']
+            t_podado = time.perf_counter() - inicio
+
+            print(f"{filas:>9} {t_completo:>11.2f} {_mb(completo):>12.1f} {t_podado:>11.2f} {_mb(podado):>12.1f}")
+        finally:
+            os.remove(ruta)
+
+
+if __name__ == "__main__":
+    main()
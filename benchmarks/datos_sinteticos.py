@@ -0,0 +1,96 @@
+"""Archivos sintéticos parecidos a los reales para los benchmarks.
+
+- Libro .xlsx con hojas DTO y PCL (las filas se reparten entre las dos).
+- CSV con las columnas del informe por ESTADO_INFORME.
+
+Los archivos se guardan en benchmarks/.datos y se reutilizan entre corridas.
+Uso directo: python benchmarks/datos_sinteticos.py --filas 10000 2000000
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from servicios import escritura  # noqa: E402
+
+CARPETA_DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".datos")
+
+NOTIFICADORES = ['BELISARIO 397', 'GESTAR INNOVACION', 'UTMDL', 'BELISARIO', 'SERVIENTREGA', 'CORREO CERTIFICADO']
+PESOS_NOTIFICADORES = [0.30, 0.25, 0.20, 0.15, 0.06, 0.04]
+ESTADOS_INFORME = (
+    ['NOTIFICADO', 'EN TRAMITE', 'DEVUELTO', 'PENDIENTE FIRMA', 'ANULADO', 'DIRECCION ERRADA', 'REHUSADO',
+     'FALLECIDO', 'CERRADO', 'EN REPARTO']
+    + [f'ESTADO {i:02d}' for i in range(50)]
+)
+CIUDADES = ['BOGOTA', 'MEDELLIN', 'CALI', 'BARRANQUILLA', 'CARTAGENA', 'BUCARAMANGA', 'PEREIRA', 'MANIZALES']
+FILAS_MAXIMAS_HOJA = 1_048_575  # Límite de Excel sin contar el encabezado
+
+
+def generar_dataframe(filas, semilla=0, ano=2024):
+    """Filas con FECHA_VISADO en un año (1% sin fecha), notificadores y ~60 estados con frecuencias desiguales."""
+    rng = np.random.default_rng(semilla)
+    fechas = pd.Timestamp(f'{ano}-01-01') + pd.to_timedelta(rng.integers(0, 365, filas), unit='D')
+    fechas = fechas.where(rng.random(filas) > 0.01)
+    # Frecuencias tipo Zipf: pocos estados concentran la mayoría de los registros
+    pesos_estados = 1 / np.arange(1, len(ESTADOS_INFORME) + 1)
+    return pd.DataFrame({
+        'RADICADO': np.arange(1, filas + 1) + semilla * 10_000_000,
+        'DOCUMENTO': rng.integers(10_000_000, 1_999_999_999, filas),
+        'CIUDAD': rng.choice(CIUDADES, filas),
+        'FECHA_VISADO': fechas,
+        'NOTIFICADOR': rng.choice(NOTIFICADORES, filas, p=PESOS_NOTIFICADORES),
+        'ESTADO_INFORME': rng.choice(ESTADOS_INFORME, filas, p=pesos_estados / pesos_estados.sum()),
+        'OBSERVACION': rng.choice(['', 'SIN NOVEDAD', 'REQUIERE SEGUNDA VISITA', 'DIRECCION INCOMPLETA'], filas),
+    })
+
+
+def _escribir_hoja(libro, nombre, df):
+    hoja = libro.create_sheet(nombre)
+    hoja.append(list(df.columns))
+    fechas = df['FECHA_VISADO'].dt.to_pydatetime()
+    columnas = [fechas if c == 'FECHA_VISADO' else df[c].tolist() for c in df.columns]
+    for fila in zip(*columnas):
+        hoja.append([None if v is pd.NaT else v for v in fila])
+
+
+def libro_dto_pcl(filas, semilla=0):
+    """Ruta de un .xlsx con `filas` registros repartidos entre DTO y PCL (se genera una sola vez)."""
+    ruta = os.path.join(CARPETA_DATOS, f"dto_pcl_{filas}_{semilla}.xlsx")
+    if not os.path.exists(ruta):
+        mitad = filas // 2
+        if max(mitad, filas - mitad) > FILAS_MAXIMAS_HOJA:
+            raise ValueError(f"{filas} filas no caben en dos hojas de Excel")
+        os.makedirs(CARPETA_DATOS, exist_ok=True)
+        libro = escritura.libro_streaming()
+        _escribir_hoja(libro, 'DTO', generar_dataframe(mitad, semilla))
+        _escribir_hoja(libro, 'PCL', generar_dataframe(filas - mitad, semilla + 1))
+        libro.save(ruta + ".tmp")
+        os.replace(ruta + ".tmp", ruta)
+    return ruta
+
+
+def csv_estado(filas, semilla=0):
+    """Ruta de un .csv con `filas` registros para el informe por estado (se genera una sola vez)."""
+    ruta = os.path.join(CARPETA_DATOS, f"estado_{filas}_{semilla}.csv")
+    if not os.path.exists(ruta):
+        os.makedirs(CARPETA_DATOS, exist_ok=True)
+        generar_dataframe(filas, semilla).to_csv(ruta + ".tmp", index=False, date_format='%Y-%m-%d')
+        os.replace(ruta + ".tmp", ruta)
+    return ruta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+    for filas in args.filas:
+        print(libro_dto_pcl(filas))
+        print(csv_estado(filas))
+
+
+if __name__ == "__main__":
+    main()
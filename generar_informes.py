@@ -0,0 +1,174 @@
+"""Generación de informes por lotes, sin Streamlit.
+
+Uso:
+    python generar_informes.py CARPETA [--salida CARPETA] [--mes Enero | --mes "Todos los meses"] [--procesos N] [--sin-base] [--acumular] [--graficas-nativas] [--conteos-parquet]
+                                [--ano 2024] [--comparar-con 2023] [--max-estados 30]
+
+Por cada .xlsx (con hojas DTO y PCL) se genera el informe del mes (Proceso 1) y el
+informe por estado (Proceso 2); los .csv solo generan el de estado. Los .parquet /
+.arrow generan los dos si tienen una columna HOJA con registros DTO y PCL. Al final se
+muestra el tiempo por archivo y el rendimiento total (archivos/s y filas/s).
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from servicios import desborde
+from servicios import graficos
+from servicios import ingesta
+from servicios import informe_dto_pcl
+from servicios import informe_estado
+
+EXTENSIONES = {".xlsx": "xlsx", ".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+# Terminaciones de los archivos generados (no se vuelven a procesar si la salida está dentro de la carpeta)
+SALIDAS = ("_informe_dto_pcl_mes", "_informe_estado_informe", "_conteos_mes_notificador", "_conteos_estado_notificador")
+
+
+def procesar_archivo(ruta, salida, mes=None, incluir_base=True, acumular=False, graficas_nativas=False,
+                     conteos=False, ano=None, ano_comparacion=None, max_estados=None):
+    """Genera los informes de un archivo y devuelve un resumen con filas, segundos y salidas."""
+    ruta, salida = Path(ruta), Path(salida)
+    tipo = EXTENSIONES[ruta.suffix.lower()]
+    # Objeto tipo archivo como el de st.file_uploader; los archivos grandes se mapean sin leerlos a memoria
+    datos = desborde.abrir(desborde.mapear_ruta(ruta))
+    inicio = time.perf_counter()
+    salidas, avisos = [], []
+
+    hojas = ingesta.nombres_hojas(datos) if tipo == "xlsx" else (
+        ingesta.nombres_hojas_arrow(datos, tipo) if tipo in ingesta.TIPOS_ARROW else [])
+    con_dto_pcl = {'DTO', 'PCL'} <= set(hojas)
+    if con_dto_pcl:
+        # Las columnas de DTO y PCL se revisan con los encabezados antes de leer las hojas
+        problemas = ingesta.validar(datos, tipo, ['DTO', 'PCL'], informe_dto_pcl.COLUMNAS_REQUERIDAS)
+        avisos.extend(problemas)
+        con_dto_pcl = not problemas
+    if con_dto_pcl:
+        # Una sola ejecución: la lectura y el cubo que eligen el mes son los mismos del informe
+        ejecucion = informe_dto_pcl.ejecucion(datos, mes, acumular, graficas_nativas, tipo, ano, ano_comparacion)
+        avisos.extend(ejecucion['rechazadas'])
+        if ejecucion['mes_seleccionado'] is None:
+            avisos.append("Sin fechas de visado en DTO/PCL: no se genera el informe del mes.")
+        else:
+            destino = salida / f"{ruta.stem}_informe_dto_pcl_mes.xlsx"
+            destino.write_bytes(ejecucion['informe'].getvalue())
+            salidas.append(destino.name)
+            if conteos:
+                destino = salida / f"{ruta.stem}_conteos_mes_notificador.parquet"
+                destino.write_bytes(ejecucion['agregados_parquet'])
+                salidas.append(destino.name)
+
+    ejecucion = informe_estado.ejecucion(datos, tipo, incluir_base, avisos, graficas_nativas, max_estados)
+    informe = informe_estado.resultado_informe(ejecucion)
+    if informe is None:
+        # Archivo sin columnas (vacío): es un error del archivo, no un informe vacío
+        raise informe_estado.ErrorInforme("El archivo está vacío (sin columnas): no se genera el informe por estado.")
+    destino = salida / f"{ruta.stem}_informe_estado_informe.xlsx"
+    destino.write_bytes(informe.getvalue())
+    salidas.append(destino.name)
+    if conteos:
+        destino = salida / f"{ruta.stem}_conteos_estado_notificador.parquet"
+        destino.write_bytes(ejecucion['agregados_parquet'])
+        salidas.append(destino.name)
+    filas = int(informe_estado.obtener_cubo(datos, tipo)['CONTEO'].sum())
+
+    return {
+        'archivo': ruta.name,
+        'filas': filas,
+        'segundos': time.perf_counter() - inicio,
+        'salidas': salidas,
+        'avisos': avisos,
+    }
+
+
+def _procesar_o_error(ruta, salida, mes, incluir_base, acumular, graficas_nativas, conteos, ano, ano_comparacion,
+                      max_estados):
+    try:
+        return procesar_archivo(ruta, salida, mes, incluir_base, acumular, graficas_nativas, conteos, ano,
+                                ano_comparacion, max_estados)
+    except Exception as e:
+        return {'archivo': Path(ruta).name, 'error': str(e)}
+
+
+def _iniciar_proceso():
+    # Cada archivo ya va en su propio proceso: las gráficas se dibujan en serie dentro de él
+    graficos.MAX_PROCESOS = 1
+    graficos._iniciar_proceso()
+
+
+def buscar_archivos(carpeta):
+    return sorted(p for p in Path(carpeta).iterdir() if p.is_file() and p.suffix.lower() in EXTENSIONES
+                  and not p.stem.endswith(SALIDAS))
+
+
+def generar_informes(archivos, salida, mes=None, incluir_base=True, procesos=None, acumular=False,
+                     graficas_nativas=False, conteos=False, ano=None, ano_comparacion=None, max_estados=None):
+    """Procesa los archivos en paralelo y va entregando el resumen de cada uno al terminar."""
+    Path(salida).mkdir(parents=True, exist_ok=True)
+    procesos = procesos or min(os.cpu_count() or 1, len(archivos)) or 1
+    if procesos == 1:
+        for ruta in archivos:
+            yield _procesar_o_error(ruta, salida, mes, incluir_base, acumular, graficas_nativas, conteos, ano,
+                                    ano_comparacion, max_estados)
+        return
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_iniciar_proceso) as pool:
+        futuros = [pool.submit(_procesar_o_error, ruta, salida, mes, incluir_base, acumular,
+                               graficas_nativas, conteos, ano, ano_comparacion, max_estados)
+                   for ruta in archivos]
+        for futuro in futuros:
+            yield futuro.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera los informes de notificaciones para todos los archivos de una carpeta.")
+    parser.add_argument("carpeta", help="Carpeta con los archivos .xlsx / .csv / .parquet / .arrow")
+    parser.add_argument("--salida", help="Carpeta de salida (por defecto CARPETA/informes)")
+    parser.add_argument("--mes", choices=list(informe_dto_pcl.meses_en_espanol.values()) + [informe_dto_pcl.TODOS_LOS_MESES],
+                        help="Mes del informe DTO/PCL (por defecto el último mes con datos de cada archivo)")
+    parser.add_argument("--ano", type=int, help="Año de las hojas de mes y TABLA MES (por defecto el más reciente de cada archivo)")
+    parser.add_argument("--comparar-con", type=int, metavar="ANO",
+                        help="Año contra el que se compara en las hojas COMPARATIVA AÑO")
+    parser.add_argument("--procesos", type=int, help="Archivos procesados en paralelo (por defecto uno por CPU)")
+    parser.add_argument("--sin-base", action="store_true", help="No incluir la hoja BASE en el informe por estado")
+    parser.add_argument("--acumular", action="store_true",
+                        help="Guardar los conteos en el almacén local y armar TABLA MES / COMPARATIVA AÑO con los meses acumulados")
+    parser.add_argument("--graficas-nativas", action="store_true",
+                        help="Gráficas nativas de Excel (editables) en lugar de imágenes")
+    parser.add_argument("--conteos-parquet", action="store_true",
+                        help="Guardar también los conteos agregados (mes x notificador, estado x notificador) en Parquet")
+    parser.add_argument("--max-estados", type=int, metavar="N",
+                        help="Mostrar en la gráfica por estado solo los N-1 estados más frecuentes y el resto como OTROS "
+                             "(por defecto 120)")
+    args = parser.parse_args(argv)
+
+    archivos = buscar_archivos(args.carpeta)
+    if not archivos:
+        print(f"No hay archivos .xlsx, .csv, .parquet ni .arrow en {args.carpeta}", file=sys.stderr)
+        return 1
+    salida = Path(args.salida or Path(args.carpeta) / "informes")
+
+    inicio = time.perf_counter()
+    total_filas, errores = 0, 0
+    for r in generar_informes(archivos, salida, args.mes, not args.sin_base, args.procesos, args.acumular,
+                              args.graficas_nativas, args.conteos_parquet, args.ano, args.comparar_con, args.max_estados):
+        if 'error' in r:
+            errores += 1
+            print(f"{r['archivo']}: ERROR {r['error']}", file=sys.stderr)
+            continue
+        total_filas += r['filas']
+        print(f"{r['archivo']}: {r['segundos']:.2f} s, {r['filas']} filas -> {', '.join(r['salidas'])}")
+        for aviso in r['avisos']:
+            print(f"  aviso: {aviso}")
+    segundos = time.perf_counter() - inicio
+
+    print(f"Total: {len(archivos)} archivos en {segundos:.2f} s "
+          f"({len(archivos) / segundos:.2f} archivos/s, {total_filas / segundos:,.0f} filas/s), {errores} con error")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
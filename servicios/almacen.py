@@ -0,0 +1,161 @@
+"""Almacén local de conteos por mes (SQLite).
+
+Cada archivo cargado guarda su cubo de conteos por (HOJA, ANO, MES); las tablas y
+comparativas del año se arman después con lo acumulado, sin volver a leer las filas
+de los meses anteriores.
+
+Los conteos se guardan por archivo (identificado por su cubo) y se suman entre archivos:
+las filas de un export mensual fechadas en otro mes se suman a ese mes en lugar de
+reemplazarlo. Cada archivo tiene un mes principal (el de más registros); cargar otro
+archivo con el mismo mes principal (el mismo export o uno corregido) reemplaza al anterior.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from servicios import cubo as cubo_conteos
+
+RUTA_ALMACEN = Path(os.environ.get("NOTIFICACIONES_ALMACEN",
+                                   Path(__file__).resolve().parent.parent / "datos" / "agregados.sqlite"))
+
+_lock = threading.Lock()
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS conteos (
+    HOJA TEXT NOT NULL,
+    ANO INTEGER NOT NULL,
+    MES INTEGER NOT NULL,
+    NOTIFICADOR TEXT,
+    ESTADO_INFORME TEXT,
+    CONTEO INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS conteos_mes ON conteos (HOJA, ANO, MES);
+CREATE TABLE IF NOT EXISTS archivos (
+    ARCHIVO TEXT PRIMARY KEY,
+    ANO INTEGER NOT NULL,
+    MES INTEGER NOT NULL
+);
+"""
+
+
+def _migrar(conexion):
+    # Almacenes de antes de guardar por archivo: sus filas quedan sin ARCHIVO y se reemplazan por mes
+    if 'ARCHIVO' not in {fila[1] for fila in conexion.execute("PRAGMA table_info(conteos)")}:
+        conexion.execute("ALTER TABLE conteos ADD COLUMN ARCHIVO TEXT")
+    conexion.execute("CREATE INDEX IF NOT EXISTS conteos_archivo ON conteos (ARCHIVO)")
+
+
+@contextmanager
+def conectar(ruta=None):
+    """Conexión dentro de una transacción (commit al salir sin error) que se cierra al terminar."""
+    ruta = Path(ruta or RUTA_ALMACEN)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    # timeout: varios procesos (CLI por lotes) pueden escribir a la vez
+    conexion = sqlite3.connect(ruta, timeout=30)
+    try:
+        conexion.executescript(_ESQUEMA)
+        _migrar(conexion)
+        with conexion:
+            yield conexion
+    finally:
+        conexion.close()
+
+
+def _texto(valor):
+    return None if pd.isna(valor) else str(valor)
+
+
+def huella_cubo(cubo):
+    """Identificador de un archivo cargado: el mismo contenido da el mismo cubo y la misma huella."""
+    ordenado = cubo.sort_values(cubo_conteos.DIMENSIONES, na_position='first').reset_index(drop=True)
+    filas = pd.util.hash_pandas_object(ordenado.astype(object), index=False)
+    return hashlib.blake2b(filas.to_numpy().tobytes(), digest_size=16).hexdigest()
+
+
+def mes_principal(cubo):
+    """(ANO, MES) con más registros del cubo (el más reciente si empatan), o None si no hay fechas."""
+    por_mes = cubo.dropna(subset=['ANO', 'MES']).groupby(['ANO', 'MES'])['CONTEO'].sum()
+    if por_mes.empty:
+        return None
+    ano, mes = max(por_mes.items(), key=lambda item: (item[1], item[0]))[0]
+    return int(ano), int(mes)
+
+
+def guardar_cubo(cubo, ruta=None):
+    """Guarda los conteos de un archivo y devuelve los meses (HOJA, ANO, MES) que trae.
+
+    Reemplaza lo guardado por archivos con el mismo mes principal (incluido este mismo
+    archivo) y, de almacenes anteriores, las filas de ese mes. Las filas sin fecha de
+    visado no pertenecen a ningún mes y no se guardan (tampoco cuentan en TABLA MES ni
+    en la comparativa).
+    """
+    cubo = cubo.dropna(subset=['ANO', 'MES'])
+    principal = mes_principal(cubo)
+    if principal is None:
+        return []
+    archivo = huella_cubo(cubo)
+    meses = sorted({(h, int(a), int(m)) for h, a, m in zip(cubo['HOJA'], cubo['ANO'], cubo['MES'])})
+    filas = [
+        (h, int(a), int(m), _texto(n), _texto(e), int(c), archivo)
+        for h, a, m, n, e, c in zip(cubo['HOJA'], cubo['ANO'], cubo['MES'],
+                                    cubo['NOTIFICADOR'], cubo['ESTADO_INFORME'], cubo['CONTEO'])
+    ]
+    with _lock, conectar(ruta) as conexion:
+        anteriores = [fila[0] for fila in conexion.execute(
+            "SELECT ARCHIVO FROM archivos WHERE ANO = ? AND MES = ?", principal)] + [archivo]
+        conexion.executemany("DELETE FROM conteos WHERE ARCHIVO = ?", [(a,) for a in anteriores])
+        conexion.executemany("DELETE FROM archivos WHERE ARCHIVO = ?", [(a,) for a in anteriores])
+        conexion.executemany("DELETE FROM conteos WHERE ARCHIVO IS NULL AND HOJA = ? AND ANO = ? AND MES = ?",
+                             [(h, a, m) for h, a, m in meses if (a, m) == principal])
+        conexion.executemany("INSERT INTO conteos (HOJA, ANO, MES, NOTIFICADOR, ESTADO_INFORME, CONTEO, ARCHIVO) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)", filas)
+        conexion.execute("INSERT INTO archivos VALUES (?, ?, ?)", (archivo,) + principal)
+    return meses
+
+
+def cubo_almacenado(hojas=None, anos=None, ruta=None):
+    """Cubo con los conteos guardados (sumados entre archivos), opcionalmente solo de algunas hojas y años."""
+    condiciones, parametros = [], []
+    for columna, valores in (('HOJA', hojas), ('ANO', anos)):
+        if valores is not None:
+            valores = list(valores)
+            condiciones.append(f"{columna} IN ({', '.join('?' * len(valores))})")
+            parametros.extend(int(v) if columna == 'ANO' else v for v in valores)
+    # Los conteos de todos los archivos se suman por dimensión
+    consulta = "SELECT HOJA, ANO, MES, NOTIFICADOR, ESTADO_INFORME, SUM(CONTEO) AS CONTEO FROM conteos"
+    if condiciones:
+        consulta += " WHERE " + " AND ".join(condiciones)
+    consulta += " GROUP BY HOJA, ANO, MES, NOTIFICADOR, ESTADO_INFORME"
+
+    with _lock, conectar(ruta) as conexion:
+        cubo = pd.read_sql_query(consulta, conexion, params=parametros)
+    if cubo.empty:
+        return cubo_conteos.construir_cubo({})
+    cubo['ANO'] = cubo['ANO'].astype('Int64')
+    cubo['MES'] = cubo['MES'].astype('Int64')
+    for dimension in ['NOTIFICADOR', 'ESTADO_INFORME']:
+        cubo[dimension] = cubo[dimension].astype(object)
+    return cubo
+
+
+def anos_guardados(hojas=None, ruta=None):
+    """Años con conteos guardados (de algunas hojas si se indican)."""
+    consulta, parametros = "SELECT DISTINCT ANO FROM conteos", []
+    if hojas is not None:
+        hojas = list(hojas)
+        consulta += f" WHERE HOJA IN ({', '.join('?' * len(hojas))})"
+        parametros = hojas
+    with _lock, conectar(ruta) as conexion:
+        return sorted(int(fila[0]) for fila in conexion.execute(consulta, parametros))
+
+
+def acumular(cubo, hojas, ruta=None, anos_extra=()):
+    """Guarda el cubo de un archivo y devuelve lo acumulado para los años que trae ese archivo (y `anos_extra`)."""
+    guardar_cubo(cubo_conteos.filtrar(cubo, HOJA=list(hojas)), ruta)
+    anos = sorted({int(a) for a in cubo['ANO'].dropna()} | {int(a) for a in anos_extra})
+    return cubo_almacenado(hojas, anos, ruta)
@@ -0,0 +1,105 @@
+from io import BytesIO
+
+import pandas as pd
+
+from servicios import ingesta
+from servicios.fechas import convertir_fechas
+
+# Dimensiones del cubo de conteos; cada gráfica o tabla es una suma sobre un corte del cubo
+DIMENSIONES = ['HOJA', 'ANO', 'MES', 'NOTIFICADOR', 'ESTADO_INFORME']
+# Columna del archivo de la que sale cada dimensión (para avisar de las filas sin valor)
+COLUMNA_DIMENSION = {'ANO': 'FECHA_VISADO', 'MES': 'FECHA_VISADO', 'NOTIFICADOR': 'NOTIFICADOR',
+                     'ESTADO_INFORME': 'ESTADO_INFORME'}
+
+
+def construir_cubo(hojas):
+    """Agrupa una sola vez {hoja: DataFrame} en conteos por (HOJA, ANO, MES, NOTIFICADOR, ESTADO_INFORME)."""
+    partes = []
+    for nombre, df in hojas.items():
+        vacia = pd.Series(pd.NA, index=df.index, dtype="object")
+        if 'FECHA_VISADO' in df.columns:
+            fechas = convertir_fechas(df['FECHA_VISADO'])
+            ano, mes = fechas.dt.year.astype('Int64'), fechas.dt.month.astype('Int64')
+        else:
+            ano, mes = vacia.astype('Int64'), vacia.astype('Int64')
+
+        claves = pd.DataFrame({
+            'HOJA': nombre,
+            'ANO': ano,
+            'MES': mes,
+            'NOTIFICADOR': df['NOTIFICADOR'] if 'NOTIFICADOR' in df.columns else vacia,
+            'ESTADO_INFORME': df['ESTADO_INFORME'] if 'ESTADO_INFORME' in df.columns else vacia,
+        })
+        # dropna=False conserva las filas sin fecha o sin estado; cada corte decide qué descartar
+        parte = claves.groupby(DIMENSIONES, dropna=False, observed=True).size().rename('CONTEO').reset_index()
+        partes.append(parte)
+
+    if not partes:
+        return pd.DataFrame(columns=DIMENSIONES + ['CONTEO'])
+    cubo = pd.concat(partes, ignore_index=True)
+    # El cubo es chico: las categorías de cada hoja se pasan a texto para poder combinarlas
+    for dimension in ['NOTIFICADOR', 'ESTADO_INFORME']:
+        if isinstance(cubo[dimension].dtype, pd.CategoricalDtype):
+            cubo[dimension] = cubo[dimension].astype(object)
+    return cubo
+
+
+def combinar(cubos):
+    """Suma varios cubos (por ejemplo, uno por bloque de un CSV) en uno solo."""
+    cubos = [c for c in cubos if len(c)]
+    if not cubos:
+        return construir_cubo({})
+    return pd.concat(cubos, ignore_index=True).groupby(DIMENSIONES, dropna=False)['CONTEO'].sum().reset_index()
+
+
+def clave_cubo(archivo, clave_hojas):
+    return ("cubo", ingesta.hash_contenido(ingesta.leer_bytes(archivo)), clave_hojas)
+
+
+def obtener_cubo(archivo, hojas, clave_hojas):
+    """Cubo memorizado por contenido del archivo; `hojas` es una función que devuelve {hoja: DataFrame}."""
+    return ingesta.memorizar(clave_cubo(archivo, clave_hojas), lambda: construir_cubo(hojas()))
+
+
+# ------------------------------------------------------------------------------- CORTES -------------------------------------------------------------
+def filtrar(cubo, **filtros):
+    # Cada filtro es una lista de valores aceptados para esa dimensión (None = sin filtro)
+    mascara = pd.Series(True, index=cubo.index)
+    for dimension, valores in filtros.items():
+        if valores is not None:
+            mascara &= cubo[dimension].isin(valores)
+    return cubo[mascara]
+
+
+def conteo_por(cubo, por, **filtros):
+    """Suma de CONTEO agrupada por las dimensiones `por` (las claves vacías se descartan como en un groupby)."""
+    return filtrar(cubo, **filtros).groupby(por, observed=True)['CONTEO'].sum()
+
+
+def tabla(cubo, filas, columnas, **filtros):
+    """Tabla cruzada filas x columnas, equivalente a groupby([filas, columnas]).size().unstack(fill_value=0)."""
+    return conteo_por(cubo, [filas, columnas], **filtros).unstack(fill_value=0)
+
+
+def rechazadas(cubo, dimensiones, **filtros):
+    """{columna: filas} sin valor válido en cada una de las `dimensiones` (no entran en los conteos que la usan).
+
+    Las filas sin fecha, notificador ni estado no se cuentan: son filas en blanco del archivo.
+    """
+    cubo = filtrar(cubo, **filtros)
+    cubo = cubo[~cubo[['ANO', 'NOTIFICADOR', 'ESTADO_INFORME']].isna().all(axis=1)]
+    return {COLUMNA_DIMENSION[d]: int(cubo.loc[cubo[d].isna(), 'CONTEO'].sum()) for d in dimensiones}
+
+
+def avisos_rechazadas(cubo, dimensiones, **filtros):
+    return [f"{filas} filas sin un valor válido de {columna} no se cuentan en el informe."
+            for columna, filas in rechazadas(cubo, dimensiones, **filtros).items() if filas]
+
+
+# ------------------------------------------------------------------------------- EXPORTACIÓN -------------------------------------------------------------
+def exportar_parquet(cubo, por, **filtros):
+    """Conteos agrupados por `por` en formato largo (una columna por dimensión + CONTEO) como bytes Parquet."""
+    conteo = conteo_por(cubo, por, **filtros).reset_index(name='CONTEO')
+    salida = BytesIO()
+    conteo.to_parquet(salida, index=False)
+    return salida.getvalue()
@@ -0,0 +1,158 @@
+"""Archivos grandes en disco en lugar de memoria.
+
+Un archivo subido o un informe generado que supera UMBRAL_MB se escribe una vez en un
+archivo temporal y se mapea en memoria (mmap de solo lectura). Todas las etapas leen
+ese mismo mapeo con ``abrir()``, sin copiarlo; el sistema puede liberar esas páginas
+cuando falta memoria porque siempre se pueden volver a leer del disco. Los temporales
+no tienen nombre: desaparecen cuando nadie usa el mapeo. Un mismo contenido se pasa a
+disco una sola vez mientras su mapeo siga en uso.
+
+La huella de un archivo subido (la clave de todas las caches) se calcula una sola vez:
+``Contenido`` son los bytes de la subida con su huella, y el mmap de ``compartir`` la hereda.
+"""
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+import threading
+import weakref
+from functools import cached_property
+from io import BytesIO
+
+# Tamaño desde el que un archivo (subido o generado) se pasa a disco
+UMBRAL_MB = float(os.environ.get("NOTIFICACIONES_DESBORDE_MB", 16))
+# Carpeta de los temporales (por defecto la del sistema)
+RUTA_TEMPORAL = os.environ.get("NOTIFICACIONES_TEMPORAL") or None
+
+
+_compartidos = weakref.WeakValueDictionary()  # huella del contenido -> mmap en uso
+_huellas = weakref.WeakKeyDictionary()  # mmap en uso -> huella de su contenido
+_lock = threading.Lock()
+
+
+def _umbral():
+    return UMBRAL_MB * 1024 ** 2
+
+
+def _mapear(archivo):
+    return mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# ------------------------------------------------------------------------------- CONTENIDO -------------------------------------------------------------
+class Contenido(bytes):
+    """Bytes de un archivo subido que calculan su huella una sola vez (la vista los guarda en la sesión)."""
+
+    @cached_property
+    def huella(self):
+        return hashlib.blake2b(self, digest_size=16).hexdigest()
+
+
+def huella(datos):
+    """Huella del contenido (bytes o mmap); la de un Contenido o un mapeo de compartir() ya está calculada."""
+    if isinstance(datos, Contenido):
+        return datos.huella
+    if isinstance(datos, mmap.mmap) and datos in _huellas:
+        return _huellas[datos]
+    return hashlib.blake2b(datos, digest_size=16).hexdigest()
+
+
+def compartir(datos):
+    """Los mismos bytes si son pocos; si superan el umbral, un mmap de una copia en disco."""
+    if isinstance(datos, mmap.mmap) or len(datos) < max(_umbral(), 1):
+        return datos
+    clave = huella(datos)
+    with _lock:
+        mapeo = _compartidos.get(clave)
+        if mapeo is None:
+            with tempfile.TemporaryFile(dir=RUTA_TEMPORAL) as temporal:
+                temporal.write(datos)
+                temporal.flush()
+                mapeo = _mapear(temporal)  # El mapeo sigue válido después de cerrar el archivo
+            _compartidos[clave] = mapeo
+            _huellas[mapeo] = clave
+    return mapeo
+
+
+def mapear_ruta(ruta):
+    """Contenido de un archivo en disco: mmap si supera el umbral, bytes si no."""
+    if os.path.getsize(ruta) < max(_umbral(), 1):
+        with open(ruta, "rb") as f:
+            return f.read()
+    with open(ruta, "rb") as f:
+        return _mapear(f)
+
+
+class _Vista(io.RawIOBase):
+    # Lectura con posición propia sobre un buffer compartido (cada lector copia solo lo que pide)
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self._vista = memoryview(buffer)
+        self._posicion = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, destino):
+        n = max(0, min(len(destino), len(self._vista) - self._posicion))
+        destino[:n] = self._vista[self._posicion:self._posicion + n]
+        self._posicion += n
+        return n
+
+    def seek(self, desplazamiento, desde=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._posicion, io.SEEK_END: len(self._vista)}[desde]
+        self._posicion = max(0, base + desplazamiento)
+        return self._posicion
+
+    def tell(self):
+        return self._posicion
+
+
+class _LectorContenido(BytesIO):
+    # BytesIO copia los bytes de una subclase: getvalue() devuelve el Contenido original, con su huella
+    def __init__(self, contenido):
+        super().__init__(contenido)
+        self._contenido = contenido
+
+    def getvalue(self):
+        return self._contenido
+
+
+class Lector(io.BufferedReader):
+    """Archivo de solo lectura sobre un mmap; ``getvalue()`` devuelve el mmap (como BytesIO los bytes)."""
+
+    def __init__(self, buffer):
+        super().__init__(_Vista(buffer))
+
+    def getvalue(self):
+        return self.raw.buffer
+
+
+def abrir(datos):
+    """Objeto tipo archivo para leer `datos` (bytes, mmap o una vista de un mmap) sin copiarlos."""
+    if isinstance(datos, (mmap.mmap, memoryview)):
+        return Lector(datos)
+    if isinstance(datos, Contenido):
+        return _LectorContenido(datos)
+    return BytesIO(datos)
+
+
+# ------------------------------------------------------------------------------- SALIDAS -------------------------------------------------------------
+class Salida(tempfile.SpooledTemporaryFile):
+    """Destino para ``libro.save``: en memoria hasta el umbral y, si lo supera, en un temporal en disco."""
+
+    def __init__(self):
+        super().__init__(max_size=int(_umbral()), dir=RUTA_TEMPORAL)
+
+    def contenido(self):
+        """Lo escrito (bytes, o un mmap del temporal si superó el umbral), para leerlo con ``abrir``. Cierra la salida."""
+        with self:
+            if self.seek(0, io.SEEK_END) < max(_umbral(), 1):
+                self.seek(0)
+                return self.read()
+            self.rollover()
+            self.flush()
+            return _mapear(self)
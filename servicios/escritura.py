@@ -0,0 +1,83 @@
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Border, Side, PatternFill, NamedStyle
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.dataframe import dataframe_to_rows
+
+# Estilos de las tablas de los informes
+borde = Border(
+    left=Side(style="thin", color="000000"),
+    right=Side(style="thin", color="000000"),
+    top=Side(style="thin", color="000000"),
+    bottom=Side(style="thin", color="000000")
+)
+fondo_gris = PatternFill(start_color="D9D9D9", end_color="D9D9D9", fill_type="solid")
+fondo_gris_total = PatternFill(start_color="A6A6A6", end_color="A6A6A6", fill_type="solid")
+
+
+def libro_streaming():
+    """Libro de solo escritura: cada fila se escribe a disco al agregarla (memoria constante)."""
+    return Workbook(write_only=True)
+
+
+def escribir_dataframe(hoja, df, header=True):
+    """Agrega el DataFrame fila por fila con hoja.append (sirve para hojas normales y de solo escritura)."""
+    for fila in dataframe_to_rows(df, index=False, header=header):
+        hoja.append(fila)
+
+
+# ------------------------------------------------------------------------------- TABLAS CON ESTILO -------------------------------------------------------------
+# Estilos con nombre: se registran una vez por libro y cada celda solo guarda el nombre,
+# en lugar de crear y buscar un Border/PatternFill por celda.
+def _estilos_tabla():
+    return [
+        NamedStyle(name="tabla", border=borde),
+        NamedStyle(name="tabla_encabezado", border=borde, fill=fondo_gris),
+        NamedStyle(name="tabla_total", border=borde, fill=fondo_gris_total),
+    ]
+
+
+def registrar_estilos(libro):
+    for estilo in _estilos_tabla():
+        if estilo.name not in libro.named_styles:
+            libro.add_named_style(estilo)
+
+
+def anchos_columnas(tabla, encabezado=None):
+    """Ancho de cada columna: largo del texto más largo (sin contar vacíos ni ceros) + 2, vectorizado."""
+    valores = tabla if encabezado is None else pd.concat(
+        [pd.DataFrame([list(encabezado)], columns=tabla.columns), tabla], ignore_index=True)
+    presentes = valores.notna() & (valores != 0) & (valores != '')
+    largos = valores.astype(str).apply(lambda columna: columna.str.len()).where(presentes)
+    return (largos.max().fillna(0).astype(int) + 2).tolist()
+
+
+def escribir_tabla(hoja, tabla, encabezado=None, estilo="tabla", estilo_encabezado="tabla_encabezado",
+                   estilo_ultima=None, ajustar_anchos=True):
+    """Escribe una tabla con bordes a partir de A1, una fila completa por append.
+
+    `tabla` trae los valores tal como se muestran (None = celda vacía con borde); el encabezado
+    es `encabezado` o las columnas del DataFrame. `estilo_ultima` pinta la fila de totales.
+    Sirve para hojas normales y de solo escritura (los anchos se fijan antes de escribir).
+    """
+    registrar_estilos(hoja.parent)
+    encabezado = list(tabla.columns) if encabezado is None else list(encabezado)
+
+    if ajustar_anchos:
+        for col_idx, ancho in enumerate(anchos_columnas(tabla, encabezado), start=1):
+            hoja.column_dimensions[get_column_letter(col_idx)].width = ancho
+
+    def fila(valores, nombre_estilo):
+        celdas = []
+        for valor in valores:
+            c = WriteOnlyCell(hoja, value=None if valor is None or valor is pd.NA else valor)
+            c.style = nombre_estilo
+            celdas.append(c)
+        hoja.append(celdas)
+
+    fila(encabezado, estilo_encabezado)
+    filas = tabla.astype(object).where(tabla.notna(), None).itertuples(index=False, name=None)
+    ultima = len(tabla) - 1
+    for i, valores in enumerate(filas):
+        fila(valores, estilo_ultima if estilo_ultima is not None and i == ultima else estilo)
@@ -0,0 +1,59 @@
+"""Índice por fecha de visado.
+
+Las filas se ordenan una sola vez por FECHA_VISADO; cada mes o rango de fechas es
+después un corte contiguo que se ubica con dos búsquedas binarias, en
+lugar de recorrer toda la columna con una máscara por cada selección. Los años se
+distinguen siempre: Enero de 2023 y Enero de 2024 son cortes distintos.
+"""
+import numpy as np
+import pandas as pd
+
+
+def convertir_fechas(serie, formato="ISO8601"):
+    """Serie como fechas: primero con `formato` (rápido) y lo que no lo cumple con el lector general.
+
+    El lector general toma el día primero (15/03/2024); lo que tampoco entiende queda vacío
+    (NaT) y se cuenta como fila rechazada en el cubo.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    fechas = pd.to_datetime(serie, format=formato, errors='coerce')
+    fallidas = fechas.isna() & serie.notna()
+    if fallidas.any():
+        fechas[fallidas] = pd.to_datetime(serie[fallidas].astype(str), format='mixed', dayfirst=True, errors='coerce')
+    return fechas
+
+
+class IndiceFechas:
+    """Filas de un DataFrame ordenadas por fecha, con cortes por (año, mes) o por rango."""
+
+    def __init__(self, df, columna='FECHA_VISADO'):
+        fechas = convertir_fechas(df[columna]).to_numpy('datetime64[ns]')
+        # Orden estable: las filas de una misma fecha conservan el orden del archivo; las vacías quedan al final
+        orden = np.argsort(fechas, kind='stable')
+        self.df = df.iloc[orden]
+        self._fechas = fechas[orden]
+        self._con_fecha = int(len(fechas) - np.isnat(fechas).sum())
+
+    def __len__(self):
+        return len(self.df)
+
+    def rango(self, desde, hasta):
+        """Filas con desde <= FECHA_VISADO < hasta, en el orden original del archivo."""
+        fechas = self._fechas[:self._con_fecha]
+        inicio, fin = np.searchsorted(fechas, [np.datetime64(pd.Timestamp(desde), 'ns'),
+                                               np.datetime64(pd.Timestamp(hasta), 'ns')])
+        # El corte es chico frente al total: reordenarlo por posición original es barato
+        return self.df.iloc[inicio:fin].sort_index()
+
+    def mes(self, ano, mes):
+        desde = pd.Timestamp(int(ano), int(mes), 1)
+        return self.rango(desde, desde + pd.DateOffset(months=1))
+
+    def meses(self):
+        """(año, mes) con datos, en orden cronológico."""
+        presentes = np.unique(self._fechas[:self._con_fecha].astype('datetime64[M]').astype(np.int64))
+        return [(int(m // 12) + 1970, int(m % 12) + 1) for m in presentes]
+
+    def anos(self):
+        return sorted({ano for ano, _ in self.meses()})
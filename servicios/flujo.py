@@ -0,0 +1,68 @@
+"""Motor mínimo de etapas para los informes.
+
+Cada etapa es una función registrada con las entradas que necesita (otras etapas o
+valores iniciales de la corrida). Al pedir un resultado se resuelven sus entradas,
+cada etapa corre a lo sumo una vez por ejecución y su resultado se comparte con
+todas las que lo usan. Las etapas medidas quedan en el desglose de instrumentacion.
+
+    flujo = Flujo()
+
+    @flujo.etapa('archivo')
+    def lectura(archivo): ...
+
+    flujo.ejecucion(archivo=datos)['lectura']
+"""
+from servicios import instrumentacion
+
+
+class ErrorFlujo(Exception):
+    """Etapa desconocida o dependencias circulares."""
+
+
+class Flujo:
+    def __init__(self):
+        self.etapas = {}
+
+    def etapa(self, *entradas, medir=True, nombre=None):
+        """Registra la función como etapa (con su nombre o `nombre`); `medir=False` para etapas triviales o con medición propia."""
+        def registrar(funcion):
+            self.etapas[nombre or funcion.__name__] = (funcion, entradas, medir)
+            return funcion
+        return registrar
+
+    def ejecucion(self, **valores):
+        return Ejecucion(self, valores)
+
+
+class Ejecucion:
+    """Resultados de una corrida del flujo; `ejecucion[nombre]` corre la etapa (y sus entradas) si falta."""
+
+    def __init__(self, flujo, valores):
+        self._flujo = flujo
+        self.resultados = dict(valores)
+        self.ejecutadas = []  # Etapas en el orden en que corrieron
+        self._en_curso = []
+
+    def __getitem__(self, nombre):
+        if nombre in self.resultados:
+            return self.resultados[nombre]
+        if nombre not in self._flujo.etapas:
+            raise ErrorFlujo(f"Etapa o valor desconocido: {nombre}")
+        if nombre in self._en_curso:
+            raise ErrorFlujo("Dependencia circular: " + " -> ".join(self._en_curso + [nombre]))
+
+        funcion, entradas, medir = self._flujo.etapas[nombre]
+        self._en_curso.append(nombre)
+        try:
+            argumentos = [self[entrada] for entrada in entradas]
+            if medir:
+                with instrumentacion.etapa(nombre):
+                    resultado = funcion(*argumentos)
+            else:
+                resultado = funcion(*argumentos)
+        finally:
+            self._en_curso.pop()
+
+        self.resultados[nombre] = resultado
+        self.ejecutadas.append(nombre)
+        return resultado
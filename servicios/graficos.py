@@ -0,0 +1,385 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from itertools import cycle, islice
+
+import numpy as np
+import pandas as pd
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch
+from openpyxl.chart import BarChart, PieChart, Reference
+from openpyxl.chart.label import DataLabelList
+from openpyxl.chart.marker import DataPoint
+from openpyxl.drawing.image import Image
+
+from servicios.ingesta import CacheLRU
+
+# Imágenes ya dibujadas, por huella de los datos agregados y de las opciones de la gráfica
+# (el tamaño cuenta en el presupuesto de memoria de los trabajos, ver ingesta.memoria_cache_mb)
+MAX_IMAGENES_CACHE = 128
+MAX_MB_IMAGENES_CACHE = float(os.environ.get("NOTIFICACIONES_CACHE_IMAGENES_MB", 0)) or 64
+_imagenes = CacheLRU(MAX_IMAGENES_CACHE, MAX_MB_IMAGENES_CACHE)
+
+# Procesos para dibujar en paralelo; el pool es único por servidor y lo comparten todas las sesiones
+MAX_PROCESOS = int(os.environ.get("NOTIFICACIONES_PROCESOS_GRAFICAS", 0)) or min(os.cpu_count() or 1, 8)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# ------------------------------------------------------------------------------- DIBUJOS -------------------------------------------------------------
+# Cada dibujo recibe solo la tabla agregada y devuelve (figura, opciones de savefig).
+# Se usa Figure directamente (sin pyplot) para no compartir estado entre sesiones.
+def _anotar_barras(ax):
+    for p in ax.patches:
+        ax.annotate(f'{p.get_height()}',
+                    (p.get_x() + p.get_width() / 2., p.get_height()),
+                    xytext=(0, 5),
+                    textcoords='offset points',
+                    ha='center', va='bottom', fontsize=10, color='black')
+
+
+def _sin_datos(ax):
+    # Corte sin filas (por ejemplo, un año sin registros de esos notificadores): gráfica vacía con aviso
+    ax.text(0.5, 0.5, 'Sin datos', ha='center', va='center', fontsize=14, color='gray', transform=ax.transAxes)
+
+
+def barras(conteo, colores, figsize=(12, 8), titulo_leyenda='Notificadores', ajustar=True):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    if conteo.size and conteo.to_numpy().sum():
+        conteo.plot(kind='bar', ax=ax, color=colores)
+        ax.legend(title=titulo_leyenda, bbox_to_anchor=(1.2, 1), loc='upper left', fontsize=10)
+        _anotar_barras(ax)
+    else:
+        _sin_datos(ax)
+    ax.set_xlabel('Mes')
+    ax.set_ylabel('Número de Datos')
+    if ajustar:
+        fig.tight_layout()
+    return fig, dict(transparent=True, bbox_inches="tight")
+
+
+def pastel(conteo, colores, titulo_leyenda='Notificadores'):
+    fig = Figure(figsize=(8, 8))
+    ax = fig.subplots()
+    if conteo.size and conteo.sum():
+        ax.pie(conteo, labels=conteo.index, autopct='%1.1f%%', startangle=90, colors=colores)
+        ax.legend(title=titulo_leyenda, loc='center left', bbox_to_anchor=(1.05, 0.5), fontsize=10)
+    else:
+        ax.axis('off')
+        _sin_datos(ax)
+    fig.tight_layout()
+    return fig, dict(transparent=True, bbox_inches="tight")
+
+
+# Límites de la gráfica por ESTADO_INFORME: el tamaño y el tiempo de dibujo quedan acotados
+# aunque haya cientos de estados (se agrupan en OTROS o se reparten en varias imágenes)
+ESTADOS_POR_IMAGEN = 60
+MAX_ESTADOS = 2 * ESTADOS_POR_IMAGEN  # Sin max_estados, más estados que esto se agrupan en OTROS
+ALTO_BARRAS_ESTADO = 6  # pulgadas
+ANCHO_MAXIMO_PULGADAS = 60
+PIXELES_MAXIMOS_ANCHO = 6000
+DPI_BARRAS_ESTADO = 200
+DPI_MINIMO = 72
+MAX_ETIQUETAS = 150  # Con más barras por imagen no se escribe el valor sobre cada una (un texto por barra)
+ETIQUETA_OTROS = 'OTROS'
+
+
+def agrupar_otros(conteo, max_estados):
+    """Los `max_estados - 1` estados con más registros (en su orden) y el resto sumado en una fila OTROS."""
+    if len(conteo) <= max_estados:
+        return conteo
+    principales = conteo.sum(axis=1).nlargest(max_estados - 1, keep='first').index
+    mantener = conteo.index.isin(principales)
+    otros = conteo[~mantener].sum().rename(ETIQUETA_OTROS).to_frame().T
+    agrupado = pd.concat([conteo[mantener], otros])
+    agrupado.index.name = conteo.index.name
+    return agrupado
+
+
+def paginar(conteo, por_pagina=ESTADOS_POR_IMAGEN):
+    """Parte la tabla en bloques de `por_pagina` estados (una imagen por bloque)."""
+    if len(conteo) <= por_pagina:
+        return [conteo]
+    return [conteo.iloc[inicio:inicio + por_pagina] for inicio in range(0, len(conteo), por_pagina)]
+
+
+def tamano_barras_estado(estados, notificadores):
+    """(figsize, dpi): el ancho crece con las barras hasta un tope y el dpi baja para no pasar de PIXELES_MAXIMOS_ANCHO."""
+    ancho = min(max(15, estados * max(0.4, 0.12 * notificadores)), ANCHO_MAXIMO_PULGADAS)
+    dpi = max(DPI_MINIMO, min(DPI_BARRAS_ESTADO, int(PIXELES_MAXIMOS_ANCHO / ancho)))
+    return (ancho, ALTO_BARRAS_ESTADO), dpi
+
+
+def barras_estado(conteo, colores):
+    estados = conteo.index
+    notificadores = conteo.columns
+    n, k = len(estados), len(notificadores)
+    x = np.arange(n)
+    colores_usar = list(islice(cycle(colores), k))
+
+    total_width = 0.8
+    bar_width = total_width / max(k, 1)
+
+    figsize, dpi = tamano_barras_estado(n, k)
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+
+    # Todas las barras en una sola colección (un artista) en lugar de un Rectangle por barra
+    alturas = conteo.to_numpy(dtype=float)
+    izquierda = x[:, None] + np.arange(k)[None, :] * bar_width - bar_width / 2
+    derecha = izquierda + bar_width
+    base = np.zeros_like(alturas)
+    vertices = np.stack([np.stack(esquina, axis=-1) for esquina in
+                         ((izquierda, base), (izquierda, alturas), (derecha, alturas), (derecha, base))], axis=2)
+    ax.add_collection(PolyCollection(vertices.reshape(-1, 4, 2), facecolors=colores_usar * n, edgecolors='none'))
+    ax.set_xlim(-0.5, n - 0.5 + total_width - bar_width)
+    ax.set_ylim(0, max(alturas.max(initial=0), 1) * 1.08)
+
+    if n * k <= MAX_ETIQUETAS:
+        centros = (izquierda + bar_width / 2).ravel()
+        for xc, yval in zip(centros, alturas.ravel()):
+            ax.text(xc, yval, int(yval), ha='center', va='bottom', fontsize=8)
+
+    ax.set_xticks(x + total_width / 2 - bar_width / 2)
+    ax.set_xticklabels(estados, rotation=90, ha='center', fontsize=7)
+    ax.set_xlabel('Estado de Informe')
+    ax.set_ylabel('Cantidad')
+    ax.set_title('Distribución de Notificadores por Estado de Informe')
+    leyenda = [Patch(facecolor=color, label=notificador) for notificador, color in zip(notificadores, colores_usar)]
+    ax.legend(handles=leyenda, title='Notificadores', bbox_to_anchor=(1.02, 1), loc='upper left')
+    fig.tight_layout()
+    return fig, dict(dpi=dpi, transparent=True)
+
+
+DIBUJOS = {
+    'barras': barras,
+    'pastel': pastel,
+    'barras_estado': barras_estado,
+}
+
+
+# ------------------------------------------------------------------------------- RENDERIZADO -------------------------------------------------------------
+def huella(tipo, datos, opciones):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(tipo.encode())
+    h.update(pd.util.hash_pandas_object(datos, index=True).values.tobytes())
+    if isinstance(datos, pd.DataFrame):
+        h.update(repr(list(datos.columns)).encode())
+    h.update(repr(sorted(opciones.items())).encode())
+    return h.hexdigest()
+
+
+def dibujar_png(tipo, datos, opciones):
+    """Dibuja la gráfica `tipo` y devuelve los bytes del PNG, liberando la figura."""
+    fig, guardado = DIBUJOS[tipo](datos, **opciones)
+    try:
+        imgdata = BytesIO()
+        fig.savefig(imgdata, format='png', **guardado)
+        return imgdata.getvalue()
+    finally:
+        fig.clear()
+
+
+def pedido(tipo, datos, **opciones):
+    """Describe una gráfica sin dibujarla; se resuelve con renderizar_lote."""
+    return (tipo, datos, opciones)
+
+
+# ------------------------------------------------------------------------------- RENDERIZADO EN PARALELO -------------------------------------------------------------
+def _iniciar_proceso():
+    # Backend sin pantalla en los procesos de dibujo
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def obtener_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" evita heredar los hilos del servidor de Streamlit al crear los procesos
+            _pool = ProcessPoolExecutor(max_workers=MAX_PROCESOS,
+                                        mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_iniciar_proceso)
+        return _pool
+
+
+def _reiniciar_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def renderizar_lote(pedidos):
+    """Renderiza una lista de pedidos (tipo, datos, opciones) y devuelve un BytesIO por pedido.
+
+    Las gráficas que no están en cache se dibujan en paralelo en el pool de procesos;
+    a cada proceso solo se le envía la tabla agregada y devuelve los bytes del PNG.
+    """
+    claves = [huella(tipo, datos, opciones) for tipo, datos, opciones in pedidos]
+    pngs = {clave: _imagenes.obtener(clave) for clave in claves}
+    pendientes = {clave: pedido for clave, pedido in zip(claves, pedidos) if pngs[clave] is None}
+
+    if len(pendientes) > 1 and MAX_PROCESOS > 1:
+        try:
+            pool = obtener_pool()
+            futuros = {clave: pool.submit(dibujar_png, *pedido) for clave, pedido in pendientes.items()}
+            for clave, futuro in futuros.items():
+                pngs[clave] = futuro.result()
+        except (BrokenProcessPool, OSError):
+            # Si el pool no está disponible se dibuja en este proceso
+            _reiniciar_pool()
+
+    for clave, pedido in pendientes.items():
+        if pngs[clave] is None:
+            pngs[clave] = dibujar_png(*pedido)
+        _imagenes.guardar(clave, pngs[clave])
+
+    return [BytesIO(pngs[clave]) for clave in claves]
+
+
+class Lote:
+    """Acumula las gráficas de un informe para dibujarlas todas juntas con renderizar_lote."""
+
+    def __init__(self):
+        self._pedidos = []
+        self._destinos = []
+
+    def agregar(self, pedido, destino, rango=None):
+        # rango solo lo usan las gráficas nativas (LoteNativo)
+        self._pedidos.append(pedido)
+        self._destinos.append(destino)
+
+    def renderizar(self):
+        imagenes = renderizar_lote(self._pedidos)
+        resultado = list(zip(self._destinos, imagenes))
+        self._pedidos, self._destinos = [], []
+        return resultado
+
+    def insertar(self):
+        """Dibuja todas las gráficas en paralelo e inserta cada imagen en su (hoja, celda)."""
+        for (hoja, celda), imagen in self.renderizar():
+            hoja.add_image(Image(imagen), celda)
+
+
+# ------------------------------------------------------------------------------- GRÁFICAS NATIVAS DE EXCEL -------------------------------------------------------------
+# Alternativa a las imágenes: gráficas de Excel que leen sus datos de celdas del libro. No se
+# dibuja nada, el archivo pesa menos y la gráfica se actualiza si se editan los números.
+CM_POR_PULGADA = 1.6  # Tamaño de la gráfica nativa a partir del figsize del dibujo equivalente
+COLUMNA_TABLAS_NATIVAS = 24  # Columna X: las tablas de datos quedan a la derecha de las gráficas ancladas en E
+
+
+def _valor(v):
+    return v.item() if hasattr(v, 'item') else v
+
+
+def escribir_tabla(hoja, datos, fila=1, columna=1):
+    """Escribe `datos` (Series o DataFrame) con encabezado y categorías en la primera columna.
+
+    Devuelve el rango (fila_min, col_min, fila_max, col_max). En hojas de solo escritura las
+    filas se agregan con append, así que la tabla debe ser lo primero de la hoja.
+    """
+    tabla = datos.to_frame() if isinstance(datos, pd.Series) else datos
+    filas = [[tabla.index.name or ''] + [str(c) for c in tabla.columns]]
+    filas += [[_valor(i)] + [_valor(v) for v in valores] for i, valores in zip(tabla.index, tabla.itertuples(index=False))]
+    if hoja.parent.write_only:
+        for valores in filas:
+            hoja.append(valores)
+        fila, columna = 1, 1
+    else:
+        for r, valores in enumerate(filas, start=fila):
+            for c, valor in enumerate(valores, start=columna):
+                hoja.cell(row=r, column=c, value=valor)
+    return fila, columna, fila + len(filas) - 1, columna + len(filas[0]) - 1
+
+
+def _barras_nativa(hoja, rango, colores, figsize=(12, 8), titulo=None, eje_x='Mes', eje_y='Número de Datos'):
+    fila_min, col_min, fila_max, col_max = rango
+    grafica = BarChart()
+    grafica.type = "col"
+    grafica.title = titulo
+    grafica.x_axis.title = eje_x
+    grafica.y_axis.title = eje_y
+    grafica.add_data(Reference(hoja, min_col=col_min + 1, max_col=col_max, min_row=fila_min, max_row=fila_max),
+                     titles_from_data=True)
+    grafica.set_categories(Reference(hoja, min_col=col_min, min_row=fila_min + 1, max_row=fila_max))
+    for serie, color in zip(grafica.series, cycle(colores)):
+        serie.graphicalProperties.solidFill = color.lstrip('#')
+        serie.graphicalProperties.line.solidFill = color.lstrip('#')
+    grafica.dataLabels = DataLabelList()
+    grafica.dataLabels.showVal = True
+    grafica.legend.position = 'r'
+    grafica.width, grafica.height = figsize[0] * CM_POR_PULGADA, figsize[1] * CM_POR_PULGADA
+    return grafica
+
+
+def _pastel_nativa(hoja, rango, colores, figsize=(8, 8)):
+    fila_min, col_min, fila_max, _ = rango
+    grafica = PieChart()
+    grafica.add_data(Reference(hoja, min_col=col_min + 1, min_row=fila_min, max_row=fila_max), titles_from_data=True)
+    grafica.set_categories(Reference(hoja, min_col=col_min, min_row=fila_min + 1, max_row=fila_max))
+    serie = grafica.series[0]
+    for idx, color in zip(range(fila_max - fila_min), cycle(colores)):
+        punto = DataPoint(idx=idx)
+        punto.graphicalProperties.solidFill = color.lstrip('#')
+        serie.dPt.append(punto)
+    grafica.dataLabels = DataLabelList()
+    grafica.dataLabels.showPercent = True
+    grafica.legend.position = 'r'
+    grafica.width, grafica.height = figsize[0] * CM_POR_PULGADA, figsize[1] * CM_POR_PULGADA
+    return grafica
+
+
+def _nativa(tipo, hoja, rango, opciones):
+    # Mismas opciones que el dibujo equivalente; las que solo afectan al PNG se ignoran
+    if tipo == 'pastel':
+        return _pastel_nativa(hoja, rango, opciones['colores'])
+    if tipo == 'barras_estado':
+        figsize, _ = tamano_barras_estado(rango[2] - rango[0], rango[3] - rango[1])
+        return _barras_nativa(hoja, rango, opciones['colores'], figsize=figsize,
+                              titulo='Distribución de Notificadores por Estado de Informe',
+                              eje_x='Estado de Informe', eje_y='Cantidad')
+    return _barras_nativa(hoja, rango, opciones['colores'], figsize=opciones.get('figsize', (12, 8)))
+
+
+def grafica_nativa(pedido, hoja, ancla, rango=None):
+    """Agrega a `hoja` la gráfica nativa del pedido en `ancla`.
+
+    `rango` apunta a una tabla que ya está en la hoja (encabezado en la primera fila,
+    categorías en la primera columna); si no se da, la tabla del pedido se escribe en A1.
+    """
+    tipo, datos, opciones = pedido
+    if rango is None:
+        rango = escribir_tabla(hoja, datos)
+    hoja.add_chart(_nativa(tipo, hoja, rango, opciones), ancla)
+
+
+class LoteNativo:
+    """Como Lote, pero inserta gráficas nativas de Excel en lugar de imágenes.
+
+    Las tablas de cada gráfica se escriben a la derecha de lo que ya tiene la hoja (y de
+    las gráficas), una debajo de otra, salvo que `rango` indique una tabla del informe que ya tiene esos datos.
+    """
+
+    def __init__(self):
+        self._pendientes = []
+
+    def agregar(self, pedido, destino, rango=None):
+        self._pendientes.append((pedido, destino, rango))
+
+    def insertar(self):
+        siguiente = {}  # hoja -> (fila, columna) libre para la próxima tabla de datos
+        for pedido, (hoja, celda), rango in self._pendientes:
+            if rango is None:
+                fila, columna = siguiente.get(hoja.title, (1, max(hoja.max_column + 2, COLUMNA_TABLAS_NATIVAS)))
+                rango = escribir_tabla(hoja, pedido[1], fila, columna)
+                siguiente[hoja.title] = (rango[2] + 2, columna)
+            hoja.add_chart(_nativa(pedido[0], hoja, rango, pedido[2]), celda)
+        self._pendientes = []
@@ -0,0 +1,406 @@
+"""Informe DTO/PCL por mes (Proceso 1) sin dependencias de Streamlit."""
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from servicios import almacen
+from servicios import desborde
+from servicios import ingesta
+from servicios import instrumentacion
+from servicios import cubo as cubo_conteos
+from servicios import graficos
+from servicios import escritura
+from servicios import paquete
+from servicios.fechas import IndiceFechas
+from servicios.flujo import Flujo
+
+# Colores 
+colores = ['#FFB897', '#B8E6A7', '#809bce', "#64a09d", '#CBE6FF', '#E6E6FA']
+# Meses 
+meses_en_espanol = {
+    1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril', 5: 'Mayo', 6: 'Junio', 
+    7: 'Julio', 8: 'Agosto', 9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'
+}
+# Opción para generar las hojas de todos los meses en una sola corrida
+TODOS_LOS_MESES = 'Todos los meses'
+# Columnas que deben tener las hojas DTO y PCL (se validan solo con los encabezados)
+COLUMNAS_REQUERIDAS = ['FECHA_VISADO', 'NOTIFICADOR']
+
+# ------------------------------------------------------------------------------- GRÁFICOS DE BARRAS -------------------------------------------------------------
+# Cada función devuelve el pedido de la gráfica; se dibujan todas juntas en memoria (servicios/graficos.py)
+def graficas_barras(conteo, colores, nombre_hoja):
+    # conteo: tabla MES x NOTIFICADOR sacada del cubo
+    conteo = conteo.copy()
+    conteo.index = conteo.index.map(lambda m: meses_en_espanol[m].capitalize())
+    num_meses = len(conteo)
+    num_notificadores = len(conteo.columns)
+    fig_width = max(12, num_meses * 1.2)
+    fig_height = max(8, num_notificadores * 1.0)
+    return graficos.pedido('barras', conteo, colores=colores, figsize=(fig_width, fig_height),
+                           titulo_leyenda='NOTIFICADOR', ajustar=False)
+
+
+def graficas_barras_comparativa(conteo, nombre_hoja):
+    # conteo: tabla MES x NOTIFICADOR ya filtrada a BELISARIO 397 y GESTAR INNOVACION
+    conteo = conteo.copy()
+    conteo.index = conteo.index.map(lambda m: meses_en_espanol[m].capitalize())
+    return graficos.pedido('barras', conteo, colores=colores)
+
+def graficas_barras_belisario_utmdl(conteo, nombre_hoja, mes):
+    # conteo: tabla MES x NOTIFICADOR de BELISARIO y UTMDL para el mes seleccionado
+    conteo = conteo.copy()
+    conteo.index = conteo.index.map(lambda m: meses_en_espanol[m].capitalize())
+    return graficos.pedido('barras', conteo, colores=colores)
+# ------------------------------------------------------------------------------- GRÁFICOS DE PASTEL -------------------------------------------------------------
+def graficas_pastel(conteo, nombre_hoja):
+    # conteo: total por MES
+    conteo = conteo.copy()
+    conteo.index = conteo.index.map(lambda m: meses_en_espanol[m].capitalize())  
+    return graficos.pedido('pastel', conteo, colores=colores, titulo_leyenda='Meses')
+
+def graficas_pastel_belisario_utmdl(conteo, nombre_hoja):
+    # conteo: total por NOTIFICADOR (BELISARIO y UTMDL)
+    return graficos.pedido('pastel', conteo, colores=colores)
+
+def graficapastel_ano(conteo, nombre_hoja):
+    # conteo: total por NOTIFICADOR (BELISARIO 397 y GESTAR INNOVACION)
+    return graficos.pedido('pastel', conteo, colores=colores)
+# ------------------------------------------------------------------------------- HOJAS -------------------------------------------------------------
+def filtro_ano(ano):
+    # Filtro del cubo para el año seleccionado (None: el archivo no tiene fechas, no se filtra)
+    return None if ano is None else [ano]
+
+# Hoja de cada mes (DTO_<mes> / PCL_<mes>) con sus filas y gráficas
+def escribir_hoja_mes(libro, nombre_hoja, df_mes, ano, mes, cubo, origen, lote, conteo_notificador):
+    # Crear la hoja en el libro
+    if nombre_hoja in libro.sheetnames:
+        del libro[nombre_hoja]
+    hoja = libro.create_sheet(nombre_hoja)
+
+    # Escribir los datos filtrados, una fila completa a la vez
+    escritura.escribir_dataframe(hoja, df_mes)
+
+    # Generar gráficos de barras y pastel por mes
+    conteo_mes = cubo_conteos.tabla(cubo, 'MES', 'NOTIFICADOR', HOJA=[origen], NOTIFICADOR=['BELISARIO', 'UTMDL'],
+                                    ANO=filtro_ano(ano), MES=[mes])
+    lote.agregar(graficas_barras_belisario_utmdl(conteo_mes, nombre_hoja, mes), (hoja, 'E5'))  # Ahora pasa el mes
+
+    # Gráfica de pastel para BELISARIO y UTMDL (la misma en todos los meses: se calcula y dibuja una vez)
+    lote.agregar(graficas_pastel_belisario_utmdl(conteo_notificador, nombre_hoja), (hoja, 'E35'))  # Colocar la imagen más abajo en la hoja
+
+# Hoja "COMPARATIVA AÑO": conteos del año seleccionado o, con ano_comparacion, de los dos años lado a lado
+def conteos_comparativa(cubo, filtros, ano, ano_comparacion=None):
+    """(tabla MES x NOTIFICADOR para las barras, total por NOTIFICADOR para el pastel)."""
+    if ano_comparacion is None or ano is None:
+        return (cubo_conteos.tabla(cubo, 'MES', 'NOTIFICADOR', ANO=filtro_ano(ano), **filtros),
+                cubo_conteos.conteo_por(cubo, 'NOTIFICADOR', ANO=filtro_ano(ano), **filtros))
+
+    # Una serie por notificador y año ("BELISARIO 397 2023", "BELISARIO 397 2024", ...)
+    anos = sorted({int(ano), int(ano_comparacion)})
+    barras = cubo_conteos.conteo_por(cubo, ['MES', 'NOTIFICADOR', 'ANO'], ANO=anos, **filtros)
+    barras = barras.unstack(['NOTIFICADOR', 'ANO'], fill_value=0).sort_index(axis=1)
+    barras.columns = [f"{notificador} {a}" for notificador, a in barras.columns]
+    pastel = cubo_conteos.conteo_por(cubo, ['NOTIFICADOR', 'ANO'], ANO=anos, **filtros)
+    pastel.index = [f"{notificador} {a}" for notificador, a in pastel.index]
+    return barras, pastel
+
+
+def crear_comparativa_ano_dto(libro, cubo, lote, ano, ano_comparacion=None):
+    # Crear la hoja "COMPARATIVA AÑO DTO"
+    if "COMPARATIVA AÑO DTO" in libro.sheetnames:
+        del libro["COMPARATIVA AÑO DTO"]
+    hoja = libro.create_sheet("COMPARATIVA AÑO DTO")
+
+    # Solo los datos de BELISARIO397 y GESTAR INNOVACION
+    filtros = dict(HOJA=['DTO'], NOTIFICADOR=['BELISARIO 397', 'GESTAR INNOVACION'])
+    barras, pastel = conteos_comparativa(cubo, filtros, ano, ano_comparacion)
+
+    # Generar el gráfico de barras comparativo
+    lote.agregar(graficas_barras_comparativa(barras, "COMPARATIVA AÑO DTO"), (hoja, 'E5'))
+
+    # Generar gráfico de pastel comparativo
+    lote.agregar(graficapastel_ano(pastel, "COMPARATIVA AÑO DTO"), (hoja, 'E20'))
+# Hoja "COMPARATIVA AÑO PCL"
+def crear_comparativa_ano_pcl(libro, cubo, lote, ano, ano_comparacion=None):
+    if "COMPARATIVA AÑO PCL" in libro.sheetnames:
+        del libro["COMPARATIVA AÑO PCL"]
+    hoja = libro.create_sheet("COMPARATIVA AÑO PCL")
+
+    # Solo los datos de BELISARIO397 y GESTAR INNOVACION
+    filtros = dict(HOJA=['PCL'], NOTIFICADOR=['BELISARIO 397', 'GESTAR INNOVACION'])
+    barras, pastel = conteos_comparativa(cubo, filtros, ano, ano_comparacion)
+
+    # Generar el gráfico de barras comparativo
+    lote.agregar(graficas_barras_comparativa(barras, "COMPARATIVA AÑO PCL"), (hoja, 'E5'))
+
+    # Generar gráfico de pastel comparativo
+    lote.agregar(graficapastel_ano(pastel, "COMPARATIVA AÑO DTO"), (hoja, 'E20'))
+
+# ------------------------------------------------------------------------------- GENERAR TABLAS PARA DTO Y PCL: TABLA MES -------------------------------------------------------------
+def generar_tablas_dto_y_pcl(libro, cubo, lote, ano):
+    def crear_hoja(nombre_hoja, origen):
+        # Solo los meses del año seleccionado (Enero de otro año no se suma a este)
+        filtros = dict(HOJA=[origen], ANO=filtro_ano(ano))
+        conteo = cubo_conteos.conteo_por(cubo, 'MES', **filtros).reset_index(name='TOTAL')
+        conteo['MES'] = conteo['MES'].apply(lambda m: meses_en_espanol[m].capitalize())
+        total_general = conteo['TOTAL'].sum()
+        conteo['PORCENTAJE'] = (conteo['TOTAL'] / total_general * 100).round(2).astype(str) + '%'
+
+        fila_total = pd.DataFrame({
+            'MES': ['Total general'],
+            'TOTAL': [total_general],
+            'PORCENTAJE': ['100.0%']
+        })
+        tabla_final = pd.concat([conteo, fila_total], ignore_index=True)
+
+        if nombre_hoja in libro.sheetnames:
+            del libro[nombre_hoja]
+        hoja = libro.create_sheet(nombre_hoja)
+
+        # Encabezado y fila "Total general" en gris, bordes en toda la tabla (estilos registrados una vez)
+        escritura.escribir_tabla(hoja, tabla_final, ["FECHA VISADO", "TOTAL", "PORCENTAJE"],
+                                 estilo_ultima="tabla_encabezado", ajustar_anchos=False)
+
+        # Generar gráficos
+        lote.agregar(graficas_barras(cubo_conteos.tabla(cubo, 'MES', 'NOTIFICADOR', **filtros), colores, nombre_hoja), (hoja, 'E5'))
+
+        # La gráfica nativa del pastel lee directamente la tabla FECHA VISADO / TOTAL (sin la fila de total)
+        lote.agregar(graficas_pastel(cubo_conteos.conteo_por(cubo, 'MES', **filtros), nombre_hoja), (hoja, 'E20'),
+                     rango=(1, 1, len(conteo) + 1, 2))
+
+    # Crear las hojas para DTO y PCL
+    crear_hoja("TABLA MES DTO", 'DTO')
+    crear_hoja("TABLA MES PCL", 'PCL')
+
+# ------------------------------------------------------------------------------- INFORME ---------------------------------------------------------------------------------
+def escribir_hojas_informe(libro, particiones, cubo, cubo_ano, conteos_notificador, lote, ano, ano_comparacion=None):
+    # Hojas de cada mes pedido del año seleccionado, con los datos ya partidos por mes
+    for origen in ['DTO', 'PCL']:
+        for mes, df_mes in particiones[origen]:
+            escribir_hoja_mes(libro, f"{origen}_{meses_en_espanol[mes]}", df_mes, ano, mes, cubo, origen, lote,
+                              conteos_notificador[origen])
+
+    # Llamar a la función para generar las tablas de DTO y PCL
+    generar_tablas_dto_y_pcl(libro, cubo_ano, lote, ano)
+
+    # Llamar a la función para crear la hoja de comparativa de año
+    crear_comparativa_ano_dto(libro, cubo_ano, lote, ano, ano_comparacion)
+    crear_comparativa_ano_pcl(libro, cubo_ano, lote, ano, ano_comparacion)
+
+
+def insertar_graficas(lote):
+    # Dibujar todas las gráficas en paralelo (o crearlas como gráficas nativas) e insertarlas en sus hojas
+    lote.insertar()
+
+
+def guardar_informe(datos_originales, construir, graficas_nativas=False):
+    """Devuelve el archivo original con las hojas del informe agregadas.
+
+    Las hojas se generan en un libro aparte y se anexan al paquete original sin volver a
+    serializar las hojas del usuario. El libro aparte es de solo escritura (cada fila va a
+    disco al agregarla); con gráficas nativas es un libro normal, porque sus tablas de datos
+    se escriben por celda a la derecha de las filas ya escritas. Si el archivo ya trae hojas
+    con esos nombres (un informe generado antes) se carga y guarda el libro completo,
+    reemplazándolas. Sin archivo original (entrada Parquet / Arrow) se devuelve solo el
+    libro del informe.
+    """
+    informe = libro_informe(graficas_nativas)
+    construir(informe)
+    return anexar_informe(datos_originales, informe, construir)
+
+
+def libro_informe(graficas_nativas=False):
+    # Libro aparte para las hojas del informe (ver guardar_informe)
+    if graficas_nativas:
+        informe = Workbook()
+        informe.remove(informe.active)
+        return informe
+    return escritura.libro_streaming()
+
+
+def anexar_informe(datos_originales, informe, construir):
+    # Guarda el libro ya construido y lo anexa al original; `construir` rehace las hojas si hay que cargar el libro completo
+    if datos_originales is None:
+        with instrumentacion.etapa("guardado"):
+            output = desborde.Salida()
+            informe.save(output)
+        return desborde.abrir(output.contenido())
+    try:
+        with instrumentacion.etapa("guardado"):
+            parcial = desborde.Salida()
+            informe.save(parcial)
+            return desborde.abrir(paquete.anexar_hojas(datos_originales, parcial.contenido()))
+    except paquete.ErrorPaquete:
+        with instrumentacion.etapa("lectura_libro_completo"):
+            libro = load_workbook(desborde.abrir(datos_originales))
+        construir(libro)
+        with instrumentacion.etapa("guardado_libro_completo"):
+            output = desborde.Salida()
+            libro.save(output)
+        return desborde.abrir(output.contenido())
+
+
+def anos_disponibles(cubo):
+    """Años con datos en DTO o PCL, en orden."""
+    return sorted({int(a) for a in cubo_conteos.filtrar(cubo, HOJA=['DTO', 'PCL'])['ANO'].dropna()})
+
+
+def anos_archivo(archivo, tipo="xlsx"):
+    """Años con datos del archivo. Lee las hojas como la etapa 'lectura' del informe, así el
+    informe que se pida después usa las hojas ya leídas (en cache) sin volver a leer el archivo."""
+    return anos_disponibles(ejecucion(archivo, tipo=tipo)['agregado'])
+
+
+def mes_mas_reciente(cubo, ano=None):
+    """Nombre del último mes con datos en DTO o PCL, del año dado o del más reciente (None si no hay fechas)."""
+    fechas = cubo_conteos.filtrar(cubo, HOJA=['DTO', 'PCL'], ANO=None if ano is None else [ano])[['ANO', 'MES']].dropna()
+    if fechas.empty:
+        return None
+    _, mes = max(zip(fechas['ANO'], fechas['MES']))
+    return meses_en_espanol[int(mes)]
+
+
+# ------------------------------------------------------------------------------- ETAPAS ---------------------------------------------------------------------------------
+# Cada etapa declara sus entradas y corre una sola vez por informe (servicios/flujo.py).
+# Valores iniciales: archivo, tipo ('xlsx', 'parquet' o 'arrow'), mes (None = último mes con datos),
+# ano (None = año más reciente), ano_comparacion (None = sin comparación), acumular, graficas_nativas.
+flujo = Flujo()
+
+
+@flujo.etapa('archivo', 'tipo')
+def lectura(archivo, tipo):
+    # En Parquet / Arrow las hojas DTO y PCL son los valores de la columna HOJA
+    if tipo in ingesta.TIPOS_ARROW:
+        hojas = ingesta.leer_hojas_arrow(archivo, tipo, ['DTO', 'PCL'])
+    else:
+        hojas = ingesta.leer_hojas(archivo, ['DTO', 'PCL'])
+    # Fechas y notificadores normalizados igual que en el cubo (las hojas de mes muestran los mismos valores)
+    return {origen: ingesta.tipar(df) for origen, df in hojas.items()}
+
+
+@flujo.etapa('lectura')
+def meses(hojas):
+    # MES se deriva una sola vez por hoja; las hojas de mes lo incluyen como columna
+    for df in hojas.values():
+        df['MES'] = df['FECHA_VISADO'].dt.month
+    return hojas
+
+
+# 'lectura' va primero para que el cubo use las hojas ya leídas en lugar de releer las columnas
+def cubo_archivo(archivo, tipo="xlsx"):
+    """Cubo de conteos de DTO y PCL (memorizado por contenido; solo lee las columnas del informe)."""
+    if tipo in ingesta.TIPOS_ARROW:
+        return cubo_conteos.obtener_cubo(archivo, lambda: ingesta.leer_columnas_arrow(archivo, tipo, ['DTO', 'PCL']),
+                                         ('DTO', 'PCL'))
+    return cubo_conteos.obtener_cubo(archivo, lambda: ingesta.leer_columnas(archivo, ['DTO', 'PCL']), ('DTO', 'PCL'))
+
+
+@flujo.etapa('archivo', 'tipo', 'lectura')
+def agregado(archivo, tipo, hojas):
+    # Cubo de conteos del archivo: todas las gráficas y tablas salen de cortes de este cubo
+    return cubo_archivo(archivo, tipo)
+
+
+@flujo.etapa('agregado', medir=False)
+def rechazadas(cubo):
+    # Avisos de filas sin fecha de visado o sin notificador válidos (no entran en ninguna tabla)
+    return cubo_conteos.avisos_rechazadas(cubo, ['ANO', 'NOTIFICADOR'], HOJA=['DTO', 'PCL'])
+
+
+@flujo.etapa('agregado')
+def agregados_parquet(cubo):
+    # Conteos mes x notificador de DTO y PCL para tableros (sin tener que leer el Excel)
+    return cubo_conteos.exportar_parquet(cubo, ['HOJA', 'ANO', 'MES', 'NOTIFICADOR'], HOJA=['DTO', 'PCL'])
+
+
+@flujo.etapa('meses')
+def indice(hojas):
+    # Filas ordenadas por fecha una sola vez: cada mes pedido es un corte contiguo
+    return {origen: IndiceFechas(df) for origen, df in hojas.items()}
+
+
+@flujo.etapa('agregado', 'acumular', 'ano_comparacion')
+def cubo_ano(cubo, acumular, ano_comparacion):
+    # Conteos para TABLA MES y COMPARATIVA AÑO: los del archivo o lo acumulado en el almacén
+    # (con el año de comparación aunque el archivo no lo traiga)
+    if not acumular:
+        return cubo
+    return almacen.acumular(cubo, ['DTO', 'PCL'], anos_extra=[] if ano_comparacion is None else [ano_comparacion])
+
+
+@flujo.etapa('ano', 'agregado', medir=False)
+def ano_seleccionado(ano, cubo):
+    anos = anos_disponibles(cubo)
+    return ano or (anos[-1] if anos else None)
+
+
+@flujo.etapa('mes', 'agregado', 'ano_seleccionado', medir=False)
+def mes_seleccionado(mes, cubo, ano):
+    return mes or mes_mas_reciente(cubo, ano)
+
+
+@flujo.etapa('mes_seleccionado', medir=False)
+def mes_num(mes):
+    # Convertir el mes seleccionado a número usando el diccionario (None para todos los meses)
+    return None if mes == TODOS_LOS_MESES else list(meses_en_espanol.values()).index(mes) + 1
+
+
+@flujo.etapa('indice', 'ano_seleccionado', 'mes_num')
+def particiones(indice, ano, mes):
+    """{hoja: [(mes, filas del mes)]} del año seleccionado: todos sus meses con datos o el mes pedido.
+
+    Cada mes es un corte del índice por fecha (sin recorrer la hoja) y conserva el orden original de las filas.
+    """
+    if mes is None:
+        return {origen: [(m, fechas.mes(ano, m)) for a, m in fechas.meses() if a == ano]
+                for origen, fechas in indice.items()}
+    if ano is None:
+        # Sin ninguna fecha en el archivo: la hoja del mes queda solo con el encabezado
+        return {origen: [(mes, fechas.df.iloc[:0])] for origen, fechas in indice.items()}
+    return {origen: [(mes, fechas.mes(ano, mes))] for origen, fechas in indice.items()}
+
+
+@flujo.etapa('agregado', 'ano_seleccionado')
+def conteos_notificador(cubo, ano):
+    # Pastel BELISARIO / UTMDL de las hojas de mes: es el mismo para todos los meses del año de cada hoja
+    return {origen: cubo_conteos.conteo_por(cubo, 'NOTIFICADOR', HOJA=[origen], NOTIFICADOR=['BELISARIO', 'UTMDL'],
+                                            ANO=filtro_ano(ano))
+            for origen in ['DTO', 'PCL']}
+
+
+@flujo.etapa('particiones', 'agregado', 'cubo_ano', 'conteos_notificador', 'ano_seleccionado', 'ano_comparacion',
+             'graficas_nativas', medir=False)
+def construir(particiones, cubo, cubo_ano, conteos_notificador, ano, ano_comparacion, graficas_nativas):
+    """Función que escribe las hojas del informe y sus gráficas en un libro (todo lo calculado se comparte)."""
+    def construir_en(libro):
+        # Las gráficas de todas las hojas se acumulan en un lote (imágenes o gráficas nativas de Excel)
+        lote = graficos.LoteNativo() if graficas_nativas else graficos.Lote()
+        with instrumentacion.etapa("escritura"):
+            escribir_hojas_informe(libro, particiones, cubo, cubo_ano, conteos_notificador, lote, ano, ano_comparacion)
+        with instrumentacion.etapa("graficas"):
+            insertar_graficas(lote)
+    return construir_en
+
+
+@flujo.etapa('archivo', 'tipo', 'construir', 'graficas_nativas', medir=False)
+def informe(archivo, tipo, construir, graficas_nativas):
+    return guardar_informe(ingesta.leer_bytes(archivo) if tipo == "xlsx" else None, construir, graficas_nativas)
+
+
+def ejecucion(archivo, mes=None, acumular=False, graficas_nativas=False, tipo="xlsx", ano=None, ano_comparacion=None):
+    return flujo.ejecucion(archivo=archivo, tipo=tipo, mes=mes, ano=ano, ano_comparacion=ano_comparacion,
+                           acumular=acumular, graficas_nativas=graficas_nativas)
+
+
+def generar_informe_dto_pcl(archivo, mes_seleccionado, acumular=False, graficas_nativas=False, tipo="xlsx",
+                            ano=None, ano_comparacion=None):
+    """Archivo original + hojas del mes, TABLA MES y COMPARATIVA AÑO (BytesIO listo para descargar).
+
+    Con ``mes_seleccionado=TODOS_LOS_MESES`` se generan las hojas DTO/PCL de cada mes con datos.
+    Con ``acumular=True`` los conteos del archivo se guardan en el almacén local y TABLA MES /
+    COMPARATIVA AÑO se arman con todos los meses guardados de los años del archivo.
+    Con ``graficas_nativas=True`` las gráficas son de Excel (editables) en lugar de imágenes.
+    Con ``tipo='parquet'`` o ``'arrow'`` el archivo es una tabla con columna HOJA (DTO / PCL)
+    y el resultado trae solo las hojas del informe.
+    Las hojas de mes y TABLA MES son del año ``ano`` (por defecto el más reciente del archivo);
+    con ``ano_comparacion`` las COMPARATIVA AÑO muestran los dos años lado a lado.
+    """
+    return ejecucion(archivo, mes_seleccionado, acumular, graficas_nativas, tipo, ano, ano_comparacion)['informe']
@@ -0,0 +1,277 @@
+"""Informe por ESTADO_INFORME y NOTIFICADOR (Proceso 2) sin dependencias de Streamlit."""
+import math
+import pandas as pd
+from openpyxl.utils import get_column_letter
+from servicios import desborde
+from servicios import ingesta
+from servicios import cubo as cubo_conteos
+from servicios import graficos
+from servicios import escritura
+from servicios.flujo import Flujo
+
+
+# Alto de una fila de Excel con la altura por defecto (para ubicar una imagen debajo de otra)
+PIXELES_POR_FILA = 20
+
+
+# Columnas sin las que no hay informe (en Excel, en alguna de las hojas DTO o PCL)
+COLUMNAS_REQUERIDAS = ['ESTADO_INFORME', 'NOTIFICADOR']
+
+
+MENSAJE_COLUMNAS = "El archivo no contiene las columnas necesarias: 'ESTADO_INFORME' y 'NOTIFICADOR'."
+
+
+class ErrorInforme(Exception):
+    """El archivo no se puede procesar; el mensaje es el que se muestra al usuario."""
+
+
+def cargar_archivo(archivo, tipo):
+    try:
+        if tipo == "xlsx":
+            # Cargar ambas hojas (DTO y PCL), compartidas con Proceso 1 a través de la cache
+            hojas = ingesta.leer_hojas(archivo, ['DTO', 'PCL'])
+
+            # Unir ambas hojas en un solo DataFrame
+            df_base = pd.concat([hojas['DTO'], hojas['PCL']], ignore_index=True)
+
+        # Los CSV no pasan por aquí: se leen por bloques en cubo_csv_por_bloques
+        elif tipo in ingesta.TIPOS_ARROW:
+            df_base = ingesta.leer_arrow(archivo, tipo)
+
+        # Limpiar posibles filas con datos inconsistentes
+        df_base.dropna(how='all', inplace=True)  # Eliminar filas vacías
+        df_base = df_base.reset_index(drop=True)  # Resetear el índice
+
+        return df_base
+    except Exception as e:
+        raise ErrorInforme(f"Error al procesar el archivo {tipo}: {e}") from e
+
+def columnas_disponibles(archivo, tipo):
+    # Solo encabezados: primera fila de DTO y PCL (Excel), encabezado (CSV) o esquema (Parquet / Arrow)
+    hojas = ['DTO', 'PCL'] if tipo == "xlsx" else None
+    problemas = ingesta.validar(archivo, tipo, hojas)
+    if problemas:
+        raise ErrorInforme(" ".join(problemas))
+    return set().union(*ingesta.encabezados(archivo, tipo, hojas).values())
+
+
+def validar(archivo, tipo):
+    """Problemas del archivo para este informe ([] si sirve), leyendo solo hojas y encabezados."""
+    try:
+        columnas = columnas_disponibles(archivo, tipo)
+    except ErrorInforme as e:
+        return [str(e)]
+    if any(c not in columnas for c in COLUMNAS_REQUERIDAS):
+        return [MENSAJE_COLUMNAS]
+    return []
+
+
+def cubo_csv_por_bloques(archivo, hoja_base=None, avisos=None):
+    # Recorre el CSV en bloques: suma los conteos de cada bloque y, si se pide, copia las filas a BASE
+    lector = ingesta.LectorCSV(archivo, columnas=None if hoja_base is not None else ingesta.COLUMNAS_INFORME,
+                               delimiter=",")
+    partes = []
+    for i, bloque in enumerate(lector):
+        bloque = bloque.dropna(how='all')  # Eliminar filas vacías
+        partes.append(cubo_conteos.construir_cubo({'CSV': ingesta.tipar(bloque)}))
+        if hoja_base is not None:
+            escritura.escribir_dataframe(hoja_base, bloque, header=(i == 0))
+
+    if lector.lineas_descartadas and avisos is not None:
+        avisos.append(f"Se descartaron {lector.lineas_descartadas} líneas mal formadas del CSV.")
+    return cubo_conteos.combinar(partes)
+
+
+def obtener_cubo(archivo, tipo, hoja_base=None, avisos=None):
+    # Mismo cubo que Proceso 1 para Excel (hojas DTO y PCL); los CSV usan una sola hoja y se leen por bloques
+    if tipo == "xlsx":
+        return cubo_conteos.obtener_cubo(archivo, lambda: ingesta.leer_columnas(archivo, ['DTO', 'PCL']), ('DTO', 'PCL'))
+    if tipo in ingesta.TIPOS_ARROW:
+        # Parquet / Arrow: solo las columnas del informe, la tabla completa como una hoja
+        hoja = tipo.upper()
+        return cubo_conteos.obtener_cubo(
+            archivo, lambda: {hoja: ingesta.tipar(ingesta.leer_arrow(archivo, tipo, ingesta.COLUMNAS_INFORME))}, (hoja,))
+    clave = cubo_conteos.clave_cubo(archivo, ('CSV',))
+    if hoja_base is not None:
+        cubo = cubo_csv_por_bloques(archivo, hoja_base, avisos)
+        return ingesta.memorizar(clave, lambda: cubo)
+    return ingesta.memorizar(clave, lambda: cubo_csv_por_bloques(archivo, avisos=avisos))
+
+
+def grafica_barras(conteo, workbook, nativa=False, max_estados=None):
+    # conteo: tabla ESTADO_INFORME x NOTIFICADOR sacada del cubo
+    colores = ['#809bce', '#95b8d1', "#79cbd1", '#B8E6A7', '#4C9A2A']
+
+    # Solo se grafican los max_estados estados con más registros (graficos.MAX_ESTADOS si no se
+    # indica) y el resto va en OTROS: la cantidad de imágenes queda acotada
+    conteo = graficos.agrupar_otros(conteo, max_estados or graficos.MAX_ESTADOS)
+
+    # Crear hoja nueva
+    if 'Distribución de Notificadores' in [s.title for s in workbook.worksheets]:
+        sheet = workbook['Distribución de Notificadores']
+    else:
+        sheet = workbook.create_sheet('Distribución de Notificadores')
+
+    if nativa:
+        # Gráfica de Excel sobre la tabla completa escrita en A1 (Tabla Procesada no tiene
+        # una columna por notificador); se ancla a la derecha de la tabla
+        ancla = f"{get_column_letter(len(conteo.columns) + 3)}1"
+        graficos.grafica_nativa(graficos.pedido('barras_estado', conteo, colores=colores), sheet, ancla)
+        return workbook
+
+    # Con muchos estados se dibuja una imagen por cada ESTADOS_POR_IMAGEN estados, una debajo de otra
+    # (en paralelo; cada imagen se reutiliza si ya se dibujó con los mismos datos)
+    lote = graficos.Lote()
+    fila = 1
+    for pagina in graficos.paginar(conteo):
+        lote.agregar(graficos.pedido('barras_estado', pagina, colores=colores), (sheet, f"A{fila}"))
+        (_, alto), dpi = graficos.tamano_barras_estado(len(pagina), len(pagina.columns))
+        fila += math.ceil(alto * dpi / PIXELES_POR_FILA) + 2
+    lote.insertar()
+
+    return workbook
+
+
+# -------------------------- FUNCIONES DE PROCESAMIENTO Y GENERACIÓN DE TABLAS ---------------------------
+def escribir_tabla_procesada(hoja_procesada, conteo):
+    """Escribe la tabla ESTADO_INFORME x NOTIFICADOR con totales, porcentajes, anchos y estilos."""
+    conteo = conteo.copy()
+    conteo['TOTAL GENERAL'] = conteo.sum(axis=1)
+    total_general_sum = conteo['TOTAL GENERAL'].sum()
+    conteo['TOTAL %'] = (conteo['TOTAL GENERAL'] / total_general_sum) * 100
+    conteo['TOTAL %'] = conteo['TOTAL %'].apply(lambda x: f"{x:.2f}%" if pd.notnull(x) else '')
+
+    # Tabla como se muestra, columna a columna (1..ultima_columna) y en las mismas posiciones
+    # de siempre: cada asignación pisa a la anterior en el mismo orden en que se llenaba antes
+    ultima_columna = len(conteo.columns)
+    notificadores = len(conteo.columns) - 2
+    encabezado = {1: "ESTADO INFORME"}
+    for col_idx, notificador in enumerate(conteo.columns[:-2], start=2):
+        encabezado[col_idx] = notificador
+    encabezado[ultima_columna-1] = "TOTAL GENERAL"
+    encabezado[ultima_columna] = "TOTAL %"
+
+    cuerpo = pd.DataFrame(None, index=range(len(conteo)), columns=range(1, ultima_columna + 1), dtype=object)
+    cuerpo[1] = conteo.index.to_numpy()
+    for col_idx in range(2, notificadores + 2):
+        cuerpo[col_idx] = conteo.iloc[:, col_idx - 2].to_numpy()
+    cuerpo[ultima_columna-2] = conteo['TOTAL GENERAL'].to_numpy()
+    cuerpo[ultima_columna-1] = conteo['TOTAL %'].to_numpy()
+
+    total = {1: "TOTAL GENERAL"}
+    for col_idx in range(2, ultima_columna-1):
+        total[col_idx] = conteo.iloc[:, col_idx - 1].sum()
+    total[ultima_columna-1] = ''
+    tabla = pd.concat([cuerpo, pd.DataFrame([total], columns=cuerpo.columns)], ignore_index=True)
+
+    # Encabezado gris, fila de totales gris oscuro y bordes en toda la tabla; anchos según el texto más largo
+    escritura.escribir_tabla(hoja_procesada, tabla, [encabezado.get(c) for c in tabla.columns],
+                             estilo_ultima="tabla_total")
+
+
+# ------------------------------------------------------------------------------- ETAPAS ---------------------------------------------------------------------------------
+# Cada etapa declara sus entradas y corre una sola vez por informe (servicios/flujo.py).
+# Valores iniciales: archivo, tipo, incluir_base, avisos, graficas_nativas, max_estados.
+flujo = Flujo()
+
+
+@flujo.etapa('archivo', 'tipo')
+def lectura(archivo, tipo):
+    try:
+        return columnas_disponibles(archivo, tipo)
+    except ErrorInforme:
+        raise
+    except Exception as e:
+        raise ErrorInforme(f"Error al procesar el archivo {tipo}: {e}") from e
+
+
+@flujo.etapa('incluir_base', medir=False)
+def libro(incluir_base):
+    # Libro de solo escritura: las filas van a disco a medida que se agregan
+    libro = escritura.libro_streaming()
+    hoja_procesada = libro.create_sheet("Tabla Procesada")
+    hoja_base = libro.create_sheet("BASE") if incluir_base else None
+    return libro, hoja_procesada, hoja_base
+
+
+@flujo.etapa('archivo', 'tipo', 'libro')
+def lectura_base(archivo, tipo, libro):
+    # En CSV la hoja BASE se copia por bloques durante el agregado
+    _, _, hoja_base = libro
+    return cargar_archivo(archivo, tipo) if hoja_base is not None and tipo != "csv" else None
+
+
+@flujo.etapa('libro', 'lectura_base')
+def escritura_base(libro, df_base):
+    if df_base is not None:
+        escritura.escribir_dataframe(libro[2], df_base)
+
+
+@flujo.etapa('archivo', 'tipo', 'libro', 'avisos')
+def agregado(archivo, tipo, libro, avisos):
+    # En CSV el agregado incluye leer los bloques (y copiarlos a BASE si se pidió)
+    try:
+        cubo = obtener_cubo(archivo, tipo, libro[2], avisos)
+    except Exception as e:
+        raise ErrorInforme(f"Error al procesar el archivo {tipo}: {e}") from e
+    if avisos is not None:
+        avisos.extend(cubo_conteos.avisos_rechazadas(cubo, ['NOTIFICADOR', 'ESTADO_INFORME']))
+    return cubo
+
+
+@flujo.etapa('agregado', medir=False)
+def conteo(cubo):
+    return cubo_conteos.tabla(cubo, 'ESTADO_INFORME', 'NOTIFICADOR')
+
+
+@flujo.etapa('agregado')
+def agregados_parquet(cubo):
+    # Conteos estado x notificador para tableros (sin tener que leer el Excel)
+    return cubo_conteos.exportar_parquet(cubo, ['ESTADO_INFORME', 'NOTIFICADOR'])
+
+
+@flujo.etapa('libro', 'conteo', nombre='escritura')
+def escribir(libro, conteo):
+    escribir_tabla_procesada(libro[1], conteo)
+
+
+@flujo.etapa('libro', 'conteo', 'graficas_nativas', 'max_estados')
+def graficas(libro, conteo, graficas_nativas, max_estados):
+    grafica_barras(conteo, libro[0], graficas_nativas, max_estados)
+
+
+# Las hojas se escriben antes de guardar: BASE, Tabla Procesada y la gráfica
+@flujo.etapa('libro', 'escritura_base', 'escritura', 'graficas')
+def guardado(libro, *_):
+    output = desborde.Salida()
+    libro[0].save(output)
+    return desborde.abrir(output.contenido())
+
+
+def ejecucion(archivo, tipo, incluir_base=True, avisos=None, graficas_nativas=False, max_estados=None):
+    return flujo.ejecucion(archivo=archivo, tipo=tipo, incluir_base=incluir_base, avisos=avisos,
+                           graficas_nativas=graficas_nativas, max_estados=max_estados)
+
+
+def resultado_informe(ejecucion):
+    """Informe de la ejecución (BytesIO), None si el archivo no tiene columnas; ErrorInforme si faltan las necesarias."""
+    columnas = ejecucion['lectura']
+    if not columnas:
+        return None
+    if any(c not in columnas for c in COLUMNAS_REQUERIDAS):
+        raise ErrorInforme(MENSAJE_COLUMNAS)
+    return ejecucion['guardado']
+
+
+def generar_tablas_estado_informe(archivo, tipo, incluir_base=True, avisos=None, graficas_nativas=False,
+                                  max_estados=None):
+    """Tabla ESTADO_INFORME x NOTIFICADOR, hoja BASE opcional y gráfica (BytesIO).
+
+    Lanza ErrorInforme si el archivo no se puede leer o le faltan columnas; los avisos
+    no fatales (líneas descartadas del CSV) se agregan a ``avisos`` si se pasa una lista.
+    Con ``graficas_nativas=True`` la gráfica es de Excel (editable) en lugar de una imagen.
+    ``tipo`` es 'xlsx', 'csv', 'parquet' o 'arrow'. Con ``max_estados`` la gráfica muestra los
+    estados con más registros y agrupa el resto en OTROS; sin él, el tope es graficos.MAX_ESTADOS
+    (repartidos en varias imágenes). La Tabla Procesada siempre trae todos los estados.
+    """
+    return resultado_informe(ejecucion(archivo, tipo, incluir_base, avisos, graficas_nativas, max_estados))
@@ -0,0 +1,484 @@
+import mmap
+import os
+import sys
+import threading
+import warnings
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from servicios import desborde
+from servicios.fechas import convertir_fechas
+
+try:
+    import python_calamine  # noqa: F401
+    MOTOR_EXCEL_RAPIDO = "calamine"
+except ImportError:
+    MOTOR_EXCEL_RAPIDO = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Número máximo de lecturas que se guardan en memoria (compartidas entre sesiones)
+MAX_ENTRADAS_CACHE = 32
+# Tamaño máximo estimado de esas lecturas (MB); cuenta dentro del presupuesto de servicios/trabajos.py
+MAX_MB_CACHE = float(os.environ.get("NOTIFICACIONES_CACHE_MB", 0)) or 512
+
+# Columnas que usan las tablas y gráficas; el resto solo se necesita para copiar los datos a las hojas
+COLUMNAS_INFORME = ['FECHA_VISADO', 'NOTIFICADOR', 'ESTADO_INFORME']
+COLUMNAS_CATEGORICAS = ['NOTIFICADOR', 'ESTADO_INFORME']
+FORMATO_FECHA_VISADO = "ISO8601"
+
+# Variantes de escritura que se cuentan como el mismo valor. Las claves van como quedan
+# después de normalizar (mayúsculas y un solo espacio); BELISARIO y BELISARIO 397 son
+# notificadores distintos y no se unen.
+ALIAS = {
+    'NOTIFICADOR': {
+        'BELISARIO397': 'BELISARIO 397',
+        'GESTAR INNOVACIÓN': 'GESTAR INNOVACION',
+    },
+    'ESTADO_INFORME': {},
+}
+
+# Filas por bloque al leer CSV grandes de forma incremental
+TAMANO_BLOQUE_CSV = 200_000
+
+# Formatos columnares (Parquet y Arrow IPC): una sola tabla; la columna HOJA indica DTO o PCL
+TIPOS_ARROW = ("parquet", "arrow")
+COLUMNA_HOJA = "HOJA"
+
+
+# ------------------------------------------------------------------------------- CACHE LRU -------------------------------------------------------------
+_caches_medidas = weakref.WeakSet()  # Caches con tope de tamaño (lecturas, imágenes de graficos.py)
+
+
+def tamano_estimado(valor):
+    """Bytes que ocupa un valor de la cache. DataFrames y Series con deep=True: en columnas de texto
+    (object) cuenta cada cadena, no solo el puntero (se calcula una vez, al guardar)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano_estimado(v) for v in valor.values())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamano_estimado(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """Cache en memoria con tamaño máximo y expulsión del elemento menos usado.
+
+    El tope es de entradas y, con `max_mb`, también de tamaño estimado: se expulsan las menos
+    usadas hasta quedar por debajo (la última guardada se conserva aunque sola lo supere).
+    Las caches con `max_mb` cuentan en memoria_cache_mb() (el presupuesto de los trabajos).
+    """
+
+    def __init__(self, max_entradas, max_mb=None):
+        self.max_entradas = max_entradas
+        self.max_mb = max_mb
+        self._datos = OrderedDict()
+        self._tamanos = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if max_mb is not None:
+            _caches_medidas.add(self)
+
+    def obtener(self, clave, defecto=None):
+        with self._lock:
+            if clave not in self._datos:
+                return defecto
+            self._datos.move_to_end(clave)
+            return self._datos[clave]
+
+    def guardar(self, clave, valor, tamano=None):
+        """Guarda `valor`; `tamano` (bytes) reemplaza a tamano_estimado(valor) si se conoce mejor."""
+        if self.max_mb is None:
+            tamano = 0
+        elif tamano is None:
+            tamano = tamano_estimado(valor)
+        with self._lock:
+            self._bytes += tamano - self._tamanos.get(clave, 0)
+            self._datos[clave] = valor
+            self._tamanos[clave] = tamano
+            self._datos.move_to_end(clave)
+            limite = None if self.max_mb is None else self.max_mb * 1024 ** 2
+            while len(self._datos) > self.max_entradas or (
+                    limite is not None and self._bytes > limite and len(self._datos) > 1):
+                antigua, _ = self._datos.popitem(last=False)
+                self._bytes -= self._tamanos.pop(antigua)
+
+    @property
+    def mb(self):
+        """Tamaño estimado de lo guardado (MB)."""
+        with self._lock:
+            return self._bytes / 1024 ** 2
+
+    def __contains__(self, clave):
+        with self._lock:
+            return clave in self._datos
+
+    def __len__(self):
+        with self._lock:
+            return len(self._datos)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._tamanos.clear()
+            self._bytes = 0
+
+
+_cache = CacheLRU(MAX_ENTRADAS_CACHE, MAX_MB_CACHE)
+
+
+def memoria_cache_mb():
+    """MB estimados de lo guardado en las caches con tope de tamaño (lecturas e imágenes, compartidas entre sesiones)."""
+    return sum(cache.mb for cache in list(_caches_medidas))
+
+
+# ------------------------------------------------------------------------------- CONTENIDO DEL ARCHIVO -------------------------------------------------------------
+def leer_bytes(archivo):
+    # Acepta bytes, un UploadedFile de Streamlit o cualquier objeto tipo archivo; los archivos
+    # grandes pasados a disco (servicios.desborde) se devuelven como el mmap y un desborde.Contenido
+    # tal cual (con su huella), sin copiarlos
+    if isinstance(archivo, (mmap.mmap, desborde.Contenido)):
+        return archivo
+    if isinstance(archivo, (bytes, bytearray)):
+        return bytes(archivo)
+    if hasattr(archivo, "getvalue"):
+        return archivo.getvalue()
+    archivo.seek(0)
+    datos = archivo.read()
+    archivo.seek(0)
+    return datos
+
+
+def hash_contenido(datos):
+    # Ya calculada si `datos` es un desborde.Contenido o el mmap que compartir() hizo de uno
+    return desborde.huella(datos)
+
+
+def memorizar(clave, calcular):
+    """Devuelve el valor guardado para `clave` o lo calcula y lo guarda en la cache."""
+    valor = _cache.obtener(clave)
+    if valor is None:
+        valor = calcular()
+        _cache.guardar(clave, valor)
+    return valor
+
+
+# ------------------------------------------------------------------------------- LECTURA CON CACHE -------------------------------------------------------------
+def nombres_hojas(archivo):
+    datos = leer_bytes(archivo)
+    clave = ("hojas", hash_contenido(datos))
+    hojas = _cache.obtener(clave)
+    if hojas is None:
+        libro = load_workbook(desborde.abrir(datos), read_only=True)
+        hojas = list(libro.sheetnames)
+        libro.close()
+        _cache.guardar(clave, hojas)
+    return list(hojas)
+
+
+def _encabezados_excel(datos):
+    # {hoja: columnas} de todas las hojas: solo la primera fila de cada una (modo read_only, sin leer el resto)
+    clave = ("encabezados", hash_contenido(datos))
+    encabezados = _cache.obtener(clave)
+    if encabezados is None:
+        libro = load_workbook(desborde.abrir(datos), read_only=True)
+        encabezados = {}
+        for hoja in libro.worksheets:
+            fila = next(hoja.iter_rows(max_row=1, values_only=True), ())
+            encabezados[hoja.title] = [c for c in fila if c is not None]
+        libro.close()
+        _cache.guardar(clave, encabezados)
+    return encabezados
+
+
+def encabezados(archivo, tipo, hojas=None):
+    """{hoja: columnas} de las hojas pedidas que existen (todas si `hojas` es None), sin leer filas de datos.
+
+    Excel: primera fila de cada hoja. CSV: el encabezado, como hoja 'CSV'. Parquet / Arrow:
+    el esquema, para cada valor de la columna HOJA (o la tabla entera como 'PARQUET' / 'ARROW').
+    """
+    if tipo == "xlsx":
+        todas = _encabezados_excel(leer_bytes(archivo))
+    elif tipo in TIPOS_ARROW:
+        columnas = [c for c in columnas_arrow(archivo, tipo) if c != COLUMNA_HOJA]
+        todas = {hoja: columnas for hoja in (nombres_hojas_arrow(archivo, tipo) or [tipo.upper()])}
+    else:
+        todas = {'CSV': columnas_csv(archivo)}
+    return {hoja: list(columnas) for hoja, columnas in todas.items() if hojas is None or hoja in hojas}
+
+
+def validar(archivo, tipo, hojas=None, columnas=()):
+    """Problemas del archivo como textos ([] si sirve): hojas o columnas que faltan. Solo lee encabezados."""
+    presentes = encabezados(archivo, tipo, hojas)
+    problemas = []
+    for hoja in hojas or []:
+        if hoja not in presentes:
+            problemas.append(f"La columna HOJA no tiene registros '{hoja}'." if tipo in TIPOS_ARROW
+                             else f"La hoja '{hoja}' no se encuentra en el archivo.")
+    for hoja, disponibles in presentes.items():
+        faltan = [c for c in columnas if c not in disponibles]
+        if faltan:
+            problemas.append(f"A la hoja '{hoja}' le faltan las columnas: {', '.join(faltan)}.")
+    return problemas
+
+
+def leer_hojas(archivo, hojas):
+    """Devuelve {hoja: DataFrame} leyendo cada hoja del Excel una sola vez por contenido."""
+    datos = leer_bytes(archivo)
+    huella = hash_contenido(datos)
+
+    resultado = {}
+    faltantes = []
+    for hoja in hojas:
+        df = _cache.obtener(("excel", huella, hoja))
+        if df is None:
+            faltantes.append(hoja)
+        else:
+            resultado[hoja] = df
+
+    if faltantes:
+        # Una sola pasada sobre el archivo para todas las hojas que faltan
+        leidas = pd.read_excel(desborde.abrir(datos), sheet_name=faltantes)
+        for hoja, df in leidas.items():
+            _cache.guardar(("excel", huella, hoja), df)
+            resultado[hoja] = df
+
+    # Copias superficiales: quien las use puede agregar columnas sin tocar la cache
+    return {hoja: resultado[hoja].copy(deep=False) for hoja in hojas}
+
+
+# ------------------------------------------------------------------------------- LECTURA POR COLUMNAS -------------------------------------------------------------
+def normalizar_categorias(serie, alias=None):
+    """Categoría en mayúsculas, sin espacios sobrantes y con los alias resueltos; los textos vacíos quedan vacíos (NaN).
+
+    Se limpia cada valor distinto (las categorías), no cada fila: las filas solo se
+    renumeran con un indexado de numpy.
+    """
+    serie = serie.astype('category')
+    textos = pd.Series(serie.cat.categories.astype(str))
+    textos = textos.str.upper().str.replace(r'\s+', ' ', regex=True).str.strip()
+    textos = textos.replace(alias or {}).replace('', np.nan)
+    valores = pd.Index(textos.dropna().unique())
+    codigos = serie.cat.codes.to_numpy()
+    if len(textos) == 0:
+        # Columna sin ningún valor (todo vacío): no hay categorías que renumerar
+        nuevos = np.full(len(codigos), -1, dtype=codigos.dtype)
+    else:
+        nuevos = np.where(codigos >= 0, valores.get_indexer(textos)[codigos], -1)
+    return pd.Series(pd.Categorical.from_codes(nuevos, valores), index=serie.index, name=serie.name)
+
+
+def tipar(df):
+    """Normaliza las columnas del informe en una sola pasada vectorizada.
+
+    FECHA_VISADO queda como fecha (ISO sin inferir y, lo que no lo cumpla, con el lector general;
+    ver fechas.convertir_fechas)
+    y NOTIFICADOR / ESTADO_INFORME como categorías limpias (ver normalizar_categorias y ALIAS).
+    Las filas que quedan sin valor se cuentan después en el cubo (cubo.rechazadas).
+    """
+    df = df.copy(deep=False)
+    if 'FECHA_VISADO' in df.columns:
+        df['FECHA_VISADO'] = convertir_fechas(df['FECHA_VISADO'], FORMATO_FECHA_VISADO)
+    for columna in COLUMNAS_CATEGORICAS:
+        if columna in df.columns:
+            df[columna] = normalizar_categorias(df[columna], ALIAS.get(columna))
+    return df
+
+
+def leer_columnas(archivo, hojas, columnas=COLUMNAS_INFORME):
+    """Como leer_hojas pero solo con `columnas`, ya tipadas; mucho más liviano en memoria.
+
+    Si la hoja completa ya está en cache se proyecta desde ahí sin volver a leer el archivo;
+    si no, se lee solo lo necesario (con calamine cuando está instalado).
+    """
+    datos = leer_bytes(archivo)
+    huella = hash_contenido(datos)
+    columnas = tuple(columnas)
+
+    resultado = {}
+    faltantes = []
+    for hoja in hojas:
+        df = _cache.obtener(("columnas", huella, hoja, columnas))
+        if df is None:
+            completa = _cache.obtener(("excel", huella, hoja))
+            if completa is not None:
+                df = tipar(completa[[c for c in columnas if c in completa.columns]])
+                _cache.guardar(("columnas", huella, hoja, columnas), df)
+        if df is None:
+            faltantes.append(hoja)
+        else:
+            resultado[hoja] = df
+
+    if faltantes:
+        leidas = pd.read_excel(desborde.abrir(datos), sheet_name=faltantes, usecols=lambda c: c in columnas,
+                               engine=MOTOR_EXCEL_RAPIDO)
+        for hoja, df in leidas.items():
+            df = tipar(df)
+            _cache.guardar(("columnas", huella, hoja, columnas), df)
+            resultado[hoja] = df
+
+    return {hoja: resultado[hoja].copy(deep=False) for hoja in hojas}
+
+
+# ------------------------------------------------------------------------------- CSV POR BLOQUES -------------------------------------------------------------
+def _como_archivo(archivo):
+    # Bytes o mmap (lo mismo que acepta leer_bytes) como objeto tipo archivo, sin copiarlos
+    if isinstance(archivo, (bytes, bytearray, mmap.mmap)):
+        return desborde.abrir(leer_bytes(archivo))
+    return archivo
+
+
+def columnas_csv(archivo, **opciones):
+    """Nombres de columnas del CSV leyendo solo el encabezado."""
+    archivo = _como_archivo(archivo)
+    if hasattr(archivo, "seek"):
+        archivo.seek(0)
+    columnas = list(pd.read_csv(archivo, nrows=0, **opciones).columns)
+    if hasattr(archivo, "seek"):
+        archivo.seek(0)
+    return columnas
+
+
+# Registro de avisos del lector CSV (warnings.catch_warnings no es seguro entre hilos)
+_CANDADO_AVISOS_CSV = threading.Lock()
+
+
+class LectorCSV:
+    """Recorre un CSV en bloques de `tamano_bloque` filas sin cargarlo completo.
+
+    Las líneas mal formadas no se descartan en silencio: se cuentan en `lineas_descartadas`.
+    """
+
+    def __init__(self, archivo, columnas=None, tamano_bloque=TAMANO_BLOQUE_CSV, **opciones):
+        self.archivo = _como_archivo(archivo)
+        self.columnas = columnas
+        self.tamano_bloque = tamano_bloque
+        self.opciones = opciones
+        self.lineas_descartadas = 0
+
+    def _descartar(self, linea):
+        self.lineas_descartadas += 1
+        return None
+
+    def _requiere_python(self):
+        # Opciones que el motor C no admite (separador a detectar o expresión regular, pie a omitir)
+        sep = self.opciones.get("sep", self.opciones.get("delimiter", ","))
+        return (self.opciones.get("engine") == "python" or sep is None or len(sep) > 1
+                or self.opciones.get("skipfooter"))
+
+    def __iter__(self):
+        if hasattr(self.archivo, "seek"):
+            self.archivo.seek(0)
+        self.lineas_descartadas = 0
+        usecols = (lambda c: c in self.columnas) if self.columnas else None
+        if self._requiere_python():
+            opciones = {**self.opciones, 'engine': "python"}
+            return iter(pd.read_csv(self.archivo, chunksize=self.tamano_bloque, usecols=usecols,
+                                    on_bad_lines=self._descartar, **opciones))
+        return self._bloques_c(usecols)
+
+    def _bloques_c(self, usecols):
+        # El motor C avisa cada línea omitida con un ParserWarning ("Skipping line N: ..."); se cuentan
+        # por bloque. El registro de avisos es global al proceso: el candado evita mezclar hilos.
+        bloques = pd.read_csv(self.archivo, chunksize=self.tamano_bloque, usecols=usecols,
+                              on_bad_lines="warn", **self.opciones)
+        with bloques:
+            while True:
+                with _CANDADO_AVISOS_CSV, warnings.catch_warnings(record=True) as avisos:
+                    warnings.simplefilter("always", pd.errors.ParserWarning)
+                    bloque = next(bloques, None)
+                for aviso in avisos:
+                    if issubclass(aviso.category, pd.errors.ParserWarning):
+                        self.lineas_descartadas += str(aviso.message).count("Skipping line")
+                    else:
+                        warnings.warn_explicit(aviso.message, aviso.category, aviso.filename, aviso.lineno)
+                if bloque is None:
+                    return
+                yield bloque
+
+
+# ------------------------------------------------------------------------------- PARQUET / ARROW IPC -------------------------------------------------------------
+def tipo_por_nombre(nombre):
+    """'xlsx', 'csv', 'parquet' o 'arrow' según la extensión del archivo (None si no se reconoce)."""
+    nombre = nombre.lower()
+    for extension, tipo in ((".xlsx", "xlsx"), (".csv", "csv"), (".parquet", "parquet"),
+                            (".arrow", "arrow"), (".feather", "arrow"), (".ipc", "arrow")):
+        if nombre.endswith(extension):
+            return tipo
+    return None
+
+
+def _requerir_pyarrow():
+    if pa is None:
+        raise ImportError("Leer archivos Parquet o Arrow requiere pyarrow (pip install pyarrow)")
+
+
+def _abrir_ipc(datos):
+    # Formato archivo (.arrow / .feather v2) o, si no, formato stream; los buffers no se copian
+    try:
+        return pa_ipc.open_file(pa.BufferReader(datos))
+    except pa.ArrowInvalid:
+        return pa_ipc.open_stream(pa.BufferReader(datos))
+
+
+def columnas_arrow(archivo, tipo):
+    """Nombres de columnas leyendo solo el esquema."""
+    _requerir_pyarrow()
+    datos = leer_bytes(archivo)
+    if tipo == "parquet":
+        return list(pq.read_schema(pa.BufferReader(datos)).names)
+    return list(_abrir_ipc(datos).schema.names)
+
+
+def leer_arrow(archivo, tipo, columnas=None):
+    """DataFrame de un Parquet / Arrow IPC leyendo solo `columnas` (las que existan; None = todas)."""
+    _requerir_pyarrow()
+    datos = leer_bytes(archivo)
+    if columnas is not None:
+        disponibles = set(columnas_arrow(datos, tipo))
+        columnas = tuple(c for c in columnas if c in disponibles)
+    clave = ("arrow", hash_contenido(datos), columnas)
+    df = _cache.obtener(clave)
+    if df is None:
+        if tipo == "parquet":
+            # Parquet solo decodifica las columnas pedidas
+            tabla = pq.read_table(pa.BufferReader(datos), columns=None if columnas is None else list(columnas))
+        else:
+            tabla = _abrir_ipc(datos).read_all()
+            if columnas is not None:
+                tabla = tabla.select(list(columnas))
+        df = tabla.to_pandas()
+        _cache.guardar(clave, df)
+    return df.copy(deep=False)
+
+
+def nombres_hojas_arrow(archivo, tipo):
+    """Valores de la columna HOJA (las "hojas" del archivo), leyendo solo esa columna."""
+    if COLUMNA_HOJA not in columnas_arrow(archivo, tipo):
+        return []
+    return [str(h) for h in leer_arrow(archivo, tipo, [COLUMNA_HOJA])[COLUMNA_HOJA].dropna().unique()]
+
+
+def leer_hojas_arrow(archivo, tipo, hojas, columnas=None):
+    """Como leer_hojas: {hoja: DataFrame} partiendo la tabla por la columna HOJA (que no se incluye)."""
+    pedidas = None if columnas is None else list(columnas) + [COLUMNA_HOJA]
+    df = leer_arrow(archivo, tipo, pedidas)
+    return {hoja: df[df[COLUMNA_HOJA] == hoja].drop(columns=COLUMNA_HOJA).reset_index(drop=True)
+            for hoja in hojas}
+
+
+def leer_columnas_arrow(archivo, tipo, hojas, columnas=COLUMNAS_INFORME):
+    """Como leer_columnas para Parquet / Arrow: solo `columnas`, ya tipadas, por hoja."""
+    return {hoja: tipar(df) for hoja, df in leer_hojas_arrow(archivo, tipo, hojas, columnas).items()}
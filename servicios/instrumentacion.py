@@ -0,0 +1,108 @@
+"""Tiempos y memoria por etapa de cada corrida de un informe.
+
+Cada etapa (lectura, agregado, escritura, gráficas, guardado) se envuelve con
+``with etapa("lectura"):``. Al cerrar se emite un registro de log en JSON (logger
+"notificaciones.etapas") y, si hay una corrida activa, se agrega a su desglose para
+mostrarlo en la app. Medir cuesta un perf_counter y una lectura de /proc por etapa,
+así que se puede dejar siempre encendido.
+"""
+import json
+import logging
+import os
+import resource
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger("notificaciones.etapas")
+
+_corrida_actual = ContextVar("corrida_actual", default=None)
+_PAGINA_MB = os.sysconf("SC_PAGE_SIZE") / 1024 ** 2 if hasattr(os, "sysconf") else None
+# ru_maxrss está en KB en Linux y en bytes en macOS
+_MAXRSS_MB = 1 / 1024 ** 2 if sys.platform == "darwin" else 1 / 1024
+
+
+def memoria_mb():
+    """RSS actual del proceso en MB (pico del proceso si no hay /proc)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGINA_MB
+    except (OSError, TypeError):
+        return pico_mb()
+
+
+def pico_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_MB
+
+
+class Corrida:
+    """Desglose de las etapas de una generación de informe."""
+
+    def __init__(self, nombre, al_terminar_etapa=None):
+        self.nombre = nombre
+        self.id = uuid.uuid4().hex[:12]
+        self.etapas = []
+        # Función llamada con el nombre de cada etapa terminada (progreso de los trabajos en segundo plano)
+        self.al_terminar_etapa = al_terminar_etapa
+
+    def tabla(self):
+        """DataFrame etapa / segundos / MB (variación de RSS) / RSS MB al terminar la etapa."""
+        import pandas as pd  # Solo para mostrar el desglose: no se carga al iniciar la app
+        return pd.DataFrame(self.etapas, columns=['etapa', 'segundos', 'mb', 'rss_mb'])
+
+    @property
+    def segundos(self):
+        return sum(e[1] for e in self.etapas)
+
+
+def _registrar(evento, **datos):
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({'evento': evento, **datos}, ensure_ascii=False))
+
+
+@contextmanager
+def corrida(nombre, al_terminar_etapa=None):
+    """Agrupa las etapas medidas dentro del bloque (por sesión/hilo) y registra el total al terminar."""
+    actual = Corrida(nombre, al_terminar_etapa)
+    token = _corrida_actual.set(actual)
+    inicio = time.perf_counter()
+    try:
+        yield actual
+    finally:
+        _corrida_actual.reset(token)
+        if actual.etapas:
+            _registrar('corrida', corrida=actual.id, informe=nombre,
+                       segundos=round(time.perf_counter() - inicio, 4),
+                       pico_mb=round(pico_mb(), 1), etapas=len(actual.etapas))
+
+
+@contextmanager
+def etapa(nombre, **contexto):
+    """Mide tiempo y variación de memoria del bloque; `contexto` va tal cual al log (filas, hoja, ...)."""
+    antes = memoria_mb()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        despues = memoria_mb()
+        actual = _corrida_actual.get()
+        if actual is not None:
+            actual.etapas.append((nombre, round(segundos, 4), round(despues - antes, 1), round(despues, 1)))
+            if actual.al_terminar_etapa is not None:
+                actual.al_terminar_etapa(nombre)
+        _registrar('etapa', corrida=actual.id if actual else None, informe=actual.nombre if actual else None,
+                   etapa=nombre, segundos=round(segundos, 4), mb=round(despues - antes, 1),
+                   rss_mb=round(despues, 1), **contexto)
+
+
+def configurar_logs():
+    """Salida de los registros de etapas a stderr (una línea JSON por registro) si nadie los configuró."""
+    raiz = logging.getLogger("notificaciones")
+    if not raiz.handlers:
+        manejador = logging.StreamHandler()
+        manejador.setFormatter(logging.Formatter("%(message)s"))
+        raiz.addHandler(manejador)
+        raiz.setLevel(os.environ.get("NOTIFICACIONES_LOG_NIVEL", "INFO"))
@@ -0,0 +1,352 @@
+"""Anexa hojas nuevas a un .xlsx existente sin volver a serializar el libro original.
+
+Un .xlsx es un zip de partes XML. Las hojas del informe se generan en un libro aparte
+(openpyxl) y aquí se trasplantan sus partes (hoja, dibujos, imágenes, gráficos) al paquete
+original. Las partes del usuario se copian comprimidas tal cual, byte a byte; solo se
+reescriben los índices del paquete: [Content_Types].xml, workbook.xml, sus relaciones y
+styles.xml (se agregan al final los formatos y estilos con nombre que usan las hojas
+nuevas; un estilo con nombre que el original ya tiene, como "Normal", queda el del original).
+"""
+import copy
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+from servicios import desborde
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_CT = "http://schemas.openxmlformats.org/package/2006/content-types"
+TIPO_HOJA = NS_REL + "/worksheet"
+TIPO_ESTILOS = NS_REL + "/styles"
+TIPO_DOCUMENTO = NS_REL + "/officeDocument"
+
+ET.register_namespace("", NS_MAIN)
+
+
+class ErrorPaquete(Exception):
+    """El libro original no se puede ampliar por partes (se debe usar el guardado completo)."""
+
+
+# ------------------------------------------------------------------------------- RELACIONES -------------------------------------------------------------
+def _ruta_rels(parte):
+    carpeta, nombre = posixpath.split(parte)
+    return posixpath.join(carpeta, "_rels", nombre + ".rels")
+
+
+def _resolver(parte, destino):
+    # Los destinos pueden ser absolutos ("/xl/...") o relativos a la carpeta de la parte
+    if destino.startswith("/"):
+        return destino.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(parte), destino))
+
+
+def _relaciones(zf, parte):
+    ruta = _ruta_rels(parte)
+    if ruta not in zf.NameToInfo:
+        return []
+    raiz = ET.fromstring(zf.read(ruta))
+    return [r.attrib for r in raiz.iter(f"{{{NS_PKG_REL}}}Relationship")]
+
+
+def _tipos_contenido(zf):
+    raiz = ET.fromstring(zf.read("[Content_Types].xml"))
+    defaults = {e.get("Extension").lower(): e.get("ContentType") for e in raiz.iter(f"{{{NS_CT}}}Default")}
+    overrides = {e.get("PartName").lstrip("/"): e.get("ContentType") for e in raiz.iter(f"{{{NS_CT}}}Override")}
+    return defaults, overrides
+
+
+def _tipo_de(parte, defaults, overrides):
+    if parte in overrides:
+        return overrides[parte]
+    return defaults.get(posixpath.splitext(parte)[1].lstrip(".").lower())
+
+
+def _libro_principal(zf):
+    for rel in _relaciones(zf, ""):
+        if rel["Type"] == TIPO_DOCUMENTO:
+            return _resolver("", rel["Target"])
+    raise ErrorPaquete("El paquete no tiene libro principal")
+
+
+def _prefijo(xml, etiqueta):
+    # Prefijo con el que el documento escribe la etiqueta ("" si usa el espacio de nombres por defecto)
+    apertura = re.search(rf"<(\w+:)?{etiqueta}\b", xml)
+    if apertura is None:
+        raise ErrorPaquete(f"No se encontró <{etiqueta}>")
+    return apertura.group(1) or ""
+
+
+def _insertar_antes_del_cierre(xml, etiqueta, fragmento):
+    cierre = re.search(rf"</(\w+:)?{etiqueta}>", xml)
+    if cierre is None:
+        raise ErrorPaquete(f"No se encontró </{etiqueta}>")
+    return xml[:cierre.start()] + fragmento + xml[cierre.start():]
+
+
+# ------------------------------------------------------------------------------- ESTILOS -------------------------------------------------------------
+# (contenedor, elemento hijo) en el orden en que aparecen en styles.xml
+_COLECCIONES = [("numFmts", "numFmt"), ("fonts", "font"), ("fills", "fill"), ("borders", "border"),
+                ("cellStyleXfs", "xf"), ("cellXfs", "xf"), ("cellStyles", "cellStyle")]
+
+
+def _contar_hijos(xml, contenedor, hijo):
+    apertura = re.search(rf"<(\w+:)?{contenedor}\b[^>]*?(/?)>", xml)
+    if apertura is None:
+        return None, 0
+    if apertura.group(2):
+        return apertura, 0
+    cierre = re.search(rf"</(\w+:)?{contenedor}>", xml[apertura.end():])
+    interior = xml[apertura.end():apertura.end() + cierre.start()]
+    return apertura, len(re.findall(rf"<(\w+:)?{hijo}[\s/>]", interior))
+
+
+def _anexar_a_coleccion(xml, contenedor, hijo, fragmentos):
+    """Agrega fragmentos al final de la colección y actualiza su atributo count."""
+    apertura, cantidad = _contar_hijos(xml, contenedor, hijo)
+    if not fragmentos:
+        return xml
+    nuevos = "".join(fragmentos)
+    total = cantidad + len(fragmentos)
+    if apertura is None:
+        if contenedor != "numFmts":
+            raise ErrorPaquete(f"styles.xml no tiene <{contenedor}>")
+        # numFmts es opcional y debe ser el primer hijo de styleSheet
+        raiz = re.search(r"<(\w+:)?styleSheet\b[^>]*>", xml)
+        return xml[:raiz.end()] + f'<numFmts xmlns="{NS_MAIN}" count="{total}">{nuevos}</numFmts>' + xml[raiz.end():]
+
+    prefijo = apertura.group(1) or ""
+    atributos = re.sub(r'\s+count="\d*"', "", xml[apertura.start() + len(prefijo) + len(contenedor) + 1:apertura.end()].rstrip("/>"))
+    etiqueta = f'<{prefijo}{contenedor}{atributos} count="{total}">'
+    if apertura.group(2):
+        return xml[:apertura.start()] + etiqueta + nuevos + f"</{prefijo}{contenedor}>" + xml[apertura.end():]
+    xml = xml[:apertura.start()] + etiqueta + xml[apertura.end():]
+    return _insertar_antes_del_cierre(xml, contenedor, nuevos)
+
+
+def _combinar_estilos(estilos_original, estilos_nuevos):
+    """Agrega a styles.xml original los estilos del libro nuevo; devuelve (xml, {xf nuevo: xf final})."""
+    raiz = ET.fromstring(estilos_nuevos)
+    hijos = {contenedor: (raiz.find(f"{{{NS_MAIN}}}{contenedor}"), hijo) for contenedor, hijo in _COLECCIONES}
+
+    def elementos(contenedor):
+        nodo, hijo = hijos[contenedor]
+        return [] if nodo is None else nodo.findall(f"{{{NS_MAIN}}}{hijo}")
+
+    desplazamiento = {c: _contar_hijos(estilos_original, c, h)[1] for c, h in _COLECCIONES}
+
+    # Formatos numéricos propios (>= 164) reciben ids libres en el libro original
+    ids_usados = [int(i) for i in re.findall(r'numFmtId="(\d+)"', estilos_original)]
+    siguiente_id = max([163] + ids_usados) + 1
+    mapa_formatos = {}
+    for formato in elementos("numFmts"):
+        mapa_formatos[formato.get("numFmtId")] = str(siguiente_id)
+        formato.set("numFmtId", str(siguiente_id))
+        siguiente_id += 1
+
+    for xf in elementos("cellStyleXfs") + elementos("cellXfs"):
+        xf.set("numFmtId", mapa_formatos.get(xf.get("numFmtId", "0"), xf.get("numFmtId", "0")))
+        for atributo, contenedor in (("fontId", "fonts"), ("fillId", "fills"), ("borderId", "borders")):
+            xf.set(atributo, str(int(xf.get(atributo, "0")) + desplazamiento[contenedor]))
+
+    # Estilos con nombre: los que el original ya tiene (por ejemplo "Normal") usan los del original y no
+    # se trasplantan; los demás se agregan en orden, cada uno con su formato (cellStyleXfs)
+    del_original = {e.get("name"): e.get("xfId", "0") for e in ET.fromstring(estilos_original).iter()
+                    if e.tag.endswith("}cellStyle")}
+    mapa_estilos = {}
+    for estilo in elementos("cellStyles"):
+        if estilo.get("name") in del_original:
+            mapa_estilos[estilo.get("xfId", "0")] = del_original[estilo.get("name")]
+            hijos["cellStyles"][0].remove(estilo)
+    trasplantados = 0
+    for i, xf in enumerate(elementos("cellStyleXfs")):
+        if str(i) in mapa_estilos:
+            hijos["cellStyleXfs"][0].remove(xf)
+        else:
+            mapa_estilos[str(i)] = str(desplazamiento["cellStyleXfs"] + trasplantados)
+            trasplantados += 1
+    for estilo in elementos("cellStyles"):
+        estilo.set("xfId", mapa_estilos.get(estilo.get("xfId", "0"), "0"))
+    for xf in elementos("cellXfs"):
+        xf.set("xfId", mapa_estilos.get(xf.get("xfId", "0"), "0"))
+
+    xml = estilos_original
+    por_defecto = f' xmlns="{NS_MAIN}"'
+    for contenedor, hijo in _COLECCIONES:
+        fragmentos = [ET.tostring(e, encoding="unicode") for e in elementos(contenedor)]
+        if _contar_hijos(xml, contenedor, hijo)[0] is not None and _prefijo(xml, contenedor) == "":
+            # El original usa el espacio de nombres por defecto: no hace falta repetirlo en cada elemento
+            fragmentos = [f.replace(por_defecto, "", 1) for f in fragmentos]
+        xml = _anexar_a_coleccion(xml, contenedor, hijo, fragmentos)
+
+    mapa_xf = {i: desplazamiento["cellXfs"] + i for i in range(len(elementos("cellXfs")))}
+    return xml, mapa_xf
+
+
+# ------------------------------------------------------------------------------- HOJAS -------------------------------------------------------------
+def _textos_compartidos(zf):
+    if "xl/sharedStrings.xml" not in zf.NameToInfo:
+        return []
+    raiz = ET.fromstring(zf.read("xl/sharedStrings.xml"))
+    return ["".join(t.text or "" for t in si.iter(f"{{{NS_MAIN}}}t")) for si in raiz.findall(f"{{{NS_MAIN}}}si")]
+
+
+def _adaptar_hoja(xml, mapa_xf, textos):
+    """Reasigna estilos, pasa textos compartidos a texto en línea y quita la selección de pestaña."""
+    def estilo(m):
+        return f'{m.group(1)}="{mapa_xf.get(int(m.group(2)), m.group(2))}"'
+
+    def celda(m):
+        atributos, contenido = m.group(1), m.group(3) or ""
+        atributos = re.sub(r'\b(s)="(\d+)"', estilo, atributos)
+        if re.search(r'\bt="s"', atributos):
+            indice = int(re.search(r"<v>(\d+)</v>", contenido).group(1))
+            atributos = re.sub(r'\bt="s"', 't="inlineStr"', atributos)
+            contenido = f'<is><t xml:space="preserve">{escape(textos[indice])}</t></is>'
+        return f"<c{atributos}>{contenido}</c>" if contenido else f"<c{atributos}/>"
+
+    xml = re.sub(r"<c(\s[^>]*?)?(/>|>(.*?)</c>)", celda, xml, flags=re.S)
+    xml = re.sub(r"<row\b[^>]*>", lambda m: re.sub(r'\b(s)="(\d+)"', estilo, m.group(0)), xml)
+    xml = re.sub(r"<col\b[^>]*>", lambda m: re.sub(r'\b(style)="(\d+)"', estilo, m.group(0)), xml)
+    return re.sub(r'\s+tabSelected="1"', "", xml)
+
+
+# ------------------------------------------------------------------------------- ZIP -------------------------------------------------------------
+def _bloques_crudos(zf):
+    """{nombre: (info, inicio, fin)} con el rango de bytes de cada entrada (encabezado local + datos)."""
+    entradas = sorted(zf.infolist(), key=lambda i: i.header_offset)
+    finales = [i.header_offset for i in entradas[1:]] + [zf.start_dir]
+    return {i.filename: (i, i.header_offset, fin) for i, fin in zip(entradas, finales)}
+
+
+def _copiar_crudo(origen, destino, bloque):
+    """Copia una entrada del zip comprimida tal cual, sin descomprimirla."""
+    info, inicio, fin = bloque
+    origen.fp.seek(inicio)
+    datos = origen.fp.read(fin - inicio)
+
+    copia = copy.copy(info)
+    copia.header_offset = destino.fp.tell()
+    destino.fp.write(datos)
+    destino.filelist.append(copia)
+    destino.NameToInfo[copia.filename] = copia
+    destino.start_dir = destino.fp.tell()
+    destino._didModify = True
+
+
+def _xml_relaciones(relaciones):
+    entradas = "".join(
+        "<Relationship " + " ".join(f"{k}={quoteattr(v)}" for k, v in rel.items()) + "/>" for rel in relaciones)
+    return f'<Relationships xmlns="{NS_PKG_REL}">{entradas}</Relationships>'
+
+
+def anexar_hojas(original, nuevo):
+    """Devuelve el libro `original` con todas las hojas del libro `nuevo` agregadas al final.
+
+    Recibe y devuelve bytes o, si son grandes, el mmap de un temporal (ver servicios.desborde).
+
+    Lanza ErrorPaquete si alguna hoja nueva ya existe en el original o si el paquete
+    no tiene la estructura esperada; en ese caso hay que guardar el libro completo.
+    """
+    with zipfile.ZipFile(desborde.abrir(original)) as za, zipfile.ZipFile(desborde.abrir(nuevo)) as zb:
+        libro_a, libro_b = _libro_principal(za), _libro_principal(zb)
+        xml_libro = za.read(libro_a).decode("utf-8")
+        xml_rels = za.read(_ruta_rels(libro_a)).decode("utf-8")
+        xml_tipos = za.read("[Content_Types].xml").decode("utf-8")
+        defaults_a, _ = _tipos_contenido(za)
+        defaults_b, overrides_b = _tipos_contenido(zb)
+
+        hojas_a = list(ET.fromstring(xml_libro).iter(f"{{{NS_MAIN}}}sheet"))
+        nombres_a = {h.get("name").lower() for h in hojas_a}
+        siguiente_id = max([int(h.get("sheetId")) for h in hojas_a] + [0]) + 1
+
+        estilos_a = [_resolver(libro_a, r["Target"]) for r in _relaciones(za, libro_a) if r["Type"] == TIPO_ESTILOS]
+        if not estilos_a:
+            raise ErrorPaquete("El libro original no tiene styles.xml")
+        estilos_a = estilos_a[0]
+
+        # Hojas del libro nuevo, en orden
+        rels_b = {r["Id"]: r for r in _relaciones(zb, libro_b)}
+        hojas_b = []
+        for hoja in ET.fromstring(zb.read(libro_b)).iter(f"{{{NS_MAIN}}}sheet"):
+            nombre = hoja.get("name")
+            if nombre.lower() in nombres_a:
+                raise ErrorPaquete(f"La hoja '{nombre}' ya existe en el libro original")
+            hojas_b.append((nombre, _resolver(libro_b, rels_b[hoja.get(f"{{{NS_REL}}}id")]["Target"])))
+
+        estilos_b = [_resolver(libro_b, r["Target"]) for r in rels_b.values() if r["Type"] == TIPO_ESTILOS][0]
+        xml_estilos, mapa_xf = _combinar_estilos(za.read(estilos_a).decode("utf-8"), zb.read(estilos_b))
+        textos = _textos_compartidos(zb)
+
+        # Sufijo que no choque con ninguna parte del original (por si el archivo ya es un informe)
+        sufijo = 1
+        while any(f"_inf{sufijo}." in nombre for nombre in za.namelist()):
+            sufijo += 1
+
+        def renombrar(parte):
+            base, extension = posixpath.splitext(parte)
+            return f"{base}_inf{sufijo}{extension}"
+
+        # Partes a trasplantar: cada hoja y todo lo que cuelga de sus relaciones
+        partes, pendientes = {}, [p for _, p in hojas_b]
+        while pendientes:
+            parte = pendientes.pop()
+            if parte not in partes:
+                partes[parte] = renombrar(parte)
+                pendientes.extend(_resolver(parte, r["Target"]) for r in _relaciones(zb, parte)
+                                  if r.get("TargetMode") != "External")
+
+        salida = desborde.Salida()
+        with zipfile.ZipFile(salida, "w", zipfile.ZIP_DEFLATED) as zs:
+            # Tipos de contenido de las partes nuevas (solo si la extensión no los cubre ya)
+            agregados = []
+            for parte, destino in partes.items():
+                tipo = _tipo_de(parte, defaults_b, overrides_b)
+                if tipo and _tipo_de(destino, defaults_a, {}) != tipo:
+                    agregados.append(f'<Override PartName={quoteattr("/" + destino)} ContentType={quoteattr(tipo)}/>')
+            zs.writestr("[Content_Types].xml", _insertar_antes_del_cierre(xml_tipos, "Types", "".join(agregados)))
+
+            # Partes originales sin cambios: se copian comprimidas tal cual
+            reescritas = {"[Content_Types].xml", libro_a, _ruta_rels(libro_a), estilos_a}
+            for nombre, bloque in _bloques_crudos(za).items():
+                if nombre not in reescritas:
+                    _copiar_crudo(za, zs, bloque)
+
+            # Libro, relaciones y estilos del original con las hojas nuevas registradas
+            ids_rel = {r["Id"] for r in _relaciones(za, libro_a)}
+            prefijo = _prefijo(xml_libro, "sheets")
+            prefijo_r = re.search(rf'xmlns:(\w+)="{NS_REL}"', xml_libro)
+            declaraciones = "" if prefijo_r else f' xmlns:r="{NS_REL}"'
+            prefijo_r = prefijo_r.group(1) if prefijo_r else "r"
+            entradas_hojas, entradas_rels = [], []
+            for i, (nombre, parte) in enumerate(hojas_b):
+                rid = f"rIdInf{sufijo}_{i + 1}"
+                while rid in ids_rel:
+                    rid += "x"
+                entradas_hojas.append(
+                    f'<{prefijo}sheet{declaraciones} name={quoteattr(nombre)} '
+                    f'sheetId="{siguiente_id + i}" {prefijo_r}:id="{rid}"/>')
+                entradas_rels.append(f'<Relationship Id="{rid}" Type="{TIPO_HOJA}" Target="/{partes[parte]}"/>')
+            zs.writestr(libro_a, _insertar_antes_del_cierre(xml_libro, "sheets", "".join(entradas_hojas)))
+            zs.writestr(_ruta_rels(libro_a), _insertar_antes_del_cierre(xml_rels, "Relationships", "".join(entradas_rels)))
+            zs.writestr(estilos_a, xml_estilos)
+
+            # Partes trasplantadas desde el libro nuevo, con sus relaciones apuntando a los nombres nuevos
+            hojas = {p for _, p in hojas_b}
+            for parte, destino in partes.items():
+                contenido = zb.read(parte)
+                if parte in hojas:
+                    contenido = _adaptar_hoja(contenido.decode("utf-8"), mapa_xf, textos)
+                zs.writestr(destino, contenido)
+
+                relaciones = _relaciones(zb, parte)
+                for rel in relaciones:
+                    if rel.get("TargetMode") != "External":
+                        rel["Target"] = "/" + partes[_resolver(parte, rel["Target"])]
+                if relaciones:
+                    zs.writestr(_ruta_rels(destino), _xml_relaciones(relaciones))
+
+        return salida.contenido()
@@ -0,0 +1,131 @@
+"""Cache en disco de los informes terminados (con sus conteos en Parquet y sus avisos).
+
+Un informe se guarda con la clave (huella del archivo, proceso, opciones, versión de la
+app) y al pedirlo otra vez se devuelven los mismos bytes sin generarlo. La carpeta tiene
+un tamaño máximo: al superarlo se borran los informes usados hace más tiempo (la fecha
+de modificación de cada archivo se renueva en cada acierto). El informe, los conteos y
+los avisos van juntos en una sola entrada (``guardar_partes``): nunca se mezclan partes
+de generaciones distintas y cada consulta cuenta un solo acierto o fallo.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import uuid
+from functools import lru_cache
+from pathlib import Path
+
+from servicios import desborde
+
+RUTA_RESULTADOS = Path(os.environ.get("NOTIFICACIONES_RESULTADOS",
+                                      Path(__file__).resolve().parent.parent / "datos" / "informes"))
+MAX_MB_RESULTADOS = float(os.environ.get("NOTIFICACIONES_RESULTADOS_MB", 256))
+
+_lock = threading.Lock()
+contadores = {'aciertos': 0, 'fallos': 0}
+
+
+@lru_cache(maxsize=1)
+def version_app():
+    """NOTIFICACIONES_VERSION o la huella del código de servicios/ (cambia con cualquier cambio del informe)."""
+    if os.environ.get("NOTIFICACIONES_VERSION"):
+        return os.environ["NOTIFICACIONES_VERSION"]
+    huella = hashlib.blake2b(digest_size=8)
+    for fuente in sorted(Path(__file__).resolve().parent.glob("*.py")):
+        huella.update(fuente.read_bytes())
+    return huella.hexdigest()
+
+
+def clave(proceso, datos, *opciones):
+    # Misma huella que ingesta.hash_contenido, sin importar ingesta (pandas) al abrir la app
+    return (desborde.huella(datos), proceso) + opciones + (version_app(),)
+
+
+def _ruta(clave, carpeta):
+    nombre = hashlib.blake2b(repr(clave).encode(), digest_size=16).hexdigest()
+    return Path(carpeta or RUTA_RESULTADOS) / f"{nombre}.bin"
+
+
+def _contar(evento):
+    with _lock:
+        contadores[evento] += 1
+
+
+def obtener(clave, carpeta=None):
+    """Informe guardado con esa clave (bytes, o mmap si es grande), o None (cuenta el acierto o el fallo)."""
+    ruta = _ruta(clave, carpeta)
+    try:
+        datos = desborde.mapear_ruta(ruta)
+        os.utime(ruta)  # Usado ahora: último en salir
+    except OSError:
+        _contar('fallos')
+        return None
+    _contar('aciertos')
+    return datos
+
+
+def guardar(clave, datos, carpeta=None):
+    ruta = _ruta(clave, carpeta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    # Escritura atómica: otra sesión (o proceso) nunca lee un informe a medias
+    temporal = ruta.with_suffix(f".{uuid.uuid4().hex[:8]}.tmp")
+    temporal.write_bytes(datos)
+    os.replace(temporal, ruta)
+    recortar(carpeta)
+
+
+def recortar(carpeta=None, max_mb=None):
+    """Borra los informes menos usados hasta que la carpeta quede bajo el tamaño máximo."""
+    limite = (MAX_MB_RESULTADOS if max_mb is None else max_mb) * 1024 ** 2
+    archivos = []
+    for ruta in Path(carpeta or RUTA_RESULTADOS).glob("*.bin"):
+        try:
+            estado = ruta.stat()
+        except OSError:
+            continue  # Otra sesión lo acaba de borrar
+        archivos.append((estado.st_mtime, estado.st_size, ruta))
+
+    total = sum(tamano for _, tamano, _ in archivos)
+    for _, tamano, ruta in sorted(archivos):
+        if total <= limite:
+            break
+        try:
+            ruta.unlink(missing_ok=True)
+        except OSError:
+            continue  # En uso (mapeado por una sesión en Windows): se borra en otra pasada
+        total -= tamano
+
+
+# Partes de una misma entrada: cantidad y largo de cada parte, y luego las partes una tras otra
+def _juntar(partes):
+    cabecera = struct.pack(f"<I{len(partes)}Q", len(partes), *(len(parte) for parte in partes))
+    return b"".join([cabecera, *partes])
+
+
+def _separar(datos):
+    vista = memoryview(datos)
+    (cantidad,) = struct.unpack_from("<I", vista)
+    largos = struct.unpack_from(f"<{cantidad}Q", vista, 4)
+    inicio, partes = 4 + 8 * cantidad, []
+    for largo in largos:
+        partes.append(vista[inicio:inicio + largo])
+        inicio += largo
+    # La última parte (el informe) queda como vista del mmap si la entrada es grande; el resto se copia
+    return [bytes(parte) for parte in partes[:-1]] + [partes[-1] if isinstance(datos, mmap.mmap) else bytes(partes[-1])]
+
+
+def obtener_partes(clave, carpeta=None):
+    """Partes guardadas con `guardar_partes` (todas de la misma generación), o None (un solo acierto o fallo)."""
+    datos = obtener(clave, carpeta)
+    return None if datos is None else _separar(datos)
+
+
+def guardar_partes(clave, partes, carpeta=None):
+    """Guarda varias partes (bytes) en una sola entrada: se leen, reemplazan y borran juntas."""
+    guardar(clave, _juntar(partes), carpeta)
+
+
+def estadisticas():
+    with _lock:
+        return dict(contadores)
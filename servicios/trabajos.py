@@ -0,0 +1,166 @@
+"""Cola de trabajos en segundo plano para generar los informes.
+
+Streamlit vuelve a correr el script con cada cambio de un widget; si el informe se
+genera en el hilo del script, ese cambio corta el trabajo y lo empieza de nuevo. Aquí
+cada informe se envía a un pool acotado de hilos y queda identificado por un id: la
+vista guarda el id en la sesión, muestra el progreso y entrega los bytes al terminar.
+Un trabajo idéntico (misma clave) que sigue en curso se reutiliza en lugar de repetirlo.
+
+Además del número de hilos hay un presupuesto de memoria para todo el servidor: cada
+trabajo declara cuánta memoria estima usar y espera su turno (en orden de llegada)
+hasta que entra en lo que dejan libre los que están corriendo. Los resultados de los
+trabajos terminados (que la vista vuelve a leer en cada corrida del script) también
+cuentan en ese presupuesto, con las caches de lecturas e imágenes.
+"""
+import os
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from servicios import ingesta
+from servicios import instrumentacion
+
+# Informes generándose a la vez en todo el servidor (el resto espera en cola)
+MAX_TRABAJOS = int(os.environ.get("NOTIFICACIONES_TRABAJOS", 0)) or 2
+# Trabajos terminados que se conservan para que la sesión que los pidió los descargue, y
+# MB que pueden ocupar sus resultados (cuentan en PRESUPUESTO_MB a través de ingesta.memoria_cache_mb)
+MAX_TERMINADOS = 32
+MAX_MB_TERMINADOS = float(os.environ.get("NOTIFICACIONES_TERMINADOS_MB", 0)) or 256
+# Etapas supuestas de un informe antes de haber corrido uno (solo para la barra de progreso)
+ETAPAS_ESTIMADAS = 8
+# Memoria (MB) que pueden usar a la vez los informes en curso, sus resultados guardados y las
+# caches de lecturas (servicios/ingesta.py) e imágenes (servicios/graficos.py); un informe
+# más grande que todo el presupuesto corre solo
+PRESUPUESTO_MB = float(os.environ.get("NOTIFICACIONES_MEMORIA_MB", 0)) or 2048
+# Pico de memoria de un informe por MB de archivo, según el formato (medido con los
+# archivos de benchmarks/datos_sinteticos.py: ~30x en .xlsx, ~14x en .csv)
+FACTOR_MEMORIA = {"xlsx": 30, "csv": 15, "parquet": 30, "arrow": 10}
+
+_pool = None
+_lock = threading.Lock()
+_en_curso = {}  # clave -> Trabajo
+_terminados = ingesta.CacheLRU(MAX_TERMINADOS, MAX_MB_TERMINADOS)  # id -> Trabajo
+_etapas_por_informe = {}  # nombre -> etapas medidas en la última corrida de ese informe
+_memoria = threading.Condition()
+_memoria_en_uso = 0  # MB estimados de los trabajos admitidos
+_esperando_memoria = deque()  # Trabajos esperando memoria, en orden de llegada
+
+
+class Trabajo:
+    """Un informe enviado a la cola: id, etapa actual, progreso estimado y resultado."""
+
+    def __init__(self, nombre, clave, memoria_mb=0):
+        self.id = uuid.uuid4().hex[:12]
+        self.nombre = nombre
+        self.clave = clave
+        self.memoria_mb = memoria_mb
+        self.etapa = None  # Última etapa terminada (None mientras espera en cola)
+        self.etapas_terminadas = 0
+        self.corrida = None  # Desglose de tiempos y memoria (instrumentacion.Corrida)
+        self._futuro = None
+
+    @property
+    def terminado(self):
+        return self._futuro.done()
+
+    @property
+    def progreso(self):
+        """Fracción entre 0 y 1 según las etapas terminadas frente a las de la última corrida."""
+        if self.terminado:
+            return 1.0
+        total = _etapas_por_informe.get(self.nombre, ETAPAS_ESTIMADAS)
+        return min(self.etapas_terminadas / total, 0.95)
+
+    @property
+    def fallo(self):
+        """Excepción con la que terminó el trabajo (None si terminó bien o sigue corriendo)."""
+        return self._futuro.exception() if self.terminado else None
+
+    def resultado(self, espera=None):
+        """Lo que devolvió el trabajo; si falló, relanza la misma excepción."""
+        return self._futuro.result(espera)
+
+    def _avanzar(self, etapa):
+        self.etapa = etapa
+        self.etapas_terminadas += 1
+
+
+def _obtener_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=MAX_TRABAJOS, thread_name_prefix="informe")
+    return _pool
+
+
+def memoria_estimada(datos, tipo):
+    """MB que se estima usará un informe sobre `datos` (bytes o mmap) del formato `tipo`."""
+    return len(datos) / 1024 ** 2 * FACTOR_MEMORIA.get(tipo, max(FACTOR_MEMORIA.values()))
+
+
+@contextmanager
+def _admitir(trabajo):
+    # Espera a que el trabajo sea el primero en la fila y quepa en el presupuesto (o no haya otro corriendo)
+    global _memoria_en_uso
+    with _memoria:
+        _esperando_memoria.append(trabajo)
+        _memoria.wait_for(lambda: _esperando_memoria[0] is trabajo and (
+            _memoria_en_uso == 0
+            or _memoria_en_uso + ingesta.memoria_cache_mb() + trabajo.memoria_mb <= PRESUPUESTO_MB))
+        _esperando_memoria.popleft()
+        _memoria_en_uso += trabajo.memoria_mb
+        _memoria.notify_all()
+    try:
+        yield
+    finally:
+        with _memoria:
+            _memoria_en_uso -= trabajo.memoria_mb
+            _memoria.notify_all()
+
+
+def _ejecutar(trabajo, funcion, argumentos):
+    resultado = None
+    try:
+        with _admitir(trabajo), instrumentacion.corrida(trabajo.nombre, trabajo._avanzar) as corrida:
+            trabajo.corrida = corrida
+            resultado = funcion(*argumentos)
+        _etapas_por_informe[trabajo.nombre] = len(corrida.etapas)
+        return resultado
+    finally:
+        with _lock:
+            if _en_curso.get(trabajo.clave) is trabajo:
+                del _en_curso[trabajo.clave]
+            # Cuenta lo que ocupa el resultado en memoria; un informe mapeado desde disco (mmap) casi no cuenta
+            _terminados.guardar(trabajo.id, trabajo, ingesta.tamano_estimado(resultado))
+        with _memoria:
+            _memoria.notify_all()  # Expulsar resultados viejos pudo liberar presupuesto
+
+
+def clave(nombre, datos, *parametros):
+    """Clave de un trabajo: informe, contenido del archivo y parámetros (iguales = mismo trabajo)."""
+    return (nombre, ingesta.hash_contenido(datos)) + parametros
+
+
+def enviar(nombre, clave, funcion, *argumentos, memoria_mb=0):
+    """Envía `funcion(*argumentos)` a la cola, o devuelve el trabajo en curso con la misma clave.
+
+    `memoria_mb` es la memoria estimada del trabajo (ver memoria_estimada) para el presupuesto.
+    """
+    with _lock:
+        existente = _en_curso.get(clave)
+        if existente is not None:
+            return existente
+        trabajo = Trabajo(nombre, clave, memoria_mb)
+        trabajo._futuro = _obtener_pool().submit(_ejecutar, trabajo, funcion, argumentos)
+        _en_curso[clave] = trabajo
+        return trabajo
+
+
+def obtener(id_trabajo):
+    """Trabajo en curso o terminado recientemente con ese id (None si no existe o ya se descartó)."""
+    with _lock:
+        for trabajo in _en_curso.values():
+            if trabajo.id == id_trabajo:
+                return trabajo
+    return _terminados.obtener(id_trabajo)
@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def dibujar_en_el_proceso(monkeypatch):
+    # Sin pool de procesos: las gráficas se dibujan en serie dentro del test
+    from servicios import graficos
+    monkeypatch.setattr(graficos, "MAX_PROCESOS", 1)
@@ -0,0 +1,79 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from servicios import almacen
+from servicios import cubo as cubo_conteos
+from servicios import informe_dto_pcl
+
+NOTIFICADORES = ['BELISARIO 397', 'GESTAR INNOVACION', 'BELISARIO', 'UTMDL']
+
+
+@pytest.fixture(autouse=True)
+def almacen_temporal(tmp_path, monkeypatch):
+    monkeypatch.setattr(almacen, "RUTA_ALMACEN", tmp_path / "agregados.sqlite")
+
+
+def filas_mes(ano, mes, cantidad):
+    return [(f"{ano}-{mes:02d}-{1 + i % 28:02d}", NOTIFICADORES[(i + mes) % 4], 'NOTIFICADO') for i in range(cantidad)]
+
+
+def libro(filas):
+    df = pd.DataFrame(filas, columns=['FECHA_VISADO', 'NOTIFICADOR', 'ESTADO_INFORME'])
+    df['FECHA_VISADO'] = pd.to_datetime(df['FECHA_VISADO'])
+    datos = BytesIO()
+    with pd.ExcelWriter(datos) as escritor:
+        df.to_excel(escritor, sheet_name='DTO', index=False)
+        df[df['NOTIFICADOR'] != 'BELISARIO'].to_excel(escritor, sheet_name='PCL', index=False)
+    return datos.getvalue()
+
+
+def exports_mensuales():
+    """12 exports de 2024 (el de marzo trae 2 filas tardías de febrero) y diciembre 2023 con filas de enero 2024."""
+    exports = {mes: filas_mes(2024, mes, 5 + mes) for mes in range(1, 13)}
+    exports[3] += [("2024-02-27", 'UTMDL', 'DEVUELTO'), ("2024-02-28", 'BELISARIO 397', 'NOTIFICADO')]
+    diciembre = filas_mes(2023, 12, 9) + [("2024-01-02", 'GESTAR INNOVACION', 'NOTIFICADO')]
+    return list(exports.values()) + [diciembre]
+
+
+def comparativas(cubo):
+    return {hoja: informe_dto_pcl.conteos_comparativa(
+        cubo, dict(HOJA=[hoja], NOTIFICADOR=['BELISARIO 397', 'GESTAR INNOVACION']), 2024, 2023)
+        for hoja in ['DTO', 'PCL']}
+
+
+def tabla_mes(informe):
+    libro_informe = load_workbook(BytesIO(informe.getvalue()))
+    return {hoja: list(libro_informe[hoja].iter_rows(values_only=True)) for hoja in ['TABLA MES DTO', 'TABLA MES PCL']}
+
+
+def test_meses_acumulados_igual_al_archivo_del_ano(dibujar_en_el_proceso):
+    exports = exports_mensuales()
+    for filas in exports:
+        informe_dto_pcl.ejecucion(BytesIO(libro(filas)), acumular=True, ano_comparacion=2023)['cubo_ano']
+    # Volver a cargar el mismo export no duplica sus conteos
+    informe_dto_pcl.ejecucion(BytesIO(libro(exports[5])), acumular=True, ano_comparacion=2023)['cubo_ano']
+
+    ultimo = informe_dto_pcl.ejecucion(BytesIO(libro(exports[-2])), 'Diciembre', acumular=True, ano=2024,
+                                       ano_comparacion=2023)
+    completo = informe_dto_pcl.ejecucion(BytesIO(libro([f for filas in exports for f in filas])), 'Diciembre',
+                                         ano=2024, ano_comparacion=2023)
+
+    assert tabla_mes(ultimo['informe']) == tabla_mes(completo['informe'])
+    for hoja, (barras, pastel) in comparativas(completo['cubo_ano']).items():
+        barras_acumuladas, pastel_acumulado = comparativas(ultimo['cubo_ano'])[hoja]
+        pd.testing.assert_frame_equal(barras_acumuladas, barras, check_dtype=False, check_names=False)
+        pd.testing.assert_series_equal(pastel_acumulado, pastel, check_dtype=False, check_names=False)
+    # Las filas tardías de febrero (export de marzo) y de enero (export de diciembre 2023) están sumadas
+    febrero = cubo_conteos.conteo_por(almacen.cubo_almacenado(['DTO'], [2024]), 'MES')[2]
+    assert febrero == len(exports[1]) + 2
+
+
+def test_export_corregido_reemplaza_al_anterior():
+    cubo = informe_dto_pcl.cubo_archivo(BytesIO(libro(filas_mes(2024, 4, 10))))
+    corregido = informe_dto_pcl.cubo_archivo(BytesIO(libro(filas_mes(2024, 4, 7))))
+    almacen.guardar_cubo(cubo_conteos.filtrar(cubo, HOJA=['DTO']))
+    almacen.guardar_cubo(cubo_conteos.filtrar(corregido, HOJA=['DTO']))
+    assert int(almacen.cubo_almacenado(['DTO'])['CONTEO'].sum()) == 7
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from servicios import cubo
+
+
+def _hojas():
+    dto = pd.DataFrame({
+        'FECHA_VISADO': pd.to_datetime(['2024-01-10', '2024-01-11', '2024-02-03', None]),
+        'NOTIFICADOR': pd.Categorical(['UTMDL', 'UTMDL', 'BELISARIO', 'UTMDL']),
+        'ESTADO_INFORME': ['NOTIFICADO', 'DEVUELTO', 'NOTIFICADO', None],
+    })
+    pcl = pd.DataFrame({
+        'FECHA_VISADO': pd.to_datetime(['2023-12-30', '2024-01-02']),
+        'NOTIFICADOR': ['UTMDL', 'BELISARIO'],
+    })
+    return {'DTO': dto, 'PCL': pcl}
+
+
+def test_construir_cubo_cuenta_cada_combinacion():
+    conteos = cubo.construir_cubo(_hojas())
+    assert list(conteos.columns) == cubo.DIMENSIONES + ['CONTEO']
+    assert conteos['CONTEO'].sum() == 6
+    enero = cubo.filtrar(conteos, HOJA=['DTO'], ANO=[2024], MES=[1])
+    assert sorted(zip(enero['ESTADO_INFORME'], enero['CONTEO'])) == [('DEVUELTO', 1), ('NOTIFICADO', 1)]
+    # Sin columna ESTADO_INFORME la hoja entra igual, con el estado vacío
+    assert cubo.filtrar(conteos, HOJA=['PCL'])['ESTADO_INFORME'].isna().all()
+    assert cubo.rechazadas(conteos, ['ANO', 'ESTADO_INFORME'], HOJA=['DTO']) == {
+        'FECHA_VISADO': 1, 'ESTADO_INFORME': 1}
+
+
+def test_combinar_suma_los_bloques():
+    hojas = _hojas()
+    primero, segundo = hojas['DTO'].iloc[:2], hojas['DTO'].iloc[2:]
+    combinado = cubo.combinar([cubo.construir_cubo({'DTO': primero}), cubo.construir_cubo({'DTO': segundo}),
+                               cubo.construir_cubo({})])
+    completo = cubo.construir_cubo({'DTO': hojas['DTO']})
+    assert cubo.tabla(combinado, 'ESTADO_INFORME', 'NOTIFICADOR').equals(
+        cubo.tabla(completo, 'ESTADO_INFORME', 'NOTIFICADOR'))
+    assert combinado['CONTEO'].sum() == 4
+    assert cubo.combinar([]).empty
+
+
+def test_tabla_igual_al_groupby_de_las_filas():
+    hojas = _hojas()
+    conteos = cubo.construir_cubo(hojas)
+    filas = pd.concat([hojas['DTO'], hojas['PCL']])
+    esperado = filas.groupby(['ESTADO_INFORME', 'NOTIFICADOR'], observed=True).size().unstack(fill_value=0)
+    obtenido = cubo.tabla(conteos, 'ESTADO_INFORME', 'NOTIFICADOR')
+    assert obtenido.to_dict() == esperado.to_dict()
+    # Los filtros sin valor (None) no filtran
+    assert cubo.tabla(conteos, 'MES', 'HOJA', ANO=[2024], NOTIFICADOR=None).to_dict() == {
+        'DTO': {1: 2, 2: 1}, 'PCL': {1: 1, 2: 0}}
@@ -0,0 +1,36 @@
+import mmap
+
+from servicios import desborde
+
+
+def test_compartir_mismo_contenido_una_vez(monkeypatch):
+    monkeypatch.setattr(desborde, "UMBRAL_MB", 0)
+    datos = b"FECHA_VISADO,NOTIFICADOR\n" * 100
+    primero = desborde.compartir(datos)
+    assert isinstance(primero, mmap.mmap)
+    assert desborde.compartir(bytes(datos)) is primero
+    assert desborde.abrir(primero).read() == datos
+    assert desborde.compartir(datos + b"x") is not primero
+
+
+def test_huella_de_la_subida_se_calcula_una_vez(monkeypatch):
+    from servicios import ingesta, resultados, trabajos
+
+    datos = b"FECHA_VISADO,NOTIFICADOR\n" * 100
+    esperada = desborde.huella(datos)
+    resultados.version_app()  # Memorizada: no cuenta como huella de la subida
+    calculos = []
+    blake2b = desborde.hashlib.blake2b
+    monkeypatch.setattr(desborde.hashlib, "blake2b", lambda *a, **k: calculos.append(1) or blake2b(*a, **k))
+
+    contenido = desborde.Contenido(datos)
+    assert ingesta.leer_bytes(desborde.abrir(contenido)) is contenido
+    assert ingesta.hash_contenido(contenido) == esperada
+    assert trabajos.clave("proceso2", contenido, "csv")[1] == esperada
+    assert resultados.clave("proceso2", contenido, "csv")[0] == esperada
+    # El mmap del contenido pasado a disco hereda la huella
+    monkeypatch.setattr(desborde, "UMBRAL_MB", 0)
+    mapeo = desborde.compartir(contenido)
+    assert isinstance(mapeo, mmap.mmap)
+    assert ingesta.hash_contenido(ingesta.leer_bytes(desborde.abrir(mapeo))) == esperada
+    assert len(calculos) == 1
@@ -0,0 +1,44 @@
+import pandas as pd
+
+from servicios import cubo, ingesta
+from servicios.fechas import IndiceFechas
+
+
+def _hoja():
+    return pd.DataFrame({
+        'FECHA_VISADO': pd.to_datetime(['2024-01-20', '2023-01-05', None, '2024-01-02', '2024-03-31', '2024-02-29']),
+        'NOTIFICADOR': ['A', 'B', 'C', 'D', 'E', 'F'],
+    })
+
+
+def test_indice_distingue_los_anos_y_conserva_el_orden():
+    indice = IndiceFechas(_hoja())
+    assert len(indice) == 6
+    assert indice.mes(2024, 1)['NOTIFICADOR'].tolist() == ['A', 'D']
+    assert indice.mes(2023, 1)['NOTIFICADOR'].tolist() == ['B']
+    assert indice.mes(2024, 4).empty
+    assert indice.meses() == [(2023, 1), (2024, 1), (2024, 2), (2024, 3)]
+    assert indice.anos() == [2023, 2024]
+
+
+def test_indice_rango_excluye_el_final_y_las_filas_sin_fecha():
+    indice = IndiceFechas(_hoja())
+    seleccion = indice.rango('2024-01-02', '2024-03-31')
+    assert seleccion['NOTIFICADOR'].tolist() == ['A', 'D', 'F']
+    assert len(indice.rango('2000-01-01', '2100-01-01')) == 5
+
+
+def test_tipar_lee_fechas_que_no_son_iso():
+    df = pd.DataFrame({
+        'FECHA_VISADO': ['2024-03-15', '15/03/2024', '2024-03-15 10:30:00', 'sin fecha', None],
+        'NOTIFICADOR': ['A'] * 5,
+        'ESTADO_INFORME': ['NOTIFICADO'] * 5,
+    })
+    fechas = ingesta.tipar(df)['FECHA_VISADO']
+    assert fechas.iloc[:3].dt.date.astype(str).tolist() == ['2024-03-15'] * 3
+    assert fechas.iloc[3:].isna().all()
+
+    # Lo que no se pudo leer entra en las filas rechazadas del cubo
+    conteos = cubo.construir_cubo({'BASE': ingesta.tipar(df)})
+    assert cubo.rechazadas(conteos, ['ANO']) == {'FECHA_VISADO': 2}
+    assert IndiceFechas(df).mes(2024, 3)['NOTIFICADOR'].tolist() == ['A', 'A', 'A']
@@ -0,0 +1,72 @@
+import pytest
+
+from servicios import instrumentacion
+from servicios.flujo import ErrorFlujo, Flujo
+
+
+def test_cada_etapa_corre_una_vez_por_ejecucion():
+    flujo = Flujo()
+    llamadas = []
+
+    @flujo.etapa('archivo')
+    def lectura(archivo):
+        llamadas.append('lectura')
+        return archivo.upper()
+
+    @flujo.etapa('lectura')
+    def conteo(texto):
+        llamadas.append('conteo')
+        return len(texto)
+
+    @flujo.etapa('lectura', 'conteo', medir=False, nombre='resumen')
+    def resumir(texto, total):
+        return f"{texto}:{total}"
+
+    ejecucion = flujo.ejecucion(archivo="abc")
+    assert ejecucion['resumen'] == "ABC:3"
+    assert ejecucion['conteo'] == 3
+    assert llamadas == ['lectura', 'conteo']
+    assert ejecucion.ejecutadas == ['lectura', 'conteo', 'resumen']
+
+    # Otra ejecución no comparte resultados
+    assert flujo.ejecucion(archivo="xy")['resumen'] == "XY:2"
+    assert llamadas == ['lectura', 'conteo'] * 2
+
+
+def test_solo_las_etapas_medidas_entran_en_la_corrida():
+    flujo = Flujo()
+
+    @flujo.etapa('valor')
+    def siguiente(valor):
+        return valor + 1
+
+    @flujo.etapa('siguiente', medir=False)
+    def doble(valor):
+        return valor * 2
+
+    with instrumentacion.corrida("prueba") as corrida:
+        assert flujo.ejecucion(valor=1)['doble'] == 4
+    assert [etapa[0] for etapa in corrida.etapas] == ['siguiente']
+
+
+def test_errores_de_dependencias():
+    flujo = Flujo()
+
+    @flujo.etapa('hojas')
+    def cubo(hojas):
+        return hojas
+
+    @flujo.etapa('cubo')
+    def hojas(cubo):
+        return cubo
+
+    @flujo.etapa('archivo')
+    def lectura(archivo):
+        return archivo
+
+    with pytest.raises(ErrorFlujo, match="Dependencia circular: cubo -> hojas -> cubo"):
+        flujo.ejecucion()['cubo']
+    with pytest.raises(ErrorFlujo, match="desconocido: archivo"):
+        flujo.ejecucion()['lectura']
+    # Un valor inicial con el nombre de una etapa la reemplaza y corta el ciclo
+    assert flujo.ejecucion(hojas=[1])['cubo'] == [1]
@@ -0,0 +1,54 @@
+import pandas as pd
+from openpyxl import Workbook
+
+from servicios import graficos, informe_estado
+
+
+def _conteo(estados, notificadores=('UTMDL', 'BELISARIO')):
+    # El estado i tiene i + 1 registros por notificador: los últimos son los más grandes
+    datos = {n: [i + 1 for i in range(estados)] for n in notificadores}
+    return pd.DataFrame(datos, index=pd.Index([f"ESTADO {i:03d}" for i in range(estados)], name='ESTADO_INFORME'))
+
+
+def test_agrupar_otros_conserva_los_mas_grandes_y_el_total():
+    conteo = _conteo(10)
+    assert graficos.agrupar_otros(conteo, 10) is conteo
+
+    agrupado = graficos.agrupar_otros(conteo, 4)
+    assert agrupado.index.tolist() == ['ESTADO 007', 'ESTADO 008', 'ESTADO 009', graficos.ETIQUETA_OTROS]
+    assert agrupado.index.name == 'ESTADO_INFORME'
+    assert agrupado.loc[graficos.ETIQUETA_OTROS, 'UTMDL'] == sum(range(1, 8))
+    assert agrupado.sum().equals(conteo.sum())
+
+
+def test_paginar_reparte_sin_perder_estados():
+    conteo = _conteo(130)
+    paginas = graficos.paginar(conteo)
+    assert [len(p) for p in paginas] == [60, 60, 10]
+    assert pd.concat(paginas).equals(conteo)
+    assert len(graficos.paginar(conteo.iloc[:60])) == 1
+
+
+def test_barras_estado_sin_etiquetas_con_muchas_barras():
+    pocas, _ = graficos.barras_estado(_conteo(10), ['#809bce'])
+    assert len(pocas.axes[0].texts) == 20
+    muchas, guardado = graficos.barras_estado(_conteo(graficos.ESTADOS_POR_IMAGEN, 'ABCDE'), ['#809bce'])
+    assert len(muchas.axes[0].texts) == 0
+    (ancho, _), dpi = graficos.tamano_barras_estado(graficos.ESTADOS_POR_IMAGEN, 5)
+    assert guardado['dpi'] == dpi and ancho * dpi <= graficos.PIXELES_MAXIMOS_ANCHO
+
+
+def test_grafica_barras_una_imagen_por_pagina(dibujar_en_el_proceso):
+    libro = Workbook()
+    informe_estado.grafica_barras(_conteo(200), libro)
+    # Sin max_estados: MAX_ESTADOS estados (el último es OTROS), en dos imágenes
+    assert len(libro['Distribución de Notificadores']._images) == 2
+
+    libro = Workbook()
+    informe_estado.grafica_barras(_conteo(200), libro, max_estados=5)
+    assert len(libro['Distribución de Notificadores']._images) == 1
+
+    libro = Workbook()
+    informe_estado.grafica_barras(_conteo(200), libro, nativa=True, max_estados=5)
+    hoja = libro['Distribución de Notificadores']
+    assert len(hoja._charts) == 1 and not hoja._images
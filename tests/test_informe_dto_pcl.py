@@ -0,0 +1,35 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from servicios import informe_dto_pcl
+
+
+pytestmark = pytest.mark.usefixtures("dibujar_en_el_proceso")
+
+
+def libro_dos_anos():
+    # 2024 con todos los notificadores; 2023 solo con UTMDL (sin BELISARIO 397 ni GESTAR INNOVACION)
+    filas = [('2024-01-10', 'BELISARIO 397', 'NOTIFICADO'), ('2024-01-11', 'GESTAR INNOVACION', 'DEVUELTO'),
+             ('2024-01-12', 'BELISARIO', 'NOTIFICADO'), ('2024-02-03', 'UTMDL', 'NOTIFICADO'),
+             ('2023-01-15', 'UTMDL', 'NOTIFICADO')]
+    df = pd.DataFrame(filas, columns=['FECHA_VISADO', 'NOTIFICADOR', 'ESTADO_INFORME'])
+    df['FECHA_VISADO'] = pd.to_datetime(df['FECHA_VISADO'])
+    datos = BytesIO()
+    with pd.ExcelWriter(datos) as escritor:
+        df.to_excel(escritor, sheet_name='DTO', index=False)
+        df.to_excel(escritor, sheet_name='PCL', index=False)
+    return datos.getvalue()
+
+
+@pytest.mark.parametrize("ano, comparacion, nativas", [(2023, None, False), (2023, None, True), (2024, 2023, False)])
+def test_ano_con_pocos_datos(ano, comparacion, nativas):
+    salida = informe_dto_pcl.generar_informe_dto_pcl(BytesIO(libro_dos_anos()), 'Enero', graficas_nativas=nativas,
+                                                     ano=ano, ano_comparacion=comparacion)
+    libro = load_workbook(BytesIO(salida.getvalue()))
+    assert {'DTO_Enero', 'PCL_Enero', 'TABLA MES DTO', 'COMPARATIVA AÑO DTO'} <= set(libro.sheetnames)
+    # La hoja del mes solo tiene las filas del año pedido
+    fechas = [fila[0] for fila in libro['DTO_Enero'].iter_rows(min_row=2, values_only=True) if fila[0]]
+    assert fechas and all(f.year == ano for f in fechas)
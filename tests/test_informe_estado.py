@@ -0,0 +1,32 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import generar_informes
+from servicios import informe_estado
+
+CSV = (b"FECHA_VISADO,NOTIFICADOR,ESTADO_INFORME\n2024-01-10,BELISARIO 397,NOTIFICADO\n"
+       b"2024-01-11,UTMDL,DEVUELTO\n2024-01-12,UTMDL,NOTIFICADO\n")
+
+
+pytestmark = pytest.mark.usefixtures("dibujar_en_el_proceso")
+
+
+@pytest.mark.parametrize("incluir_base", [True, False])
+def test_csv_como_bytes(incluir_base):
+    informe = informe_estado.generar_tablas_estado_informe(CSV, "csv", incluir_base)
+    libro = load_workbook(BytesIO(informe.getvalue()))
+    assert libro.sheetnames[:1] == ['Tabla Procesada']
+    assert ('BASE' in libro.sheetnames) == incluir_base
+
+
+def test_cli_archivo_sin_columnas(tmp_path, capsys):
+    (tmp_path / "bueno.csv").write_bytes(CSV)
+    pd.DataFrame(index=range(3)).to_parquet(tmp_path / "vacio.parquet")
+    assert generar_informes.main([str(tmp_path), "--procesos", "1"]) == 1
+    salida = capsys.readouterr()
+    assert "vacio.parquet: ERROR El archivo está vacío" in salida.err
+    assert (tmp_path / "informes" / "bueno_informe_estado_informe.xlsx").exists()
+    assert not (tmp_path / "informes" / "vacio_informe_estado_informe.xlsx").exists()
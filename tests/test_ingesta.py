@@ -0,0 +1,73 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from servicios import ingesta
+
+
+def test_normalizar_categorias_variantes():
+    serie = pd.Series(['belisario 397', 'BELISARIO397', ' Belisario  397 ', '  ', None, 'BELISARIO'])
+    normalizada = ingesta.normalizar_categorias(serie, ingesta.ALIAS['NOTIFICADOR'])
+    assert normalizada.tolist()[:3] == ['BELISARIO 397'] * 3
+    assert normalizada.iloc[3:5].isna().all()
+    assert normalizada.iloc[5] == 'BELISARIO'
+
+
+def test_normalizar_categorias_columna_vacia():
+    for serie in (pd.Series([None, np.nan, None], dtype=object), pd.Series(['', '  ', ' '])):
+        normalizada = ingesta.normalizar_categorias(serie)
+        assert len(normalizada) == 3
+        assert normalizada.isna().all()
+        assert len(normalizada.cat.categories) == 0
+
+
+def test_tipar_estado_vacio():
+    df = ingesta.tipar(pd.DataFrame({'FECHA_VISADO': ['2024-01-05', 'no es fecha'],
+                                     'NOTIFICADOR': ['UTMDL', 'utmdl '],
+                                     'ESTADO_INFORME': [None, None]}))
+    assert df['NOTIFICADOR'].tolist() == ['UTMDL', 'UTMDL']
+    assert df['ESTADO_INFORME'].isna().all()
+    assert df['FECHA_VISADO'].isna().tolist() == [False, True]
+
+
+def test_lector_csv_cuenta_lineas_descartadas():
+    csv = (b"FECHA_VISADO,NOTIFICADOR,ESTADO_INFORME\n" + b"2024-01-01,UTMDL,NOTIFICADO\n" * 10
+           + b"1,2,3,4\n" + b"2024-01-02,UTMDL,NOTIFICADO\n" * 10 + b"1,2,3,4,5\n")
+    for opciones in ({}, {'sep': None}):
+        lector = ingesta.LectorCSV(io.BytesIO(csv), tamano_bloque=7, **opciones)
+        assert sum(len(bloque) for bloque in lector) == 20
+        assert lector.lineas_descartadas == 2
+
+
+def test_cache_lru_acotada_por_tamano():
+    cache = ingesta.CacheLRU(max_entradas=10, max_mb=2.5)
+    mega = pd.DataFrame({'a': np.zeros(1024 ** 2 // 8)})  # 1 MB de datos
+    cache.guardar("uno", mega)
+    cache.guardar("dos", {'DTO': mega})
+    assert len(cache) == 2 and 2 < cache.mb < 2.5
+    cache.guardar("tres", mega)
+    assert "uno" not in cache and "dos" in cache and "tres" in cache
+    # Una sola entrada más grande que el tope se conserva (es la que se va a usar)
+    cache.guardar("grande", pd.concat([mega] * 3))
+    assert len(cache) == 1 and cache.mb > 2.5
+
+
+def test_cache_lru_cuenta_los_textos():
+    # 20 000 textos en una columna object: los punteros son ~0,15 MB, las cadenas ~1,2 MB más
+    textos = pd.DataFrame({'NOTIFICADOR': [f"NOTIFICADOR NÚMERO {i:06d}" for i in range(20000)]}, dtype=object)
+    assert ingesta.tamano_estimado(textos) > 4 * textos.memory_usage(deep=False).sum()
+    cache = ingesta.CacheLRU(max_entradas=10, max_mb=2)
+    cache.guardar("uno", textos)
+    cache.guardar("dos", textos.copy())
+    assert "uno" not in cache and "dos" in cache
+
+
+def test_memoria_cache_suma_las_caches_con_tope():
+    antes = ingesta.memoria_cache_mb()
+    imagenes = ingesta.CacheLRU(max_entradas=10, max_mb=1)
+    imagenes.guardar("png", b"\x89PNG" + bytes(300_000))
+    assert imagenes.mb > 0.25
+    assert abs(ingesta.memoria_cache_mb() - antes - imagenes.mb) < 1e-9
+    imagenes.guardar("otro", b"\x89PNG" + bytes(900_000))
+    assert "png" not in imagenes
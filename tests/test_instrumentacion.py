@@ -0,0 +1,56 @@
+import json
+import logging
+import threading
+
+from servicios import instrumentacion
+
+
+def test_etapas_se_agregan_a_la_corrida_activa():
+    terminadas = []
+    with instrumentacion.corrida("proceso1", terminadas.append) as corrida:
+        with instrumentacion.etapa("lectura"):
+            pass
+        with instrumentacion.etapa("guardado"):
+            pass
+
+    assert terminadas == ["lectura", "guardado"]
+    tabla = corrida.tabla()
+    assert tabla['etapa'].tolist() == ["lectura", "guardado"]
+    assert list(tabla.columns) == ['etapa', 'segundos', 'mb', 'rss_mb']
+    assert (tabla['rss_mb'] > 0).all()
+    assert corrida.segundos == tabla['segundos'].sum()
+
+    # Fuera de una corrida la etapa solo va al log
+    with instrumentacion.etapa("suelta"):
+        pass
+    assert len(corrida.etapas) == 2
+
+
+def test_corridas_de_hilos_distintos_no_se_mezclan():
+    corridas = {}
+
+    def correr(nombre):
+        with instrumentacion.corrida(nombre) as corrida:
+            for _ in range(20):
+                with instrumentacion.etapa(nombre):
+                    pass
+        corridas[nombre] = corrida
+
+    hilos = [threading.Thread(target=correr, args=(nombre,)) for nombre in ("uno", "dos")]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    for nombre, corrida in corridas.items():
+        assert [etapa[0] for etapa in corrida.etapas] == [nombre] * 20
+
+
+def test_registro_json_por_etapa(caplog):
+    with caplog.at_level(logging.INFO, logger="notificaciones.etapas"):
+        with instrumentacion.corrida("proceso2") as corrida:
+            with instrumentacion.etapa("agregado", filas=10):
+                pass
+    registros = [json.loads(r.getMessage()) for r in caplog.records]
+    assert [r['evento'] for r in registros] == ['etapa', 'corrida']
+    assert registros[0]['informe'] == "proceso2" and registros[0]['filas'] == 10
+    assert registros[1]['corrida'] == corrida.id and registros[1]['etapas'] == 1
@@ -0,0 +1,158 @@
+import re
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Border, Font, NamedStyle, PatternFill, Side
+
+from servicios import informe_dto_pcl
+from servicios import paquete
+
+MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# Libro como lo guardan Excel y otras herramientas: espacio de nombres con prefijo, formato
+# numérico propio (164), estilos con nombre propios (cellStyleXfs) y textos compartidos
+PARTES_EXCEL = {
+    "[Content_Types].xml":
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        '</Types>',
+    "_rels/.rels":
+        f'<Relationships xmlns="{PKG}"><Relationship Id="rId1" Type="{REL}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>',
+    "xl/workbook.xml":
+        f'<x:workbook xmlns:x="{MAIN}" xmlns:r="{REL}"><x:bookViews><x:workbookView activeTab="0"/></x:bookViews>'
+        '<x:sheets><x:sheet name="Datos" sheetId="1" r:id="rId1"/></x:sheets></x:workbook>',
+    "xl/_rels/workbook.xml.rels":
+        f'<Relationships xmlns="{PKG}">'
+        f'<Relationship Id="rId1" Type="{REL}/worksheet" Target="worksheets/sheet1.xml"/>'
+        f'<Relationship Id="rId2" Type="{REL}/styles" Target="styles.xml"/>'
+        f'<Relationship Id="rId3" Type="{REL}/sharedStrings" Target="sharedStrings.xml"/></Relationships>',
+    "xl/worksheets/sheet1.xml":
+        f'<x:worksheet xmlns:x="{MAIN}"><x:sheetViews><x:sheetView tabSelected="1" workbookViewId="0"/></x:sheetViews>'
+        '<x:sheetData><x:row r="1"><x:c r="A1" t="s"><x:v>0</x:v></x:c><x:c r="B1" s="1"><x:v>1.23456</x:v></x:c>'
+        '<x:c r="C1" s="2" t="s"><x:v>1</x:v></x:c></x:row></x:sheetData></x:worksheet>',
+    "xl/styles.xml":
+        f'<x:styleSheet xmlns:x="{MAIN}">'
+        '<x:numFmts count="1"><x:numFmt numFmtId="164" formatCode="0.000"/></x:numFmts>'
+        '<x:fonts count="2"><x:font><x:sz val="11"/><x:name val="Calibri"/></x:font>'
+        '<x:font><x:i/><x:sz val="11"/><x:name val="Calibri"/></x:font></x:fonts>'
+        '<x:fills count="2"><x:fill><x:patternFill patternType="none"/></x:fill>'
+        '<x:fill><x:patternFill patternType="gray125"/></x:fill></x:fills>'
+        '<x:borders count="1"><x:border><x:left/><x:right/><x:top/><x:bottom/><x:diagonal/></x:border></x:borders>'
+        '<x:cellStyleXfs count="2"><x:xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>'
+        '<x:xf numFmtId="0" fontId="1" fillId="0" borderId="0"/></x:cellStyleXfs>'
+        '<x:cellXfs count="3"><x:xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<x:xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<x:xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="1" applyFont="1"/></x:cellXfs>'
+        '<x:cellStyles count="2"><x:cellStyle name="Normal" xfId="0" builtinId="0"/>'
+        '<x:cellStyle name="Propio" xfId="1"/></x:cellStyles></x:styleSheet>',
+    "xl/sharedStrings.xml":
+        f'<x:sst xmlns:x="{MAIN}" count="2" uniqueCount="2"><x:si><x:t>Original</x:t></x:si>'
+        '<x:si><x:t>Cursiva</x:t></x:si></x:sst>',
+}
+
+
+def libro_excel():
+    datos = BytesIO()
+    with zipfile.ZipFile(datos, "w", zipfile.ZIP_DEFLATED) as zf:
+        for nombre, contenido in PARTES_EXCEL.items():
+            zf.writestr(nombre, contenido)
+    return datos.getvalue()
+
+
+def libro_informe():
+    libro = Workbook()
+    hoja = libro.active
+    hoja.title = "Informe"
+    tabla = NamedStyle(name="tabla", font=Font(bold=True, color="FF0000"),
+                       border=Border(left=Side(style="thin", color="000000")),
+                       fill=PatternFill(start_color="D9D9D9", end_color="D9D9D9", fill_type="solid"))
+    libro.add_named_style(tabla)
+    hoja["A1"] = "ESTADO"
+    hoja["A1"].style = "tabla"
+    hoja["B1"] = 0.125
+    hoja["B1"].number_format = "0.0%"
+    hoja["A2"] = "Texto con <signos> & acentos: ñ"
+    hoja.append(["ESTADO", 7])
+    datos = BytesIO()
+    libro.save(datos)
+    return datos.getvalue()
+
+
+def anexado():
+    return bytes(paquete.anexar_hojas(libro_excel(), libro_informe()))
+
+
+def test_hojas_y_estilos_leidos_de_vuelta():
+    libro = load_workbook(BytesIO(anexado()))
+    assert libro.sheetnames == ["Datos", "Informe"]
+
+    # El original conserva sus valores y sus estilos (formato propio 164 y estilo con nombre)
+    datos = libro["Datos"]
+    assert datos["A1"].value == "Original"
+    assert datos["B1"].number_format == "0.000"
+    assert datos["C1"].value == "Cursiva" and datos["C1"].font.i and datos["C1"].style == "Propio"
+
+    # Las celdas nuevas apuntan a sus estilos trasplantados (índices desplazados)
+    informe = libro["Informe"]
+    a1 = informe["A1"]
+    assert a1.value == "ESTADO" and a1.style == "tabla"
+    assert a1.font.b and a1.font.color.rgb == "00FF0000"
+    assert a1.fill.start_color.rgb == "00D9D9D9" and a1.border.left.style == "thin"
+    assert informe["B1"].number_format == "0.0%" and informe["B1"].value == 0.125
+    assert informe["A2"].value == "Texto con <signos> & acentos: ñ"
+    assert informe["A3"].value == "ESTADO" and informe["B3"].value == 7
+    # El formato nuevo no pisa al propio del original
+    assert informe["A2"].style == "Normal"
+
+
+def test_textos_en_linea_tipos_y_relaciones():
+    with zipfile.ZipFile(BytesIO(anexado())) as zf:
+        nombres = zf.namelist()
+        hoja = [n for n in nombres if n.startswith("xl/worksheets/sheet1_inf")]
+        assert len(hoja) == 1
+        xml_hoja = zf.read(hoja[0]).decode()
+        assert 't="s"' not in xml_hoja and 't="inlineStr"' in xml_hoja
+        assert "<is><t" in xml_hoja and "tabSelected" not in xml_hoja
+
+        tipos = zf.read("[Content_Types].xml").decode()
+        assert f'PartName="/{hoja[0]}"' in tipos
+        rels = zf.read("xl/_rels/workbook.xml.rels").decode()
+        assert re.search(rf'Type="{REL}/worksheet" Target="/{re.escape(hoja[0])}"', rels)
+        # El libro original se copia sin cambios y registra la hoja con su prefijo
+        assert zf.read("xl/worksheets/sheet1.xml").decode() == PARTES_EXCEL["xl/worksheets/sheet1.xml"]
+        libro = zf.read("xl/workbook.xml").decode()
+        assert '<x:sheet name="Informe" sheetId="2"' in libro
+        estilos = zf.read("xl/styles.xml").decode()
+        assert re.search(r'<x:cellStyles count="3">', estilos)
+
+
+def test_hoja_repetida_usa_el_libro_completo(monkeypatch, dibujar_en_el_proceso):
+    # Un informe generado antes: ya trae TABLA MES DTO, así que las hojas no se pueden anexar por partes
+    filas = pd.DataFrame({'FECHA_VISADO': pd.to_datetime(['2024-01-10', '2024-01-11']),
+                          'NOTIFICADOR': ['BELISARIO 397', 'UTMDL'], 'ESTADO_INFORME': ['NOTIFICADO'] * 2})
+    original = BytesIO()
+    with pd.ExcelWriter(original) as escritor:
+        filas.to_excel(escritor, sheet_name='DTO', index=False)
+        filas.to_excel(escritor, sheet_name='PCL', index=False)
+        pd.DataFrame({'viejo': [1]}).to_excel(escritor, sheet_name='TABLA MES DTO', index=False)
+    llamadas = []
+    anexar = paquete.anexar_hojas
+    monkeypatch.setattr(paquete, "anexar_hojas", lambda *a: llamadas.append(1) or anexar(*a))
+
+    informe = informe_dto_pcl.ejecucion(BytesIO(original.getvalue()), 'Enero')['informe']
+    libro = load_workbook(BytesIO(informe.getvalue()))
+    assert llamadas == [1]
+    assert libro.sheetnames.count('TABLA MES DTO') == 1
+    assert [c.value for c in libro['TABLA MES DTO'][1]] == ["FECHA VISADO", "TOTAL", "PORCENTAJE"]
+    assert libro['TABLA MES DTO']['B2'].value == 2
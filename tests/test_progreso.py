@@ -0,0 +1,88 @@
+from streamlit.testing.v1 import AppTest
+
+
+def _app(ruta):
+    import streamlit as st
+    from pathlib import Path
+    from servicios.informe_estado import ErrorInforme
+    from views.progreso import generar_en_segundo_plano
+
+    def generar(datos):
+        # El primer intento falla; el segundo termina bien
+        intentos = Path(datos.decode())
+        intentos.write_text(intentos.read_text() + "x")
+        if len(intentos.read_text()) == 1:
+            raise ErrorInforme("El archivo no se puede leer.")
+        return "informe"
+
+    try:
+        st.write(generar_en_segundo_plano("prueba_progreso", generar, ruta.encode()).resultado())
+    except ErrorInforme as e:
+        st.error(str(e))
+
+
+def test_trabajo_fallido_se_reintenta(tmp_path):
+    intentos = tmp_path / "intentos"
+    intentos.write_text("")
+    app = AppTest.from_function(_app, args=(str(intentos),), default_timeout=30)
+    app.run()
+    assert app.error[0].value == "El archivo no se puede leer."
+    app.run()
+    assert not app.error
+    assert app.markdown[0].value == "informe"
+    assert intentos.read_text() == "xx"
+
+
+def _app_desborde():
+    import streamlit as st
+    from views.progreso import generar_en_segundo_plano
+
+    def generar(datos):
+        return type(datos).__name__
+
+    st.write(generar_en_segundo_plano("prueba_desborde", generar, b"x" * 1000).resultado())
+    st.slider("Un widget cualquiera", 0, 10)
+
+
+def test_archivo_grande_se_pasa_a_disco_al_enviar(monkeypatch):
+    from servicios import desborde
+
+    monkeypatch.setattr(desborde, "UMBRAL_MB", 0)
+    llamadas = []
+    compartir = desborde.compartir
+    monkeypatch.setattr(desborde, "compartir", lambda datos: llamadas.append(1) or compartir(datos))
+
+    app = AppTest.from_function(_app_desborde, default_timeout=30)
+    app.run()
+    assert app.markdown[0].value == "mmap"
+    app.slider[0].set_value(5).run()
+    app.run()
+    assert len(llamadas) == 1
+
+
+def _app_subida(ruta):
+    import streamlit as st
+    from pathlib import Path
+    from types import SimpleNamespace
+    from views.progreso import contenido_subido
+
+    # Como un UploadedFile: el file_id cambia con cada archivo subido
+    file_id = Path(ruta).read_text()
+    archivo = SimpleNamespace(file_id=file_id, getvalue=lambda: f"contenido {file_id}".encode())
+    datos = contenido_subido(archivo, "prueba")
+    st.write(f"{id(datos)} {datos.decode()} {datos.huella}")
+
+
+def test_subida_se_lee_una_vez_por_archivo(tmp_path):
+    from servicios import desborde
+
+    subida = tmp_path / "subida"
+    subida.write_text("uno")
+    app = AppTest.from_function(_app_subida, args=(str(subida),), default_timeout=30)
+    app.run()
+    primera = app.markdown[0].value
+    app.run()
+    assert app.markdown[0].value == primera
+    subida.write_text("dos")
+    app.run()
+    assert app.markdown[0].value.split()[1:] == ["contenido", "dos", desborde.huella(b"contenido dos")]
@@ -0,0 +1,38 @@
+import os
+
+from servicios import desborde, resultados
+
+
+def test_partes_en_una_sola_entrada(tmp_path, monkeypatch):
+    resultados.contadores.update(aciertos=0, fallos=0)
+    clave = resultados.clave("proceso2", b"datos", "csv")
+    assert resultados.obtener_partes(clave, tmp_path) is None
+
+    resultados.guardar_partes(clave, [b"aviso 1\naviso 2", b"PAR1", b"informe"], tmp_path)
+    avisos, agregados, informe = resultados.obtener_partes(clave, tmp_path)
+    assert (avisos, agregados, informe) == (b"aviso 1\naviso 2", b"PAR1", b"informe")
+    assert len(list(tmp_path.glob("*.bin"))) == 1
+    assert resultados.estadisticas() == {'aciertos': 1, 'fallos': 1}
+
+    # Una entrada grande se mapea: el informe vuelve como vista del mmap y se lee con desborde.abrir
+    monkeypatch.setattr(desborde, "UMBRAL_MB", 0)
+    avisos, agregados, informe = resultados.obtener_partes(clave, tmp_path)
+    assert isinstance(informe, memoryview)
+    assert desborde.abrir(informe).read() == b"informe"
+    assert agregados == b"PAR1"
+
+
+def test_recortar_borra_los_menos_usados(tmp_path, monkeypatch):
+    claves = [resultados.clave("proceso1", bytes([i]), "Enero") for i in range(3)]
+    for i, clave in enumerate(claves):
+        resultados.guardar(clave, bytes(1024 ** 2), tmp_path)
+        os.utime(resultados._ruta(clave, tmp_path), (1000 + i, 1000 + i))
+
+    # Con 4 MB y tope de 2,5 se borran las dos más viejas; un acierto renueva la fecha de la segunda
+    monkeypatch.setattr(resultados, "MAX_MB_RESULTADOS", 2.5)
+    assert resultados.obtener(claves[1], tmp_path) is not None
+    resultados.guardar(resultados.clave("proceso1", b"nuevo", "Enero"), bytes(1024 ** 2), tmp_path)
+    assert len(list(tmp_path.glob("*.bin"))) == 2
+    assert resultados.obtener(claves[0], tmp_path) is None
+    assert resultados.obtener(claves[2], tmp_path) is None
+    assert resultados.obtener(claves[1], tmp_path) is not None
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from servicios import ingesta, trabajos
+
+
+def _esperar(condicion, limite=5):
+    fin = time.monotonic() + limite
+    while not condicion():
+        assert time.monotonic() < fin
+        time.sleep(0.01)
+
+
+def test_admitir_respeta_el_presupuesto_y_el_orden(monkeypatch):
+    monkeypatch.setattr(trabajos, "PRESUPUESTO_MB", 100)
+    monkeypatch.setattr(ingesta, "memoria_cache_mb", lambda: 0)
+    admitidos, salidas, hilos = [], {}, []
+
+    def correr(nombre, memoria_mb):
+        salidas[nombre] = threading.Event()
+        trabajo = trabajos.Trabajo(nombre, nombre, memoria_mb)
+
+        def admitir():
+            with trabajos._admitir(trabajo):
+                admitidos.append(nombre)
+                salidas[nombre].wait(5)
+        hilos.append(threading.Thread(target=admitir))
+        hilos[-1].start()
+
+    correr("primero", 60)
+    _esperar(lambda: admitidos == ["primero"])
+    correr("segundo", 60)  # 120 MB no entran: espera
+    _esperar(lambda: len(trabajos._esperando_memoria) == 1)
+    correr("chico", 10)  # Entraría, pero llegó después del segundo
+    _esperar(lambda: len(trabajos._esperando_memoria) == 2)
+    time.sleep(0.05)
+    assert admitidos == ["primero"]
+
+    salidas["primero"].set()
+    _esperar(lambda: admitidos == ["primero", "segundo", "chico"])
+    salidas["segundo"].set()
+    salidas["chico"].set()
+
+    # Un trabajo más grande que todo el presupuesto corre si no hay otro corriendo
+    for hilo in hilos:
+        hilo.join(5)
+    correr("enorme", 500)
+    _esperar(lambda: admitidos[-1] == "enorme")
+    salidas["enorme"].set()
+    hilos[-1].join(5)
+    assert trabajos._memoria_en_uso == 0
+
+
+def test_resultados_terminados_cuentan_en_el_presupuesto():
+    trabajos._terminados.limpiar()
+    antes = ingesta.memoria_cache_mb()
+    trabajo = trabajos.enviar("prueba", ("prueba", 1), lambda: (bytes(3 * 1024 ** 2), None, []))
+    trabajo.resultado(5)
+    _esperar(lambda: trabajos.obtener(trabajo.id) is trabajo and trabajos._terminados.mb > 0)
+    assert 3 <= ingesta.memoria_cache_mb() - antes < 3.1
+
+    def fallar():
+        raise ValueError("sin datos")
+    fallido = trabajos.enviar("prueba", ("prueba", 2), fallar)
+    _esperar(lambda: fallido.terminado and trabajos._terminados.obtener(fallido.id) is fallido)
+    assert 3 <= trabajos._terminados.mb < 3.1
+    trabajos._terminados.limpiar()
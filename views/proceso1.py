@@ -1,270 +1,13 @@
 import streamlit as st
-import pandas as pd
-from io import BytesIO
-from openpyxl import Workbook, load_workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.styles import Border, Side, PatternFill
-import calendar
-import matplotlib.pyplot as plt
-from openpyxl.drawing.image import Image
-import csv
-
-# Colores 
-colores = ['#FFB897', '#B8E6A7', '#809bce', "#64a09d", '#CBE6FF', '#E6E6FA']
-# Meses 
-meses_en_espanol = {
-    1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril', 5: 'Mayo', 6: 'Junio', 
-    7: 'Julio', 8: 'Agosto', 9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'
-}
-
-# ------------------------------------------------------------------------------- GRÁFICOS DE BARRAS -------------------------------------------------------------
-def graficas_barras(df, colores, nombre_hoja):
-    conteo = df.groupby(['MES', 'NOTIFICADOR']).size().unstack(fill_value=0)
-    conteo.index = conteo.index.map(lambda m: meses_en_espanol[m].capitalize())
-    num_meses = len(conteo)
-    num_notificadores = len(conteo.columns)
-    fig_width = max(12, num_meses * 1.2)
-    fig_height = max(8, num_notificadores * 1.0)
-    ax = conteo.plot(kind='bar', figsize=(fig_width, fig_height), color=colores)
-    ax.set_xlabel('Mes')
-    ax.set_ylabel('Número de Datos')
-    ax.legend(title='NOTIFICADOR', bbox_to_anchor=(1.2, 1), loc='upper left', fontsize=10)
-
-    for p in ax.patches:
-        ax.annotate(f'{p.get_height()}', 
-                    (p.get_x() + p.get_width() / 2., p.get_height()), 
-                    xytext=(0, 5),
-                    textcoords='offset points',
-                    ha='center', va='bottom', fontsize=10, color='black')
-
-    grafico_path = f"{nombre_hoja}_grafico_barras.png"
-    ax.get_figure().savefig(grafico_path, transparent=True, bbox_inches="tight")
-    return grafico_path
-
-
-def graficas_barras_comparativa(df, nombre_hoja):
-    # Filtrar solo los datos de BELISARIO397 y GESTAR INNOVACION
-    df_comparativa = df[df['NOTIFICADOR'].isin(['BELISARIO 397', 'GESTAR INNOVACION'])]
-    
-    conteo = df_comparativa.groupby(['MES', 'NOTIFICADOR']).size().unstack(fill_value=0)
-    conteo.index = conteo.index.map(lambda m: meses_en_espanol[m].capitalize())
-    
-    # Crear la gráfica de barras
-    fig, ax = plt.subplots(figsize=(12, 8))
-    conteo.plot(kind='bar', ax=ax, color=colores)
-    ax.set_xlabel('Mes')
-    ax.set_ylabel('Número de Datos')
-    ax.legend(title='Notificadores', bbox_to_anchor=(1.2, 1), loc='upper left', fontsize=10)
-
-    for p in ax.patches:
-        ax.annotate(f'{p.get_height()}', 
-                    (p.get_x() + p.get_width() / 2., p.get_height()), 
-                    xytext=(0, 5),
-                    textcoords='offset points',
-                    ha='center', va='bottom', fontsize=10, color='black')
-
-    grafico_path = f"{nombre_hoja}_grafico_barras_comparativa.png"
-    plt.tight_layout()
-    plt.savefig(grafico_path, transparent=True, bbox_inches="tight")
-    return grafico_path
-
-def graficas_barras_belisario_utmdl(df, nombre_hoja, mes):
-    # Filtrar solo los datos de BELISARIO y UTMDL para el mes seleccionado
-    df_filtrado = df[(df['NOTIFICADOR'].isin(['BELISARIO', 'UTMDL'])) & (df['MES'] == mes)]
-    
-    conteo = df_filtrado.groupby(['MES', 'NOTIFICADOR']).size().unstack(fill_value=0)
-    conteo.index = conteo.index.map(lambda m: meses_en_espanol[m].capitalize())
-    
-    # Crear la gráfica de barras
-    fig, ax = plt.subplots(figsize=(12, 8))
-    conteo.plot(kind='bar', ax=ax, color=colores)
-    ax.set_xlabel('Mes')
-    ax.set_ylabel('Número de Datos')
-    ax.legend(title='Notificadores', bbox_to_anchor=(1.2, 1), loc='upper left', fontsize=10)
-
-    for p in ax.patches:
-        ax.annotate(f'{p.get_height()}', 
-                    (p.get_x() + p.get_width() / 2., p.get_height()), 
-                    xytext=(0, 5),
-                    textcoords='offset points',
-                    ha='center', va='bottom', fontsize=10, color='black')
-
-    grafico_path = f"{nombre_hoja}_grafico_barras_belisario_utmdl_{mes}.png"
-    plt.tight_layout()
-    plt.savefig(grafico_path, transparent=True, bbox_inches="tight")
-    return grafico_path
-# ------------------------------------------------------------------------------- GRÁFICOS DE PASTEL -------------------------------------------------------------
-def graficas_pastel(df, nombre_hoja):
-    conteo = df.groupby('MES').size()
-    conteo.index = conteo.index.map(lambda m: meses_en_espanol[m].capitalize())  
-    fig, ax = plt.subplots(figsize=(8, 8))
-    ax.pie(conteo, labels=conteo.index, autopct='%1.1f%%', startangle=90, colors=colores)
-    ax.legend(title='Meses', loc='center left', bbox_to_anchor=(1.05, 0.5), fontsize=10)
-
-    grafico_path = f"{nombre_hoja}_grafico_pastel.png"
-    plt.tight_layout()
-    plt.savefig(grafico_path, transparent=True, bbox_inches="tight")
-    return grafico_path
-
-def graficas_pastel_belisario_utmdl(df, nombre_hoja):
-    # Agrupar por NOTIFICADOR (BELISARIO y UTMDL)
-    conteo = df[df['NOTIFICADOR'].isin(['BELISARIO', 'UTMDL'])].groupby('NOTIFICADOR').size()
-    
-    # Crear una gráfica de pastel para BELISARIO y UTMDL
-    fig, ax = plt.subplots(figsize=(8, 8))
-    ax.pie(conteo, labels=conteo.index, autopct='%1.1f%%', startangle=90, colors=colores)
-    ax.legend(title='Notificadores', loc='center left', bbox_to_anchor=(1.05, 0.5), fontsize=10)
-
-    grafico_path = f"{nombre_hoja}_grafico_pastel_belisario_utmdl.png"
-    plt.tight_layout()
-    plt.savefig(grafico_path, transparent=True, bbox_inches="tight")
-    return grafico_path
-
-def graficapastel_ano(df, nombre_hoja):
-    # Filtrar solo los datos de BELISARIO397 y GESTAR INNOVACION
-    df_comparativa = df[df['NOTIFICADOR'].isin(['BELISARIO 397', 'GESTAR INNOVACION'])]
-    
-    # Crear gráfico de pastel comparativo por notificadores
-    conteo = df_comparativa.groupby('NOTIFICADOR').size()
-    
-    fig, ax = plt.subplots(figsize=(8, 8))
-    ax.pie(conteo, labels=conteo.index, autopct='%1.1f%%', startangle=90, colors=colores)
-    ax.legend(title='Notificadores', loc='center left', bbox_to_anchor=(1.05, 0.5), fontsize=10)
-
-    # Guardar el gráfico en un archivo
-    grafico_path = f"{nombre_hoja}_grafico_pastel_ano.png"
-    plt.tight_layout()
-    plt.savefig(grafico_path, transparent=True, bbox_inches="tight")
-    return grafico_path
-# ------------------------------------------------------------------------------- HOJAS -------------------------------------------------------------
-# Hoja por Mes Seleccionado
-def crear_hoja_mes_seleccionado(libro, nombre_hoja, df, mes):
-    # Asegurarse de que la columna 'MES' esté presente en el DataFrame antes de filtrar
-    df['MES'] = df['FECHA_VISADO'].dt.month
-    
-    # Filtrar los datos por el mes seleccionado
-    df_mes = df[df['MES'] == mes]
-    
-    # Crear la hoja en el libro
-    if nombre_hoja in libro.sheetnames:
-        del libro[nombre_hoja]
-    hoja = libro.create_sheet(nombre_hoja)
-
-    # Escribir los datos filtrados
-    for i, row in enumerate(dataframe_to_rows(df_mes, index=False, header=True), start=1):
-        for j, value in enumerate(row, start=1):
-            hoja.cell(row=i, column=j, value=value)
-
-    # Generar gráficos de barras y pastel por mes
-    grafico_barras_belisario_utmdl_path = graficas_barras_belisario_utmdl(df, nombre_hoja, mes)  # Ahora pasa el mes
-    img_barras_belisario_utmdl = Image(grafico_barras_belisario_utmdl_path)
-    hoja.add_image(img_barras_belisario_utmdl, 'E5')
-
-    # Generar gráfica de pastel para BELISARIO y UTMDL
-    grafico_belisario_utmdl_path = graficas_pastel_belisario_utmdl(df, nombre_hoja)
-    img_belisario_utmdl = Image(grafico_belisario_utmdl_path)
-    hoja.add_image(img_belisario_utmdl, 'E35')  # Colocar la imagen más abajo en la hoja
-
-# Hoja "COMPARATIVA AÑO"
-def crear_comparativa_ano_dto(libro, df_dto):
-    # Crear la hoja "COMPARATIVA AÑO DTO"
-    if "COMPARATIVA AÑO DTO" in libro.sheetnames:
-        del libro["COMPARATIVA AÑO DTO"]
-    hoja = libro.create_sheet("COMPARATIVA AÑO DTO")
-
-    # Filtrar solo los datos de BELISARIO397 y GESTAR INNOVACION
-    df_comparativa = df_dto[df_dto['NOTIFICADOR'].isin(['BELISARIO 397', 'GESTAR INNOVACION'])]
-
-    # Generar el gráfico de barras comparativo
-    grafico_barras_comparativa_path = graficas_barras_comparativa(df_comparativa, "COMPARATIVA AÑO DTO")
-    img_comparativa_barras = Image(grafico_barras_comparativa_path)
-    hoja.add_image(img_comparativa_barras, 'E5')
-
-    # Generar gráfico de pastel comparativo
-    grafico_pastel_comparativa_path = graficapastel_ano(df_comparativa, "COMPARATIVA AÑO DTO")
-    img_comparativa_pastel = Image(grafico_pastel_comparativa_path)
-    hoja.add_image(img_comparativa_pastel, 'E20')
-# Hoja "COMPARATIVA AÑO PCL"
-def crear_comparativa_ano_pcl(libro, df_pcl):
-    if "COMPARATIVA AÑO PCL" in libro.sheetnames:
-        del libro["COMPARATIVA AÑO PCL"]
-    hoja = libro.create_sheet("COMPARATIVA AÑO PCL")
-
-    # Filtrar solo los datos de BELISARIO397 y GESTAR INNOVACION
-    df_comparativa = df_pcl[df_pcl['NOTIFICADOR'].isin(['BELISARIO 397', 'GESTAR INNOVACION'])]
-
-    # Generar el gráfico de barras comparativo
-    grafico_barras_comparativa_path = graficas_barras_comparativa(df_comparativa, "COMPARATIVA AÑO PCL")
-    img_comparativa_barras = Image(grafico_barras_comparativa_path)
-    hoja.add_image(img_comparativa_barras, 'E5')
-
-    # Generar gráfico de pastel comparativo
-    grafico_pastel_comparativa_path = graficapastel_ano(df_comparativa, "COMPARATIVA AÑO DTO")
-    img_comparativa_pastel = Image(grafico_pastel_comparativa_path)
-    hoja.add_image(img_comparativa_pastel, 'E20')
-
-# ------------------------------------------------------------------------------- GENERAR TABLAS PARA DTO Y PCL: TABLA MES -------------------------------------------------------------
-def generar_tablas_dto_y_pcl(libro, df_dto, df_pcl):
-    def crear_hoja(nombre_hoja, df):
-        df['MES'] = df['FECHA_VISADO'].dt.month
-        conteo = df.groupby('MES').size().reset_index(name='TOTAL')
-        conteo['MES'] = conteo['MES'].apply(lambda m: meses_en_espanol[m].capitalize())
-        total_general = conteo['TOTAL'].sum()
-        conteo['PORCENTAJE'] = (conteo['TOTAL'] / total_general * 100).round(2).astype(str) + '%'
-
-        fila_total = pd.DataFrame({
-            'MES': ['Total general'],
-            'TOTAL': [total_general],
-            'PORCENTAJE': ['100.0%']
-        })
-        tabla_final = pd.concat([conteo, fila_total], ignore_index=True)
-
-        if nombre_hoja in libro.sheetnames:
-            del libro[nombre_hoja]
-        hoja = libro.create_sheet(nombre_hoja)
-
-        borde = Border(
-            left=Side(style="thin", color="000000"),
-            right=Side(style="thin", color="000000"),
-            top=Side(style="thin", color="000000"),
-            bottom=Side(style="thin", color="000000")
-        )
-        fondo_gris = PatternFill(start_color="D9D9D9", end_color="D9D9D9", fill_type="solid")
-
-        hoja['A1'] = "FECHA VISADO"
-        hoja['B1'] = "TOTAL"
-        hoja['C1'] = "PORCENTAJE"
-
-        for celda in ['A1', 'B1', 'C1']:
-            hoja[celda].border = borde
-            hoja[celda].fill = fondo_gris
-
-        for i, fila in enumerate(dataframe_to_rows(tabla_final, index=False, header=False), start=2):
-            hoja[f'A{i}'] = fila[0]
-            hoja[f'B{i}'] = fila[1]
-            hoja[f'C{i}'] = fila[2]
-
-            hoja[f'A{i}'].border = borde
-            hoja[f'B{i}'].border = borde
-            hoja[f'C{i}'].border = borde
-
-            if fila[0] == "Total general":
-                hoja[f'A{i}'].fill = fondo_gris
-                hoja[f'B{i}'].fill = fondo_gris
-                hoja[f'C{i}'].fill = fondo_gris
-
-        # Generar gráficos
-        grafico_barras_path = graficas_barras(df, colores, nombre_hoja)
-        img_barras = Image(grafico_barras_path)
-        hoja.add_image(img_barras, 'E5')
-
-        grafico_pastel_path = graficas_pastel(df, nombre_hoja)
-        img_pastel = Image(grafico_pastel_path)
-        hoja.add_image(img_pastel, 'E20')
-
-    # Crear las hojas para DTO y PCL
-    crear_hoja("TABLA MES DTO", df_dto)
-    crear_hoja("TABLA MES PCL", df_pcl)
+from servicios import almacen
+from servicios import desborde
+from servicios import ingesta
+from servicios import informe_dto_pcl
+from servicios import resultados
+from servicios import trabajos
+from servicios.informe_dto_pcl import meses_en_espanol, TODOS_LOS_MESES
+from servicios.informe_estado import ErrorInforme
+from views.progreso import contenido_subido, generar_en_segundo_plano
 
 # ------------------------------------------------------------------------------- FUNCIONES DE SUBIDA Y DESCARGA -------------------------------------------------------------
 def descargar_archivo(output, nombre="archivo_procesado.xlsx"):
@@ -275,32 +18,41 @@ def descargar_archivo(output, nombre="archivo_procesado.xlsx"):
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
+def descargar_agregados(datos, nombre="conteos.parquet"):
+    # Conteos agregados para tableros, al lado del Excel
+    st.download_button(
+        label="📥 Descargar conteos (Parquet)",
+        data=datos,
+        file_name=nombre,
+        mime="application/vnd.apache.parquet"
+    )
+
 def subir_archivo():
-    archivo = st.file_uploader("Sube un archivo (.xlsx o .csv)", type=["xlsx", "csv"])
+    archivo = st.file_uploader("Sube un archivo (.xlsx, .csv, .parquet o .arrow)",
+                               type=["xlsx", "csv", "parquet", "arrow", "feather"])
 
     if archivo is not None:
         try:
             nombre_archivo = archivo.name.lower()
-
-            if nombre_archivo.endswith(".xlsx"):
-                xls = pd.ExcelFile(archivo)
-                hojas = xls.sheet_names
-
-                if "DTO" in hojas and "PCL" in hojas:
-                    st.success("¡Archivo Excel válido! Se encontraron las hojas DTO y PCL.")
-                    return archivo, "xlsx"
-                else:
-                    if "DTO" not in hojas:
-                        st.error("La hoja 'DTO' no se encuentra en el archivo.")
-                    if "PCL" not in hojas:
-                        st.error("La hoja 'PCL' no se encuentra en el archivo.")
-                    return None, None
+            datos = contenido_subido(archivo, "proceso1")
+
+            if nombre_archivo.endswith(".xlsx") or ingesta.tipo_por_nombre(nombre_archivo) in ingesta.TIPOS_ARROW:
+                # Solo nombres de hojas y encabezados; en Parquet / Arrow la columna HOJA separa DTO y PCL
+                tipo = ingesta.tipo_por_nombre(nombre_archivo)
+                problemas = ingesta.validar(datos, tipo, ['DTO', 'PCL'], informe_dto_pcl.COLUMNAS_REQUERIDAS)
+                if not problemas:
+                    st.success("¡Archivo Excel válido! Se encontraron las hojas DTO y PCL." if tipo == "xlsx"
+                               else "¡Archivo válido! La columna HOJA tiene registros DTO y PCL.")
+                    return datos, tipo
+                for problema in problemas:
+                    st.error(problema)
+                return None, None
 
             elif nombre_archivo.endswith(".csv"):
-                df = pd.read_csv(archivo)
-                if "DTO" in df.columns and "PCL" in df.columns:
+                columnas = ingesta.columnas_csv(datos)  # Solo el encabezado
+                if "DTO" in columnas and "PCL" in columnas:
                     st.success("¡Archivo CSV válido! Se encontraron las columnas DTO y PCL.")
-                    return archivo, "csv"
+                    return datos, "csv"
                 else:
                     st.warning("El archivo CSV no contiene columnas llamadas 'DTO' y 'PCL'.")
                     return None, None
@@ -313,41 +65,81 @@ def subir_archivo():
 
 
 # ------------------------------------------------------------------------------- FLUJO ---------------------------------------------------------------------------------
-def procesar_archivos():
-    archivo, tipo = subir_archivo()
-
-    if archivo and tipo == "xlsx":
-        # Mostrar el selector de mes con los meses en español
-        mes_seleccionado = st.selectbox("Selecciona el mes", list(meses_en_espanol.values()))  # Ahora muestra los meses en español
+def anos_del_archivo(datos, tipo):
+    # Corre en la cola de trabajos: lee las hojas una vez (quedan en cache para el informe) y devuelve los años
+    try:
+        return informe_dto_pcl.anos_archivo(desborde.abrir(datos), tipo)
+    except Exception as e:
+        raise ErrorInforme(f"Error al procesar el archivo {tipo}: {e}") from e
+
+
+def generar_informe(datos, tipo, mes_seleccionado, ano, ano_comparacion, acumular, graficas_nativas):
+    # Corre en un hilo de la cola de trabajos: recibe el contenido del archivo (bytes o mmap) y devuelve
+    # (informe, conteos en Parquet, avisos); un informe grande vuelve como mmap de un temporal
+    clave = resultados.clave("proceso1", datos, mes_seleccionado, ano, ano_comparacion, graficas_nativas)
+    # Con el almacén el informe depende de los meses ya cargados: no se usa la cache de informes
+    if not acumular:
+        guardado = resultados.obtener_partes(clave)
+        if guardado is not None:
+            avisos, agregados, informe = guardado
+            return informe, agregados, avisos.decode().splitlines()
+
+    ejecucion = informe_dto_pcl.ejecucion(desborde.abrir(datos), mes_seleccionado, acumular, graficas_nativas, tipo,
+                                          ano, ano_comparacion)
+    try:
+        informe, agregados, avisos = ejecucion['informe'].getvalue(), ejecucion['agregados_parquet'], ejecucion['rechazadas']
+    except Exception as e:
+        raise ErrorInforme(f"Error al generar el informe: {e}") from e
+    if not acumular:
+        resultados.guardar_partes(clave, ["\n".join(avisos).encode(), agregados, informe])
+    return informe, agregados, avisos
 
-        # Leer las hojas DTO y PCL
-        df_dto = pd.read_excel(archivo, sheet_name='DTO', parse_dates=['FECHA_VISADO'])
-        df_pcl = pd.read_excel(archivo, sheet_name='PCL', parse_dates=['FECHA_VISADO'])
 
-        # Crear archivo con los datos filtrados por el mes seleccionado
-        archivo.seek(0)
-        archivo_bytes = BytesIO(archivo.read())
-        libro = load_workbook(archivo_bytes)
-
-        # Convertir el mes seleccionado a número usando el diccionario
-        mes_num = list(meses_en_espanol.values()).index(mes_seleccionado) + 1  # Obtiene el índice del mes (1-12)
+def procesar_archivos():
+    """Muestra la subida y el informe; devuelve el desglose por etapa del trabajo (o None)."""
+    datos, tipo = subir_archivo()
 
-        # Llamar a la función para generar las hojas con el mes seleccionado
-        crear_hoja_mes_seleccionado(libro, f"DTO_{mes_seleccionado}", df_dto, mes_num)
-        crear_hoja_mes_seleccionado(libro, f"PCL_{mes_seleccionado}", df_pcl, mes_num)
+    if datos is not None and tipo in ("xlsx",) + ingesta.TIPOS_ARROW:
+        # Mostrar el selector de mes con los meses en español
+        mes_seleccionado = st.selectbox("Selecciona el mes", list(meses_en_espanol.values()) + [TODOS_LOS_MESES])  # Ahora muestra los meses en español
 
-        # Llamar a la función para generar las tablas de DTO y PCL
-        generar_tablas_dto_y_pcl(libro, df_dto, df_pcl)
+        # Con el almacén, TABLA MES y COMPARATIVA AÑO incluyen los meses cargados antes
+        acumular = st.checkbox("Acumular con los meses ya cargados (TABLA MES y COMPARATIVA AÑO del año completo)", value=False)
 
-        # Llamar a la función para crear la hoja de comparativa de año
-        crear_comparativa_ano_dto(libro, df_dto)
-        crear_comparativa_ano_pcl(libro, df_pcl)
+        graficas_nativas = st.checkbox("Gráficas nativas de Excel (editables, sin imágenes)", value=False)
 
-        output = BytesIO()
-        libro.save(output)
-        output.seek(0)
-        descargar_archivo(output, nombre="informe_dto_pcl_mes.xlsx")
+        # Año de las hojas de mes y TABLA MES (el más reciente por defecto) y, opcional, otro año para
+        # la COMPARATIVA AÑO (del archivo o, al acumular, de los ya guardados en el almacén)
+        memoria_mb = trabajos.memoria_estimada(datos, tipo)
+        try:
+            anos = generar_en_segundo_plano("proceso1_anos", anos_del_archivo, datos, tipo, memoria_mb=memoria_mb,
+                                            texto="Leyendo el archivo").resultado()
+        except ErrorInforme as e:
+            st.error(str(e))
+            return None
+        ano = st.selectbox("Año", anos[::-1]) if len(anos) > 1 else None
+        actual = ano or (anos[-1] if anos else None)
+        comparables = set(anos) | (set(almacen.anos_guardados(['DTO', 'PCL'])) if acumular else set())
+        ano_comparacion = st.selectbox("Comparar con el año (COMPARATIVA AÑO)",
+                                       [None] + sorted(comparables - {actual}, reverse=True),
+                                       format_func=lambda a: "Sin comparación" if a is None else str(a))
+
+        # Crear archivo con los datos filtrados por el mes seleccionado (en segundo plano)
+        trabajo = generar_en_segundo_plano("proceso1", generar_informe, datos,
+                                           tipo, mes_seleccionado, ano, ano_comparacion, acumular, graficas_nativas,
+                                           memoria_mb=memoria_mb)
+        try:
+            output, agregados, avisos = trabajo.resultado()
+        except ErrorInforme as e:
+            st.error(str(e))
+            return trabajo.corrida
+        for aviso in avisos:
+            st.warning(aviso)
+        descargar_archivo(desborde.abrir(output), nombre="informe_dto_pcl_mes.xlsx")
+        descargar_agregados(agregados, nombre="conteos_mes_notificador.parquet")
         st.success("✅ Archivo generado con éxito.")
-    elif archivo and tipo == "csv":
-        st.warning("Actualmente el procesamiento está disponible solo para archivos .xlsx con hojas DTO y PCL.")
-
+        return trabajo.corrida
+    elif datos is not None and tipo == "csv":
+        st.warning("Actualmente el procesamiento está disponible solo para archivos .xlsx con hojas DTO y PCL "
+                   "o .parquet / .arrow con columna HOJA.")
+    return None
@@ -1,177 +1,11 @@
-import pandas as pd
 import streamlit as st
-import matplotlib.pyplot as plt
-import numpy as np
-from itertools import cycle, islice
-from io import BytesIO
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image as ExcelImage
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.styles import Border, Side, PatternFill
-
-def cargar_archivo(archivo, tipo):
-    try:
-        if tipo == "xlsx":
-            # Cargar ambas hojas (DTO y PCL)
-            df_dto = pd.read_excel(archivo, sheet_name='DTO')
-            df_pcl = pd.read_excel(archivo, sheet_name='PCL')
-
-            # Unir ambas hojas en un solo DataFrame
-            df_base = pd.concat([df_dto, df_pcl], ignore_index=True)
-
-        elif tipo == "csv":
-            df_base = pd.read_csv(archivo, on_bad_lines='skip', delimiter=",")  # 'skip' ignora las líneas mal formadas
-
-        # Limpiar posibles filas con datos inconsistentes
-        df_base.dropna(how='all', inplace=True)  # Eliminar filas vacías
-        df_base = df_base.reset_index(drop=True)  # Resetear el índice
-
-        return df_base
-    except Exception as e:
-        st.error(f"Error al procesar el archivo {tipo}: {e}")
-        return None
-
-def grafica_barras(df_base, workbook):
-    # Verificar columnas necesarias
-    if 'ESTADO_INFORME' not in df_base.columns or 'NOTIFICADOR' not in df_base.columns:
-        st.error("El archivo no contiene las columnas necesarias: 'ESTADO_INFORME' y 'NOTIFICADOR'.")
-        return workbook
-
-    # Agrupar datos
-    conteo = df_base.groupby(['ESTADO_INFORME', 'NOTIFICADOR']).size().unstack(fill_value=0)
-
-    estados = conteo.index
-    notificadores = conteo.columns
-    x = np.arange(len(estados))
-
-    colores = ['#809bce', '#95b8d1', "#79cbd1", '#B8E6A7', '#4C9A2A']
-    colores_usar = list(islice(cycle(colores), len(notificadores)))
-
-    total_width = 0.8
-    bar_width = total_width / len(notificadores)
-
-    fig, ax = plt.subplots(figsize=(max(15, len(estados) * 0.4), 6))
-
-    for i, notificador in enumerate(notificadores):
-        bars = ax.bar(x + i * bar_width, conteo[notificador], width=bar_width, label=notificador, color=colores_usar[i])
-        for bar in bars:
-            yval = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width() / 2, yval, int(yval), ha='center', va='bottom', fontsize=8)
-
-    ax.set_xticks(x + total_width / 2 - bar_width / 2)
-    ax.set_xticklabels(estados, rotation=90, ha='center', fontsize=7)
-    ax.set_xlabel('Estado de Informe')
-    ax.set_ylabel('Cantidad')
-    ax.set_title('Distribución de Notificadores por Estado de Informe')
-    ax.legend(title='Notificadores', bbox_to_anchor=(1.02, 1), loc='upper left')
-    plt.tight_layout()
-
-    # Guardar la figura como imagen con fondo transparente
-    imgdata = BytesIO()
-    plt.savefig(imgdata, format='png', dpi=200, transparent=True)  # <- AQUÍ el cambio
-    plt.close()
-    imgdata.seek(0)
-
-    # Crear hoja nueva
-    if 'Distribución de Notificadores' in [s.title for s in workbook.worksheets]:
-        sheet = workbook['Distribución de Notificadores']
-    else:
-        sheet = workbook.create_sheet('Distribución de Notificadores')
-
-    # Insertar la imagen usando openpyxl
-    imagen = ExcelImage(imgdata)
-    imagen.anchor = 'A1'
-    sheet.add_image(imagen)
-
-    return workbook
-
-
-# -------------------------- FUNCIONES DE PROCESAMIENTO Y GENERACIÓN DE TABLAS ---------------------------
-def generar_tablas_estado_informe(archivo, tipo):
-    df_base = cargar_archivo(archivo, tipo)
-
-    if df_base is not None:
-        if "ESTADO_INFORME" in df_base.columns and "NOTIFICADOR" in df_base.columns:
-            conteo = df_base.groupby(['ESTADO_INFORME', 'NOTIFICADOR']).size().unstack(fill_value=0)
-            conteo['TOTAL GENERAL'] = conteo.sum(axis=1)
-            total_general_sum = conteo['TOTAL GENERAL'].sum()
-            conteo['TOTAL %'] = (conteo['TOTAL GENERAL'] / total_general_sum) * 100
-            conteo['TOTAL %'] = conteo['TOTAL %'].apply(lambda x: f"{x:.2f}%" if pd.notnull(x) else '')
-
-            libro = Workbook()
-            hoja_procesada = libro.active
-            hoja_procesada.title = "Tabla Procesada"
-
-            hoja_procesada.cell(row=1, column=1, value="ESTADO INFORME")
-            for col_idx, notificador in enumerate(conteo.columns[:-2], start=2):
-                hoja_procesada.cell(row=1, column=col_idx, value=notificador)
-            hoja_procesada.cell(row=1, column=len(conteo.columns)-1, value="TOTAL GENERAL")
-            hoja_procesada.cell(row=1, column=len(conteo.columns), value="TOTAL %")
-
-            row_start = 2
-            for estado, valores in conteo.iterrows():
-                hoja_procesada.cell(row=row_start, column=1, value=estado)
-                for col_idx, notificador in enumerate(conteo.columns[:-2], start=2):
-                    hoja_procesada.cell(row=row_start, column=col_idx, value=valores.get(notificador, 0))
-                hoja_procesada.cell(row=row_start, column=len(valores)-2, value=valores.get('TOTAL GENERAL', 0))
-                hoja_procesada.cell(row=row_start, column=len(valores)-1, value=valores.get('TOTAL %', ''))
-                row_start += 1
-
-            hoja_procesada.cell(row=row_start, column=1, value="TOTAL GENERAL")
-            for col_idx in range(2, len(conteo.columns)-1):
-                hoja_procesada.cell(row=row_start, column=col_idx, value=conteo.iloc[:, col_idx - 1].sum())
-            hoja_procesada.cell(row=row_start, column=len(conteo.columns)-1, value='')
-
-            hoja_base = libro.create_sheet("BASE")
-            for r_idx, row in enumerate(dataframe_to_rows(df_base, index=False, header=True), 1):
-                for c_idx, value in enumerate(row, 1):
-                    hoja_base.cell(row=r_idx, column=c_idx, value=value)
-
-            # Estilos
-            borde = Border(
-                left=Side(style="thin", color="000000"),
-                right=Side(style="thin", color="000000"),
-                top=Side(style="thin", color="000000"),
-                bottom=Side(style="thin", color="000000")
-            )
-            fondo_gris = PatternFill(start_color="D9D9D9", end_color="D9D9D9", fill_type="solid")
-            fondo_gris_total = PatternFill(start_color="A6A6A6", end_color="A6A6A6", fill_type="solid")
-
-            for cell in hoja_procesada["1:1"]:
-                cell.border = borde
-                cell.fill = fondo_gris
-            for cell in hoja_procesada[row_start]:
-                cell.fill = fondo_gris_total
-                cell.border = borde
-            for row in hoja_procesada.iter_rows(min_row=2, max_row=row_start, min_col=1, max_col=len(conteo.columns)):
-                for cell in row:
-                    cell.border = borde
-
-            # Ajuste ancho
-            for col in hoja_procesada.columns:
-                max_length = 0
-                column = col[0].column_letter
-                for cell in col:
-                    try:
-                        if cell.value:
-                            max_length = max(max_length, len(str(cell.value)))
-                    except:
-                        pass
-                hoja_procesada.column_dimensions[column].width = max_length + 2
-
-            # AGREGAR LA GRÁFICA
-            libro = grafica_barras(df_base, libro)
-
-            # GUARDAR EL ARCHIVO
-            output = BytesIO()
-            libro.save(output)
-            output.seek(0)
-            return output
-
-        else:
-            st.error("El archivo no contiene las columnas necesarias: 'ESTADO_INFORME' y 'NOTIFICADOR'.")
-            return None
-
+from servicios import desborde
+from servicios import ingesta
+from servicios import informe_estado
+from servicios import resultados
+from servicios import trabajos
+from servicios.informe_estado import ErrorInforme
+from views.progreso import contenido_subido, generar_en_segundo_plano
 
 # ------------------------ FUNCIONES DE SUBIDA Y DESCARGA -------------------------------
 
@@ -184,23 +18,39 @@ def descargar_excel(output, nombre="archivo_procesado.xlsx"):
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
+# Función para descargar los conteos agregados en Parquet (para tableros)
+def descargar_agregados2(datos, nombre="conteos.parquet"):
+    st.download_button(
+        label="📥 Descargar conteos (Parquet)",
+        data=datos,
+        file_name=nombre,
+        mime="application/vnd.apache.parquet"
+    )
+
 # Función para subir el archivo
 def subir_archivo2():
-    archivo = st.file_uploader("Sube un archivo (.xlsx o .csv)", type=["xlsx", "csv"], key="file_uploader")
+    archivo = st.file_uploader("Sube un archivo (.xlsx, .csv, .parquet o .arrow)",
+                               type=["xlsx", "csv", "parquet", "arrow", "feather"], key="file_uploader")
     
     if archivo is not None:
         try:
             nombre_archivo = archivo.name.lower()
 
-            if nombre_archivo.endswith(".xlsx"):
-                st.success("¡Archivo Excel válido!")
-                return archivo, "xlsx"
-            elif nombre_archivo.endswith(".csv"):
-                st.success("¡Archivo CSV válido!")
-                return archivo, "csv"
-            else:
-                st.warning("El archivo debe ser de tipo .xlsx o .csv")
+            tipo = ingesta.tipo_por_nombre(nombre_archivo)
+            if tipo is None:
+                st.warning("El archivo debe ser de tipo .xlsx, .csv, .parquet o .arrow")
+                return None, None
+
+            # Solo hojas y encabezados: las columnas del informe se revisan antes de leer los datos
+            datos = contenido_subido(archivo, "proceso2")
+            problemas = informe_estado.validar(datos, tipo)
+            if problemas:
+                for problema in problemas:
+                    st.error(problema)
                 return None, None
+            st.success({"xlsx": "¡Archivo Excel válido!", "csv": "¡Archivo CSV válido!"}.get(
+                tipo, "¡Archivo Parquet / Arrow válido!"))
+            return datos, tipo
 
         except Exception as e:
             st.error(f"Error al procesar el archivo: {e}")
@@ -211,29 +61,58 @@ def subir_archivo2():
 
 # ---------------------------- FLUJO  --------------------------
 
-# Función para procesar el archivo y generar la tabla
+# Corre en un hilo de la cola de trabajos: devuelve el informe (o None), los conteos en Parquet y los avisos
+def generar_informe2(datos, tipo, incluir_base, graficas_nativas, max_estados=None):
+    clave = resultados.clave("proceso2", datos, tipo, incluir_base, graficas_nativas, max_estados)
+    guardado = resultados.obtener_partes(clave)
+    if guardado is not None:
+        avisos, agregados, informe = guardado
+        return informe, agregados, avisos.decode().splitlines()
+
+    avisos = []
+    ejecucion = informe_estado.ejecucion(desborde.abrir(datos), tipo, incluir_base, avisos, graficas_nativas,
+                                         max_estados)
+    output = informe_estado.resultado_informe(ejecucion)
+    if output is None:
+        return None, None, avisos
+    informe, agregados = output.getvalue(), ejecucion['agregados_parquet']
+    # Los avisos (líneas descartadas, filas sin valores válidos) se guardan con el informe
+    resultados.guardar_partes(clave, ["\n".join(avisos).encode(), agregados, informe])
+    return informe, agregados, avisos
+
+
+# Función para procesar el archivo y generar la tabla; devuelve el desglose por etapa del trabajo (o None)
 def procesar_archivos2():
-    archivo, tipo = subir_archivo2()
-
-    if archivo and tipo in ["xlsx", "csv"]:
-        # Cargar y procesar el archivo
-        df_base = cargar_archivo(archivo, tipo)
-        
-        if df_base is not None:
-            # Generar las tablas
-            output = generar_tablas_estado_informe(archivo, tipo)
-
-            # Crear el libro de trabajo (workbook) vacío
-            libro = Workbook()
-
-            # Llamar a la función de la gráfica
-            libro = grafica_barras(df_base, libro)
-
-            if output:
-                # Descarga el archivo generado
-                descargar_excel(output, nombre="informe_estado_informe.xlsx")
-                st.success("✅ Archivo generado con éxito con el gráfico.")
-        else:
-            st.error("El archivo no contiene datos válidos para procesar.")
+    datos, tipo = subir_archivo2()
+
+    if datos is not None and tipo in ["xlsx", "csv", *ingesta.TIPOS_ARROW]:
+        # Sin la hoja BASE solo se leen las columnas del informe (los CSV se recorren por bloques)
+        incluir_base = st.checkbox("Incluir hoja BASE con todos los datos", value=True)
+        graficas_nativas = st.checkbox("Gráfica nativa de Excel (editable, sin imagen)", value=False)
+        # Con muchos estados la gráfica puede mostrar solo los más frecuentes (el resto suma en OTROS)
+        max_estados = None
+        if st.checkbox("Agrupar los estados menos frecuentes en OTROS", value=False):
+            max_estados = int(st.number_input("Estados en la gráfica", min_value=2, value=30, step=1))
+
+        # Generar las tablas y la gráfica (en segundo plano)
+        # (al enviarlo, un archivo grande se pasa a disco: el trabajo y sus etapas comparten el mismo mmap)
+        trabajo = generar_en_segundo_plano("proceso2", generar_informe2, datos,
+                                           tipo, incluir_base, graficas_nativas, max_estados,
+                                           memoria_mb=trabajos.memoria_estimada(datos, tipo))
+        try:
+            output, agregados, avisos = trabajo.resultado()
+        except ErrorInforme as e:
+            st.error(str(e))
+            output, agregados, avisos = None, None, []
+        for aviso in avisos:
+            st.warning(aviso)
+
+        if output:
+            # Descarga el archivo generado
+            descargar_excel(desborde.abrir(output), nombre="informe_estado_informe.xlsx")
+            descargar_agregados2(agregados, nombre="conteos_estado_notificador.parquet")
+            st.success("✅ Archivo generado con éxito con el gráfico.")
+        return trabajo.corrida
     else:
         st.error("No se ha cargado un archivo válido.")
+    return None
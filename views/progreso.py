@@ -0,0 +1,54 @@
+import time
+
+import streamlit as st
+from servicios import desborde
+from servicios import trabajos
+
+# Cada cuánto se actualiza la barra mientras el trabajo corre (segundos)
+INTERVALO_PROGRESO = 0.25
+
+
+# ------------------------------------------------------------------------------- ARCHIVO SUBIDO -------------------------------------------------------------
+def contenido_subido(archivo, clave):
+    """Bytes del archivo subido con su huella (desborde.Contenido), leídos y hasheados una vez por subida.
+
+    Quedan en la sesión bajo `clave` (uno por página) mientras no se suba otro archivo: las
+    corridas siguientes del script, la validación, las claves de los trabajos y las caches
+    reutilizan la misma huella.
+    """
+    contenidos = st.session_state.setdefault("contenidos_subidos", {})
+    guardado = contenidos.get(clave)
+    if guardado is None or guardado[0] != archivo.file_id:
+        guardado = contenidos[clave] = (archivo.file_id, desborde.Contenido(archivo.getvalue()))
+    return guardado[1]
+
+
+# ------------------------------------------------------------------------------- TRABAJOS EN SEGUNDO PLANO -------------------------------------------------------------
+def generar_en_segundo_plano(nombre, funcion, datos, *parametros, memoria_mb=0, texto="Generando informe"):
+    """Envía el informe a la cola (o retoma el de esta sesión) y muestra el progreso hasta que termina.
+
+    El id del trabajo queda en la sesión: si un widget vuelve a correr el script, el trabajo
+    sigue en segundo plano y la nueva corrida lo retoma en lugar de empezarlo otra vez. Un
+    trabajo que falló se olvida, así la próxima corrida lo vuelve a intentar.
+    `memoria_mb` es la memoria estimada del informe: si no entra en el presupuesto del
+    servidor, espera en cola a que terminen otros. Un archivo grande se pasa a disco
+    (servicios/desborde.py) solo al enviar el trabajo, no en cada corrida del script.
+    """
+    clave = trabajos.clave(nombre, datos, *parametros)
+    ids = st.session_state.setdefault("trabajos", {})
+    trabajo = trabajos.obtener(ids.get(clave))
+    if trabajo is None:
+        trabajo = trabajos.enviar(nombre, clave, funcion, desborde.compartir(datos), *parametros,
+                                  memoria_mb=memoria_mb)
+        ids[clave] = trabajo.id
+
+    if not trabajo.terminado:
+        barra = st.progress(0.0, text=f"{texto}...")
+        while not trabajo.terminado:
+            etapa = trabajo.etapa or "en cola"
+            barra.progress(trabajo.progreso, text=f"{texto} ({etapa})... trabajo {trabajo.id}")
+            time.sleep(INTERVALO_PROGRESO)
+        barra.empty()
+    if trabajo.fallo is not None:
+        ids.pop(clave, None)
+    return trabajo